@@ -0,0 +1,382 @@
+"""
+F4: Asyncio Test Execution
+Non-blocking compile/run/collect for the FastAPI handlers. Builds, test
+runs (whose resource usage needs wait4) and blocking file work such as
+hashing sources and binaries or removing build directories happen on
+worker threads; only gcov runs through asyncio.create_subprocess_exec.
+Cancelling a request kills the compiler or program it is waiting for,
+with every process that one started.
+"""
+
+import asyncio
+import shutil
+import subprocess
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, List, Any, Optional
+
+from models import TestExecutionOutput, GCovData
+from compile_cache import CompileCache
+from compile_scheduler import BuildCancelled
+from sandbox_pool import SandboxPool
+from test_executor import TestExecutor, compilation_error_output, input_data
+from dual_build import RUN_MODES, CoverageMemo
+from result_cache import ResultCache
+from timeouts import DEFAULT_TIMEOUT, TimeoutPolicy, kill_process_group, limit_cpu_time
+from output_capture import DEFAULT_OUTPUT_LIMIT, CapturedRun, run_captured
+from resource_usage import usage_fields
+
+
+async def run_process(
+    cmd: List[str],
+    input_data: Optional[bytes] = None,
+    timeout: Optional[float] = None,
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+    cpu_limit: bool = False
+) -> tuple[int, bytes, bytes]:
+    """
+    Run a command without blocking the event loop.
+
+    The child runs in its own process group, which is killed if the timeout
+    expires or the awaiting task is cancelled, so abandoned requests never
+    leave compilers, test programs or anything they started running.
+    cpu_limit also applies timeouts.limit_cpu_time().
+
+    Returns:
+        (returncode, stdout, stderr)
+
+    Raises:
+        subprocess.TimeoutExpired if the timeout expired
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True
+    )
+    if cpu_limit and timeout is not None:
+        limit_cpu_time(proc.pid, timeout)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(input_data), timeout)
+    except asyncio.TimeoutError:
+        kill_process_group(proc)
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    except asyncio.CancelledError:
+        kill_process_group(proc)
+        raise
+    return proc.returncode, stdout, stderr
+
+
+async def run_captured_async(
+    cmd: List[str],
+    input_data: Optional[bytes] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+    expected_output: Optional[Any] = None,
+    output_limit: int = DEFAULT_OUTPUT_LIMIT,
+    stop_early: bool = True
+) -> CapturedRun:
+    """
+    Async version of output_capture.run_captured. The run itself happens on
+    a worker thread: asyncio's child watcher reaps its own subprocesses
+    without their rusage, so only a plain Popen reports resource usage. The
+    program's process group is killed if the awaiting task is cancelled.
+
+    Raises:
+        subprocess.TimeoutExpired if the timeout expired
+    """
+    procs: List[subprocess.Popen] = []
+    run = asyncio.to_thread(
+        run_captured, cmd, input_data, timeout, cwd, env, expected_output,
+        output_limit, stop_early, on_start=procs.append
+    )
+    try:
+        # The thread cannot be interrupted; killing the group ends it
+        return await asyncio.shield(run)
+    except asyncio.CancelledError:
+        for proc in procs:
+            kill_process_group(proc)
+        raise
+
+
+class AsyncTestExecutor(TestExecutor):
+    """
+    TestExecutor whose compile, execute and coverage steps are coroutines.
+    Shares the compile cache, run-directory layout and gcov parsing with the
+    synchronous executor.
+    """
+
+    async def compile_with_coverage_async(
+        self,
+        source_code: str,
+        source_filename: str = "test_program.cpp"
+    ) -> tuple[bool, str, str]:
+        """
+        Async version of compile_with_coverage.
+
+        Builds are multi-step (object, optional driver, link) and go through
+        the compile cache's locks, so they run on a worker thread; the event
+        loop stays free while the compiler runs. Cancelling the awaiting
+        task kills the compiler (see _compile_async).
+
+        Returns:
+            (success, binary_path, error_message)
+        """
+        return await self._compile_async(self.compile_with_coverage, source_code, source_filename)
+
+    async def compile_fast_async(
+        self,
+        source_code: str,
+        source_filename: str = "test_program.cpp"
+    ) -> tuple[bool, str, str]:
+        """
+        Async version of compile_fast (on a worker thread, like compile_with_coverage_async).
+
+        Returns:
+            (success, binary_path, error_message)
+        """
+        return await self._compile_async(self.compile_fast, source_code, source_filename)
+
+    async def _compile_async(
+        self,
+        compile: Callable[[str, str], tuple[bool, str, str]],
+        source_code: str,
+        source_filename: str
+    ) -> tuple[bool, str, str]:
+        """
+        Run a compile method on a worker thread. If the awaiting task is
+        cancelled, cancel_compiles() kills the running compiler's process
+        group and skips the build's remaining steps; nothing is cached.
+        """
+        def build() -> tuple[bool, str, str]:
+            try:
+                return compile(source_code, source_filename)
+            except BuildCancelled:
+                return False, "", "Compilation cancelled"
+
+        run = asyncio.to_thread(build)
+        try:
+            # The thread cannot be interrupted; killing the compiler ends it
+            return await asyncio.shield(run)
+        except asyncio.CancelledError:
+            self.cancel_compiles()
+            raise
+
+    async def execute_test_async(
+        self,
+        binary_path: str,
+        test_inputs: List[Any],
+        expected_output: Optional[Any] = None,
+        timeout: Optional[float] = None,
+        collect_coverage: bool = True
+    ) -> TestExecutionOutput:
+        """
+        Async version of execute_test. Cancelling the awaiting task kills
+        the program (or gcov) immediately.
+        """
+        stdin = input_data(test_inputs, self.input_protocol)
+        # Hashes the binary on its first run only (cached by path and mtime)
+        cache_key, cached = await asyncio.to_thread(
+            self._cached_result, binary_path, stdin, expected_output, collect_coverage
+        )
+        if cached is not None:
+            return cached
+
+        test_id = str(uuid.uuid4())[:8]
+        ceiling = timeout or DEFAULT_TIMEOUT
+        timeout = self._run_timeout(binary_path, ceiling)
+        start_time = time.time()
+
+        build_dir = Path(binary_path).parent
+        run_dir = self.work_dir / f"run_{test_id}"
+        env = self._run_env(build_dir, prefix=run_dir)
+        coverage_map = self._coverage_map(env) if collect_coverage else None
+
+        try:
+            run_dir.mkdir(parents=True)
+
+            print(f"[DEBUG] Executing: {binary_path} with inputs: {test_inputs} (timeout {timeout}s)")
+            result = await run_captured_async(
+                [binary_path],
+                input_data=stdin,
+                timeout=timeout,
+                cwd=str(self.work_dir),
+                env=env,
+                expected_output=expected_output,
+                output_limit=self.output_limit,
+                stop_early=not collect_coverage
+            )
+
+            execution_time = time.time() - start_time
+            if not result.stopped:
+                self._record_runtime(binary_path, execution_time)
+            output = result.output
+            error = result.error
+            status = self._determine_status(result.returncode, output, expected_output)
+            print(f"[DEBUG] Test status: {status}")
+
+            if not collect_coverage:
+                coverage_data, branches_taken = [], []
+            elif coverage_map is not None:
+                # Only the first runs of a binary call addr2line; keep it off the loop
+                coverage_data, branches_taken = await asyncio.to_thread(
+                    self._collect_sancov, coverage_map, binary_path
+                )
+            else:
+                self._link_gcno(build_dir, run_dir)
+                coverage_data, branches_taken = await self._collect_coverage_data_async(run_dir)
+
+            return self._remember(cache_key, TestExecutionOutput(
+                test_id=test_id,
+                execution_status=status,
+                output=output,
+                error=error,
+                coverage_data=coverage_data,
+                branches_taken=branches_taken,
+                execution_time=round(execution_time, 3),
+                timeout=timeout,
+                **usage_fields(result.usage)
+            ))
+
+        except subprocess.TimeoutExpired:
+            return self._timeout_output(test_id, timeout, ceiling)
+        except Exception as e:
+            return TestExecutionOutput(
+                test_id=test_id,
+                execution_status="error",
+                output=None,
+                error=str(e),
+                coverage_data=[],
+                branches_taken=[],
+                execution_time=time.time() - start_time,
+                timeout=timeout
+            )
+        finally:
+            await asyncio.to_thread(shutil.rmtree, run_dir, ignore_errors=True)
+            if coverage_map is not None:
+                coverage_map.close()
+
+    async def _collect_coverage_data_async(
+        self,
+        coverage_dir: Path
+    ) -> tuple[List[GCovData], List[str]]:
+        """Async version of _collect_coverage_data."""
+        if not any(coverage_dir.glob("*.gcda")):
+            print("[WARNING] No .gcda files found - coverage not collected")
+            return [], []
+
+        if self.coverage_backend == "native":
+            # No subprocess involved; decoding is quick enough to run inline
+            native = self._collect_coverage_native(coverage_dir)
+            if native is not None:
+                return native
+
+        try:
+            if self.gcov_json:
+                returncode, stdout, stderr = await run_process(
+                    self._gcov_json_command(), timeout=10, cwd=str(coverage_dir)
+                )
+                if returncode != 0:
+                    print(f"[WARNING] gcov failed: {stderr.decode(errors='replace')}")
+                    return [], []
+                return self._parse_gcov_json(stdout.decode(errors='replace'))
+
+            returncode, _, stderr = await run_process(
+                self._gcov_command(), timeout=10, cwd=str(coverage_dir)
+            )
+            if returncode != 0:
+                print(f"[WARNING] gcov failed: {stderr.decode(errors='replace')}")
+            return self._read_gcov_results(coverage_dir)
+        except FileNotFoundError:
+            print("[ERROR] gcov not found. Please install MinGW-w64 or GCC on Windows")
+        except subprocess.TimeoutExpired:
+            print("[ERROR] Coverage collection error: gcov timeout")
+        return [], []
+
+
+async def execute_test_case_async(
+    source_code: str,
+    test_inputs: List[Any],
+    expected_output: Optional[Any] = None,
+    work_dir: Optional[str] = None,
+    compile_cache: Optional[CompileCache] = None,
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    sandbox_pool: Optional[SandboxPool] = None,
+    build_profile: Optional[str] = None,
+    timeout_policy: Optional[TimeoutPolicy] = None,
+    run_mode: str = "coverage",
+    coverage_memo: Optional[CoverageMemo] = None,
+    result_cache: Optional[ResultCache] = None,
+    output_limit: int = DEFAULT_OUTPUT_LIMIT,
+    input_protocol: str = "text"
+) -> TestExecutionOutput:
+    """
+    Async version of test_executor.execute_test_case.
+
+    Args:
+        source_code: C/C++ source code
+        test_inputs: Input values for the test
+        expected_output: Expected output for pass/fail determination
+        work_dir: Working directory (uses a sandbox or temp dir if None)
+        compile_cache: Shared build cache, so repeated sources skip g++
+        coverage_backend: One of test_executor.COVERAGE_BACKENDS
+        coverage_scope: One of test_executor.COVERAGE_SCOPES
+        sandbox_pool: Pool to borrow the working directory from when work_dir is None
+        build_profile: Name in build_profiles.PROFILES (None uses the default)
+        timeout_policy: Shared runtime history for adaptive run timeouts
+        run_mode: One of dual_build.RUN_MODES
+        coverage_memo: Coverage recorded by earlier "auto" runs
+        result_cache: Results of earlier identical runs (None for nondeterministic programs)
+        output_limit: Bytes of stdout/stderr kept per run
+        input_protocol: One of input_protocol.INPUT_PROTOCOLS
+
+    Returns:
+        TestExecutionOutput with results and coverage data
+    """
+    executor = AsyncTestExecutor(
+        work_dir, compile_cache=compile_cache,
+        coverage_backend=coverage_backend, coverage_scope=coverage_scope,
+        sandbox_pool=sandbox_pool, build_profile=build_profile,
+        timeout_policy=timeout_policy, result_cache=result_cache,
+        output_limit=output_limit, input_protocol=input_protocol
+    )
+
+    try:
+        if run_mode not in RUN_MODES:
+            raise ValueError(f"Unknown run mode: {run_mode}. Use one of {RUN_MODES}")
+        memo = coverage_memo if run_mode == "auto" else None
+        known = None
+        if memo is not None:
+            program_key = await asyncio.to_thread(executor._program_key, source_code)
+            known = memo.get(program_key, input_data(test_inputs, input_protocol))
+
+        if run_mode == "fast" or known is not None:
+            success, binary_path, error = await executor.compile_fast_async(source_code)
+            if not success:
+                return compilation_error_output(error)
+            result = await executor.execute_test_async(
+                binary_path, test_inputs, expected_output, collect_coverage=False
+            )
+            if known is not None and result.execution_status != "error":
+                result.coverage_data, result.branches_taken = known
+            return result
+
+        success, binary_path, error = await executor.compile_with_coverage_async(source_code)
+
+        if not success:
+            return compilation_error_output(error)
+
+        result = await executor.execute_test_async(binary_path, test_inputs, expected_output)
+        if memo is not None and result.execution_status != "error":
+            memo.put(program_key, input_data(test_inputs, input_protocol), result.coverage_data, result.branches_taken)
+        return result
+    finally:
+        await asyncio.to_thread(executor.cleanup)
@@ -0,0 +1,282 @@
+"""
+F4: Parallel Batch Execution
+Spreads a batch of test cases over a pool of workers, each with its own sandbox.
+Results can be collected as a list or streamed as they finish.
+"""
+
+import functools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Iterator, List, Any, Optional, Union
+
+from models import TestExecutionOutput
+from compile_cache import CompileCache
+from sandbox_pool import SandboxPool
+from test_executor import TestExecutor
+from timeouts import TimeoutPolicy
+from dual_build import CoverageMemo
+from result_cache import ResultCache
+from output_capture import DEFAULT_OUTPUT_LIMIT
+from resource_usage import UsageSummary
+from project_build import Project
+
+
+class ParallelBatchExecutor:
+    """
+    Compiles a program once, then runs its test cases on a fixed-size worker pool.
+
+    Workers are threads: the actual work happens in child processes (the
+    program and gcov), which run in parallel regardless of the GIL. Each
+    worker borrows its own sandbox directory from a SandboxPool, so .gcda
+    files never collide and nothing is left on disk after the batch.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        compile_cache: Optional[CompileCache] = None,
+        sandbox_pool: Optional[SandboxPool] = None,
+        timeout_policy: Optional[TimeoutPolicy] = None,
+        coverage_memo: Optional[CoverageMemo] = None,
+        result_cache: Optional[ResultCache] = None,
+        output_limit: int = DEFAULT_OUTPUT_LIMIT
+    ):
+        """
+        Initialize batch executor.
+
+        Args:
+            max_workers: Pool size. If None, uses the number of CPUs.
+            compile_cache: Shared build cache, so repeated sources skip g++
+            sandbox_pool: Where workers run. If None, the executor creates
+                          (and on shutdown removes) a pool of its own.
+            timeout_policy: Shared runtime history for adaptive run timeouts.
+                          If None, every run gets the full timeout.
+            coverage_memo: Coverage recorded by "auto" runs, reused by later batches
+            result_cache: Results of earlier identical runs, unless a batch opts out
+            output_limit: Bytes of stdout/stderr kept per run
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.compile_cache = compile_cache
+        self.timeout_policy = timeout_policy
+        self.coverage_memo = coverage_memo
+        self.result_cache = result_cache
+        self.output_limit = output_limit
+        self._owns_sandbox_pool = sandbox_pool is None
+        # One sandbox per worker plus one for the build
+        self.sandbox_pool = sandbox_pool or SandboxPool(size=self.max_workers + 1)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="batch_worker"
+        )
+
+    def execute(
+        self,
+        source_code: Union[str, Project],
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        mode: str = "process",
+        timeout: Optional[float] = None,
+        coverage_backend: str = "gcov",
+        coverage_scope: str = "all",
+        build_profile: Optional[str] = None,
+        run_mode: str = "coverage",
+        cache_results: bool = True,
+        input_protocol: str = "text",
+        collect_coverage: bool = True,
+        usage: Optional[UsageSummary] = None
+    ) -> List[TestExecutionOutput]:
+        """
+        Compile once and execute all test cases in parallel.
+
+        Args:
+            source_code: C/C++ source code, or a multi-file Project
+            test_inputs_list: Input values per test
+            expected_outputs: Expected output per test (None entries skip the check)
+            mode: Execution mode, one of test_executor.EXECUTION_MODES
+            timeout: Per-test timeout ceiling in seconds (default timeouts.DEFAULT_TIMEOUT)
+            coverage_backend: One of test_executor.COVERAGE_BACKENDS
+            coverage_scope: One of test_executor.COVERAGE_SCOPES
+            build_profile: Name in build_profiles.PROFILES (None uses the default)
+            run_mode: One of dual_build.RUN_MODES ("fast" and "auto" run
+                      inputs whose coverage is not needed on an uninstrumented build)
+            cache_results: Use the result cache; turn off for nondeterministic programs
+            input_protocol: One of input_protocol.INPUT_PROTOCOLS
+            collect_coverage: False skips reading coverage (see TestExecutor.iter_source)
+            usage: Summary to count this batch's runs in; its summary(self.max_workers)
+                   is then the batch's aggregate resource usage
+
+        Returns:
+            One TestExecutionOutput per input, in input order
+        """
+        results: List[Optional[TestExecutionOutput]] = [None] * len(test_inputs_list)
+        for i, result in self.execute_iter(
+            source_code, test_inputs_list, expected_outputs, mode, timeout,
+            coverage_backend, coverage_scope, build_profile, run_mode, cache_results,
+            input_protocol, collect_coverage, usage
+        ):
+            results[i] = result
+        return results
+
+    def execute_iter(
+        self,
+        source_code: Union[str, Project],
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        mode: str = "process",
+        timeout: Optional[float] = None,
+        coverage_backend: str = "gcov",
+        coverage_scope: str = "all",
+        build_profile: Optional[str] = None,
+        run_mode: str = "coverage",
+        cache_results: bool = True,
+        input_protocol: str = "text",
+        collect_coverage: bool = True,
+        usage: Optional[UsageSummary] = None
+    ) -> Iterator[tuple[int, TestExecutionOutput]]:
+        """
+        Like execute(), but yields (input index, result) pairs as soon as
+        each test finishes, in completion order.
+
+        Results the consumer has not read yet are buffered per request, so a
+        slow consumer never holds the shared worker threads (the buffer is
+        bounded by the batch size). Closing the generator early stops
+        the remaining tests and releases the sandboxes. Results are counted
+        in usage as they are yielded.
+        """
+        compiler = TestExecutor(
+            compile_cache=self.compile_cache, sandbox_pool=self.sandbox_pool,
+            coverage_backend=coverage_backend, coverage_scope=coverage_scope,
+            build_profile=build_profile, input_protocol=input_protocol
+        )
+        try:
+            for index, result in compiler.iter_source(
+                source_code, test_inputs_list, expected_outputs, mode,
+                run_mode=run_mode, timeout=timeout, coverage_memo=self.coverage_memo,
+                runner=functools.partial(
+                    self._run_parallel, coverage_backend=coverage_backend,
+                    result_cache=self.result_cache if cache_results else None,
+                    input_protocol=input_protocol
+                ),
+                collect_coverage=collect_coverage
+            ):
+                if usage is not None:
+                    usage.add(result)
+                yield index, result
+
+        finally:
+            # The (uncached) build lives in the compiler's sandbox until every worker is done
+            compiler.cleanup()
+
+    def _run_parallel(
+        self,
+        path: str,
+        mode: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: List[Optional[Any]],
+        timeout: Optional[float],
+        collect_coverage: bool,
+        coverage_backend: str,
+        result_cache: Optional[ResultCache],
+        input_protocol: str
+    ) -> Iterator[tuple[int, TestExecutionOutput]]:
+        """
+        Run inputs against one build, spread over the workers, yielding
+        (position, result) pairs as they finish (a TestExecutor.iter_source runner).
+        """
+        # Unbounded: workers on the shared pool must never wait for this request's consumer
+        finished: queue.Queue = queue.Queue()
+        cancelled = threading.Event()
+        futures = [
+            self._pool.submit(
+                self._run_chunk,
+                start,
+                path,
+                mode,
+                test_inputs_list[start:end],
+                expected_outputs[start:end],
+                timeout,
+                collect_coverage,
+                coverage_backend,
+                result_cache,
+                input_protocol,
+                finished,
+                cancelled
+            )
+            for start, end in split_evenly(len(test_inputs_list), self.max_workers)
+        ]
+
+        try:
+            for _ in range(len(test_inputs_list)):
+                while True:
+                    try:
+                        yield finished.get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        # A worker that raised will never deliver its remaining results
+                        for future in futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+        finally:
+            cancelled.set()
+            wait(futures)
+
+    def _run_chunk(
+        self,
+        start: int,
+        path: str,
+        mode: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: List[Optional[Any]],
+        timeout: Optional[float],
+        collect_coverage: bool,
+        coverage_backend: str,
+        result_cache: Optional[ResultCache],
+        input_protocol: str,
+        finished: queue.Queue,
+        cancelled: threading.Event
+    ):
+        """
+        Run one worker's share of the batch inside its own sandbox, putting
+        (position, result) pairs on the finished queue until cancelled.
+        """
+        executor = TestExecutor(
+            sandbox_pool=self.sandbox_pool, coverage_backend=coverage_backend,
+            timeout_policy=self.timeout_policy, result_cache=result_cache,
+            output_limit=self.output_limit, input_protocol=input_protocol
+        )
+        results = executor.iter_many(
+            path, mode, test_inputs_list, expected_outputs, timeout, collect_coverage
+        )
+        try:
+            for offset, result in enumerate(results):
+                if cancelled.is_set():
+                    return
+                finished.put((start + offset, result))
+        finally:
+            results.close()
+            executor.cleanup()
+
+    def shutdown(self):
+        """Stop the worker pool (and remove the sandbox pool if this executor created it)."""
+        self._pool.shutdown(wait=True)
+        if self._owns_sandbox_pool:
+            self.sandbox_pool.close()
+
+
+def split_evenly(total: int, parts: int) -> List[tuple[int, int]]:
+    """
+    Split range(total) into at most `parts` contiguous (start, end) chunks
+    whose sizes differ by at most one.
+    """
+    parts = max(1, min(parts, total))
+    size, extra = divmod(total, parts)
+    chunks = []
+    start = 0
+    for k in range(parts):
+        end = start + size + (1 if k < extra else 0)
+        if end > start:
+            chunks.append((start, end))
+        start = end
+    return chunks
@@ -0,0 +1,108 @@
+"""
+F4: Branch Index
+Stable identifiers for gcov's branch records. A program's branch layout
+(which lines hold branches, and how many) is fixed by its .gcno, so the
+identifiers are laid out once per binary; reading a run's branches is
+then a lookup of its taken counts in that table.
+
+Identifiers:
+    L<line>        a decision on the line was reached (one of its branches ran)
+    L<line>_b<k>   the line's k-th branch record (gcov's order) was taken
+"""
+
+import functools
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from gcov_reader import GcovFormatError, load_gcno
+
+
+@functools.lru_cache(maxsize=4096)
+def _line_ids(line: int, n_branches: int) -> Tuple[str, ...]:
+    return tuple(f"L{line}_b{k}" for k in range(n_branches))
+
+
+class BranchIndex:
+    """Branch identifiers of one program, per source line."""
+
+    def __init__(self, layout: Dict[int, int]):
+        """
+        Args:
+            layout: Number of branch records per line (lines without branches may be left out)
+        """
+        self.lines: Dict[int, Tuple[str, ...]] = {
+            line: _line_ids(line, n) for line, n in sorted(layout.items()) if n
+        }
+
+    @classmethod
+    def from_gcno(cls, gcno_path: str, source_name: str) -> "BranchIndex":
+        """
+        Layout from the flow graph: the branch arcs of the blocks each line
+        is attributed to, in the order gcov and gcov_reader report them.
+
+        Raises:
+            OSError, GcovFormatError if the .gcno can't be read
+        """
+        layout: Dict[int, int] = {}
+        for fn in load_gcno(gcno_path).functions.values():
+            if fn.artificial:
+                continue
+            for (file_name, line), blocks in fn.line_blocks.items():
+                if Path(file_name).name == source_name:
+                    layout[line] = layout.get(line, 0) + sum(
+                        len(fn.branch_arcs.get(block, ())) for block in blocks
+                    )
+        return cls(layout)
+
+    @property
+    def total(self) -> int:
+        """Number of branch records in the program."""
+        return sum(len(ids) for ids in self.lines.values())
+
+    def all_ids(self) -> List[str]:
+        """Every identifier taken() can return, in line order."""
+        ids = []
+        for line, branch_ids in self.lines.items():
+            ids.append(f"L{line}")
+            ids.extend(branch_ids)
+        return ids
+
+    def taken(self, branch_counts: Dict[int, List[int]]) -> List[str]:
+        """Identifiers of the branches a run took, given its counts per line."""
+        taken = []
+        for line in sorted(branch_counts):
+            counts = branch_counts[line]
+            if not any(counts):
+                continue
+            ids = self.lines.get(line)
+            if ids is None or len(ids) != len(counts):
+                # Layout differs from the graph (e.g. another gcov version)
+                ids = _line_ids(line, len(counts))
+            taken.append(f"L{line}")
+            taken.extend(branch_id for branch_id, count in zip(ids, counts) if count > 0)
+        return taken
+
+
+@functools.lru_cache(maxsize=64)
+def _load_index(gcno_path: str, mtime_ns: int, size: int, source_name: str) -> BranchIndex:
+    return BranchIndex.from_gcno(gcno_path, source_name)
+
+
+def branch_index(
+    gcno_path: Optional[str],
+    source_name: str = "test_program.cpp",
+    branch_counts: Optional[Dict[int, List[int]]] = None
+) -> BranchIndex:
+    """
+    The program's BranchIndex, built once per (unchanged) .gcno. Without a
+    readable .gcno the layout is taken from one run's branch_counts.
+    """
+    if gcno_path is not None:
+        try:
+            resolved = Path(gcno_path).resolve()
+            stat = resolved.stat()
+            return _load_index(str(resolved), stat.st_mtime_ns, stat.st_size, source_name)
+        except (OSError, GcovFormatError, struct.error):
+            pass
+    return BranchIndex({line: len(counts) for line, counts in (branch_counts or {}).items()})
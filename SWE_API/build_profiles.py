@@ -0,0 +1,185 @@
+"""
+F4: Build Profiles
+Compiler, flag and linker combinations for coverage builds, plus a short
+calibration that measures which one is fastest on the current host.
+"""
+
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class BuildProfile:
+    """
+    One way to build an instrumented program. --coverage is always added;
+    compile_flags and link_flags are everything else.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        compiler: str,
+        compile_flags: List[str],
+        link_flags: Optional[List[str]] = None,
+        requires: Optional[List[str]] = None,
+        description: str = ""
+    ):
+        self.name = name
+        self.compiler = compiler
+        self.compile_flags = compile_flags
+        self.link_flags = link_flags or []
+        # Executables besides the compiler that must be on PATH (e.g. the linker)
+        self.requires = requires or []
+        self.description = description
+
+    def available(self) -> bool:
+        """Whether the compiler and required tools are installed."""
+        return all(shutil.which(tool) for tool in [self.compiler, *self.requires])
+
+
+# -g is not needed for gcov; -pipe keeps the compiler's temporaries in memory.
+# Static binaries skip the dynamic loader on every run.
+PROFILES: Dict[str, BuildProfile] = {
+    profile.name: profile for profile in [
+        BuildProfile("default", "g++", ["-g", "-O0"],
+                     description="gcc with debug info"),
+        BuildProfile("fast", "g++", ["-O0", "-pipe"],
+                     description="gcc without debug info, temporaries on pipes"),
+        BuildProfile("fast-lld", "g++", ["-O0", "-pipe"], ["-fuse-ld=lld"], requires=["ld.lld"],
+                     description="fast, linked with lld"),
+        BuildProfile("fast-gold", "g++", ["-O0", "-pipe"], ["-fuse-ld=gold"], requires=["ld.gold"],
+                     description="fast, linked with gold"),
+        BuildProfile("static", "g++", ["-O0", "-pipe"], ["-static"],
+                     description="fast, statically linked (no loader cost per run)"),
+        BuildProfile("clang", "clang++", ["-O0", "-pipe"],
+                     description="clang (its .gcda must be readable by the installed gcov)"),
+    ]
+}
+
+_default_name = "default"
+_calibration: Optional[Dict[str, Any]] = None
+_calibration_lock = threading.Lock()
+
+PROBE_SOURCE = """
+#include <iostream>
+int classify(int x) {
+    if (x > 2) return 1;
+    return 0;
+}
+int main() {
+    int x;
+    std::cin >> x;
+    std::cout << classify(x) << std::endl;
+    return 0;
+}
+"""
+
+
+def get_profile(name: Optional[str] = None) -> BuildProfile:
+    """Profile by name; None means the current default."""
+    name = name or _default_name
+    if name not in PROFILES:
+        raise ValueError(f"Unknown build profile: {name}. Use one of {list(PROFILES)}")
+    return PROFILES[name]
+
+
+def set_default_profile(name: str):
+    """Profile used by executors that don't ask for one."""
+    global _default_name
+    get_profile(name)
+    _default_name = name
+
+
+def default_profile_name() -> str:
+    """Name of the profile get_profile() returns by default."""
+    return _default_name
+
+
+def last_calibration() -> Optional[Dict[str, Any]]:
+    """Result of the last calibrate() call, or None."""
+    return _calibration
+
+
+def calibrate(
+    runs_per_build: int = 50,
+    names: Optional[List[str]] = None,
+    repeats: int = 5
+) -> Dict[str, Any]:
+    """
+    Build and run a probe program with every available profile and make
+    the cheapest one that reports correct coverage the default.
+
+    A profile's cost is its build time plus runs_per_build program runs, so
+    workloads that run each build many times favour cheap runs (static)
+    over cheap builds.
+
+    Args:
+        runs_per_build: Expected test runs per compiled program
+        names: Profiles to consider (default: all)
+        repeats: Timed runs per profile
+
+    Returns:
+        {"selected", "runs_per_build", "profiles": {name: measurements}}
+    """
+    # test_executor imports this module for the profile definitions
+    from test_executor import TestExecutor
+
+    global _calibration
+    with _calibration_lock:
+        names = names or list(PROFILES)
+        results: Dict[str, Dict[str, Any]] = {}
+        reference = None
+
+        for name in ["default"] + [n for n in names if n != "default"]:
+            profile = get_profile(name)
+            if not profile.available():
+                results[name] = {"available": False}
+                continue
+
+            work_dir = Path(tempfile.mkdtemp(prefix="calibrate_"))
+            executor = TestExecutor(str(work_dir), build_profile=name)
+            try:
+                start = time.perf_counter()
+                success, binary_path, error = executor.compile_with_coverage(PROBE_SOURCE)
+                build_ms = (time.perf_counter() - start) * 1000
+                if not success:
+                    results[name] = {"available": False, "error": error[:200]}
+                    continue
+
+                result = executor.execute_test(binary_path, [3], expected_output="1")
+                lines = [(d.line_number, d.execution_count) for d in result.coverage_data]
+                if name == "default":
+                    reference = lines
+
+                # Program runs alone (no coverage collection), .gcda redirected as in real runs
+                env = executor._gcov_env(Path(binary_path).parent, prefix=work_dir / "runs")
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    subprocess.run([binary_path], input=b"3\n", capture_output=True, env=env, timeout=10)
+                run_ms = (time.perf_counter() - start) * 1000 / repeats
+            except (OSError, subprocess.SubprocessError) as e:
+                results[name] = {"available": False, "error": str(e)[:200]}
+                continue
+            finally:
+                executor.cleanup()
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+            results[name] = {
+                "available": True,
+                "coverage_ok": result.execution_status == "passed" and bool(lines) and lines == reference,
+                "build_ms": round(build_ms, 1),
+                "run_ms": round(run_ms, 2),
+                "score_ms": round(build_ms + runs_per_build * run_ms, 1)
+            }
+
+        usable = [n for n in names if results.get(n, {}).get("coverage_ok")]
+        selected = min(usable, key=lambda n: results[n]["score_ms"]) if usable else "default"
+        set_default_profile(selected)
+        print(f"[DEBUG] Build profile calibration selected '{selected}': {results}")
+
+        _calibration = {"selected": selected, "runs_per_build": runs_per_build, "profiles": results}
+        return _calibration
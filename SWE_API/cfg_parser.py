@@ -1,5 +1,5 @@
 import clang.cindex
-from typing import Dict, Any
+from typing import Dict, Any, List
 import re
 import sys
 import os
@@ -245,4 +245,122 @@ def _parse_with_regex(source_code: str) -> Dict[str, Any]:
             "label": "next"
         })
     
-    return {"nodes": nodes, "edges": edges, "params": params}
\ No newline at end of file
+    return {"nodes": nodes, "edges": edges, "params": params}
+
+
+def find_function_definitions(source_code: str) -> List[Dict[str, Any]]:
+    """
+    Locates free function definitions (including main), using LibClang with
+    fallback to regex parsing.
+    Returns: one {"name", "line", "offset", "qualified_name", "return_type",
+    "params"} per definition in source order, where offset is the character
+    index at which the declaration starts and params lists (type, name) pairs.
+    """
+    try:
+        return _find_definitions_with_libclang(source_code)
+    except Exception:
+        return _find_definitions_with_regex(source_code)
+
+
+def _find_definitions_with_libclang(source_code: str) -> List[Dict[str, Any]]:
+    """Find definitions using LibClang"""
+    index = clang.cindex.Index.create()
+    tu = index.parse('temp.cpp', args=['-std=c++11'], unsaved_files=[('temp.cpp', source_code)])
+    encoded = source_code.encode('utf-8')
+    definitions = []
+
+    def walk(cursor, scope):
+        for child in cursor.get_children():
+            if child.location.file is None or child.location.file.name != 'temp.cpp':
+                continue
+            if child.kind == clang.cindex.CursorKind.NAMESPACE:
+                walk(child, f"{scope}{child.spelling}::" if child.spelling else scope)
+            elif child.kind == clang.cindex.CursorKind.FUNCTION_DECL and child.is_definition():
+                # LibClang offsets count bytes; callers index the str
+                byte_offset = child.extent.start.offset
+                offset = len(encoded[:byte_offset].decode('utf-8', errors='replace'))
+                # Types as written: LibClang turns types from headers it can't find into int
+                return_type, params = _declared_signature(source_code, offset, child.spelling)
+                definitions.append({
+                    "name": child.spelling,
+                    "line": child.extent.start.line,
+                    "offset": offset,
+                    "qualified_name": scope + child.spelling,
+                    "return_type": return_type,
+                    "params": params
+                })
+
+    walk(tu.cursor, "")
+
+    if not definitions:
+        raise Exception("LibClang returned no results")
+
+    return definitions
+
+
+def _find_definitions_with_regex(source_code: str) -> List[Dict[str, Any]]:
+    """Fallback: (a slightly wider form of) the function pattern used by _parse_with_regex"""
+    definitions = []
+    # Also matches return types ending in a template, reference or pointer (vector<int> f(...))
+    for match in re.finditer(r'\b(\w+)[>&*]*\s+(\w+)\s*\(([^)]*)\)\s*\{', source_code):
+        if match.group(2) in ['if', 'while', 'for', 'switch'] or match.group(1) in ['else', 'return']:
+            continue
+        # The return type is what precedes the name since the last line or block (e.g. "long long")
+        decl_start = max(source_code.rfind(c, 0, match.start()) for c in '\n;{}') + 1
+        return_type, params = _declared_signature(source_code, decl_start, match.group(2))
+        definitions.append({
+            "name": match.group(2),
+            "line": source_code.count('\n', 0, match.start()) + 1,
+            "offset": match.start(),
+            "qualified_name": match.group(2),
+            "return_type": return_type,
+            "params": params
+        })
+    return definitions
+
+
+def _declared_signature(source_code: str, start: int, name: str) -> tuple[str, List[tuple[str, str]]]:
+    """Return type and (type, name) parameters of the declaration of name starting at start."""
+    match = re.compile(rf'\b{re.escape(name)}\s*\(').search(source_code, start)
+    if match is None:
+        return "", []
+    depth = 1
+    end = match.end()
+    while end < len(source_code) and depth:
+        if source_code[end] == '(':
+            depth += 1
+        elif source_code[end] == ')':
+            depth -= 1
+        end += 1
+    return_type = source_code[start:match.start()]
+    return_type = re.sub(r'__attribute__\s*\(\(.*?\)\)|\b(static|inline|constexpr|extern)\b', ' ', return_type)
+    return ' '.join(return_type.split()), _split_params(source_code[match.end():end - 1])
+
+
+def _split_params(param_str: str) -> List[tuple[str, str]]:
+    """(type, name) pairs of a parameter list such as "const std::string &s, int n"."""
+    params = []
+    param_str = param_str.strip()
+    if not param_str or param_str == 'void':
+        return params
+    depth = 0
+    start = 0
+    parts = []
+    for i, char in enumerate(param_str):
+        # Commas inside template arguments do not separate parameters
+        if char == '<':
+            depth += 1
+        elif char == '>':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(param_str[start:i])
+            start = i + 1
+    parts.append(param_str[start:])
+    for part in parts:
+        part = part.split('=')[0].strip()
+        match = re.match(r'^(.*?[\s&*>])(\w+)$', part)
+        if match:
+            params.append((match.group(1).strip(), match.group(2)))
+        else:
+            params.append((part, ''))
+    return params
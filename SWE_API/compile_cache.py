@@ -0,0 +1,222 @@
+"""
+F4: Content-Addressed Compile Cache
+Reuses coverage-instrumented builds across test executions.
+"""
+
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from compile_scheduler import CompileScheduler
+from pch import PchStore
+from project_build import DependencyIndex
+
+
+class CacheEntry:
+    """
+    A single cached build: the program object and its .gcno live in
+    build_dir, next to every executable linked from that object.
+    Failed compiles are cached too, with success=False and the error message.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        build_dir: Path,
+        success: bool,
+        binary_path: str,
+        error: str,
+        size_bytes: int
+    ):
+        self.key = key
+        self.build_dir = build_dir
+        self.success = success
+        self.binary_path = binary_path
+        self.error = error
+        self.size_bytes = size_bytes
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+
+class CompileCache:
+    """
+    Content-addressed build cache keyed on sanitized source, compiler and flags.
+    Entries are evicted least-recently-used first once the disk budget is exceeded,
+    except pinned ones: an executor pins every entry it builds from or runs
+    until its cleanup(), so binaries, objects and .gcno files in use stay on disk.
+    Precompiled headers for common #include prefixes are kept alongside (self.pch),
+    as are the headers each project source includes (self.dependencies, see project_build.py).
+    Builds and compiler processes go through self.scheduler (compile_scheduler.py),
+    which merges identical in-flight builds and bounds concurrent compiles.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        index: Optional[Dict[str, CacheEntry]] = None,
+        scheduler: Optional[CompileScheduler] = None
+    ):
+        """
+        Initialize compile cache.
+
+        Args:
+            cache_dir: Directory holding one subdirectory per build.
+                       If None, uses a temporary directory.
+            max_bytes: Disk budget for all cached builds
+            index: Dict used as the in-memory index (insertion order = LRU order).
+                   Pass database.compiled_binaries to share it with the API.
+            scheduler: Coalesces builds and limits compiler processes.
+                   If None, allows one compiler per CPU.
+        """
+        if cache_dir:
+            self.cache_dir = Path(cache_dir).absolute()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            self.cache_dir = Path(tempfile.mkdtemp(prefix="compile_cache_"))
+
+        self.max_bytes = max_bytes
+        self.entries: Dict[str, CacheEntry] = index if index is not None else {}
+        self.total_bytes = sum(e.size_bytes for e in self.entries.values())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> number of executors using the entry
+        self._pins: Dict[str, int] = {}
+        self.scheduler = scheduler or CompileScheduler()
+        self.pch = PchStore(self.cache_dir / "pch", scheduler=self.scheduler)
+        self.dependencies = DependencyIndex()
+
+    @staticmethod
+    def make_key(source_code: str, compiler: str, flags: List[str]) -> str:
+        """Hash the build inputs into a stable cache key."""
+        h = hashlib.sha256()
+        for part in [compiler, *flags]:
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        h.update(source_code.encode('utf-8'))
+        return h.hexdigest()[:32]
+
+    def build_dir(self, key: str) -> Path:
+        """Directory where the build for this key is (or will be) stored."""
+        return self.cache_dir / key
+
+    def lookup(self, key: str, record_stats: bool = True, pin: bool = False) -> Optional[CacheEntry]:
+        """
+        Return the cached build for key (and mark it recently used), or None.
+        Pass record_stats=False for re-checks that should not count as a hit/miss,
+        and pin=True to pin a returned entry (see pin()).
+        """
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                if record_stats:
+                    self.misses += 1
+                return None
+            # Re-insert to move the entry to the most-recently-used end
+            self.entries[key] = entry
+            entry.last_used = time.time()
+            if record_stats:
+                self.hits += 1
+            if pin:
+                self._pins[key] = self._pins.get(key, 0) + 1
+            return entry
+
+    def store(self, key: str, success: bool, binary_path: str, error: str, pin: bool = False) -> CacheEntry:
+        """Record the outcome of a build (pinned if pin) and evict old entries if over budget."""
+        build_dir = self.build_dir(key)
+        size_bytes = 0
+        if build_dir.exists():
+            size_bytes = sum(f.stat().st_size for f in build_dir.rglob("*") if f.is_file())
+
+        entry = CacheEntry(key, build_dir, success, binary_path, error, size_bytes)
+
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size_bytes
+            self.entries[key] = entry
+            self.total_bytes += size_bytes
+            if pin:
+                self._pins[key] = self._pins.get(key, 0) + 1
+            self._evict(keep=key)
+
+        return entry
+
+    def pin(self, key: str) -> bool:
+        """
+        Keep key's entry from being evicted until a matching unpin().
+        Returns False (and pins nothing) if there is no such entry.
+        """
+        with self._lock:
+            if key not in self.entries:
+                return False
+            self._pins[key] = self._pins.get(key, 0) + 1
+            return True
+
+    def unpin(self, key: str):
+        """Release a pin; evicts entries that were only kept over budget by it."""
+        with self._lock:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+                self._evict()
+
+    def grow(self, key: str, extra_bytes: int):
+        """Account for files added to an entry's build_dir after it was stored (e.g. another link)."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry.size_bytes += extra_bytes
+            self.total_bytes += extra_bytes
+            self._evict(keep=key)
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        Drop least-recently-used unpinned entries until the cache fits its
+        budget. Caller holds the lock.
+        """
+        for key in list(self.entries.keys()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep or key in self._pins:
+                continue
+            entry = self.entries.pop(key)
+            self.total_bytes -= entry.size_bytes
+            self.evictions += 1
+            shutil.rmtree(entry.build_dir, ignore_errors=True)
+            print(f"[DEBUG] Evicted cached build {key} ({entry.size_bytes} bytes)")
+
+    def clear(self):
+        """Remove every cached build that is not pinned from disk and from the index."""
+        with self._lock:
+            for key in list(self.entries.keys()):
+                if key in self._pins:
+                    continue
+                entry = self.entries.pop(key)
+                self.total_bytes -= entry.size_bytes
+                shutil.rmtree(entry.build_dir, ignore_errors=True)
+        self.pch.clear()
+        self.dependencies.clear()
+
+    def stats(self) -> Dict[str, object]:
+        """Cache statistics for the /status endpoint."""
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "pinned": len(self._pins),
+                "precompiled_headers": self.pch.stats(),
+                "project_dependencies": self.dependencies.stats(),
+                "scheduler": self.scheduler.stats()
+            }
@@ -0,0 +1,150 @@
+"""
+F4: Compile Scheduler
+Sits between executors and the compiler. Identical builds requested while
+one is already running wait for it and share its result instead of
+starting their own g++ (the frontend and several API clients often submit
+the same source at once). Compiler processes run in a bounded number of
+slots; the rest queue in arrival order, so a burst of distinct sources
+cannot start dozens of compilers and no request is overtaken by later ones.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class BuildCancelled(Exception):
+    """Raised out of a build whose requester went away and whose compiler was killed."""
+
+
+class _Flight:
+    """A build in progress, and its outcome once it finishes."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class CompileScheduler:
+    """
+    Coalesces in-flight builds by key and limits concurrent compiler
+    processes to max_concurrent, admitting queued compiles first come,
+    first served. Slots are only held while a compiler process runs, never
+    while waiting for another build, so nested builds cannot deadlock.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None):
+        """
+        Initialize scheduler.
+
+        Args:
+            max_concurrent: Compiler processes allowed at once.
+                            If None, uses the number of CPUs.
+        """
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._queue: deque = deque()
+        self._flights: Dict[str, _Flight] = {}
+        self.running = 0
+        self.max_running = 0
+        self.max_queued = 0
+        self.compiles = 0
+        self.queued_compiles = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.builds = 0
+        self.coalesced = 0
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one compiler slot for the duration of the block, queueing until one is free."""
+        ticket = object()
+        started = time.monotonic()
+        with self._slot_freed:
+            self._queue.append(ticket)
+            queued = self._queue[0] is not ticket or self.running >= self.max_concurrent
+            if queued:
+                self.max_queued = max(self.max_queued, len(self._queue))
+                self.queued_compiles += 1
+            while self._queue[0] is not ticket or self.running >= self.max_concurrent:
+                self._slot_freed.wait()
+            self._queue.popleft()
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            waited = time.monotonic() - started
+            self.compiles += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            # The next ticket may fit in another free slot
+            self._slot_freed.notify_all()
+        try:
+            yield
+        finally:
+            with self._slot_freed:
+                self.running -= 1
+                self._slot_freed.notify_all()
+
+    def coalesce(self, key: str, build: Callable[[], Any]) -> Any:
+        """
+        Run build() unless a build for key is already in flight, in which
+        case wait for that one and return its result (or raise its exception).
+        Only in-flight builds are shared: the caller caches results, so a
+        build that finished earlier is not remembered here. A waiter whose
+        build was cancelled by its own requester starts the build itself.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.builds += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                break
+            print(f"[DEBUG] Waiting for in-flight build: {key}")
+            flight.done.wait()
+            if isinstance(flight.error, BuildCancelled):
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = build()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, object]:
+        """Statistics for the /status endpoint."""
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "running": self.running,
+                "queued": len(self._queue),
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "compiles": self.compiles,
+                "queued_compiles": self.queued_compiles,
+                "wait_seconds": {
+                    "total": round(self.wait_seconds, 3),
+                    "mean": round(self.wait_seconds / self.compiles, 4) if self.compiles else 0.0,
+                    "max": round(self.max_wait_seconds, 3)
+                },
+                "in_flight": len(self._flights),
+                "builds": self.builds,
+                "coalesced": self.coalesced
+            }
@@ -5,4 +5,4 @@ fitness_evaluations = {}       # Stores fitness evaluation results (F3)
 test_executions = {}           # Stores test execution results (F4)
 fault_analyses = {}            # Stores fault localization results (F5)
 generated_reports = {}         # Stores generated reports (F6)
-compiled_binaries = {}         # Stores paths to compiled test binaries
\ No newline at end of file
+compiled_binaries = {}         # Index of the F4 compile cache (key -> CacheEntry, LRU order)
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+F4: Differential Oracle
+Expected outputs from a reference implementation instead of client-side
+guesses. The reference runs on every input first; its outputs become the
+expected outputs of the program under test, so a whole population gets
+pass/fail verdicts from one call.
+
+Both programs run batched, by default in a fork-server harness each (a
+fresh process per input, forked from one that has already started), but
+not in one process: each defines its own main() and usually the same functions.
+Reference runs skip coverage and go through the result cache like any
+other run, so re-checking a population against the same reference only
+runs the program under test.
+"""
+
+from typing import Any, List, Optional
+
+from models import DifferentialTestOutput, TestExecutionOutput
+from batch_executor import ParallelBatchExecutor
+from resource_usage import UsageSummary
+
+
+# "passed": same output (or the same failure) as the reference
+# "failed": different output, a crash the reference does not have, or a timeout
+# "undecided": the reference itself did not finish or its output was cut off
+VERDICTS = ["passed", "failed", "undecided"]
+
+_TRUNCATED_STDOUT = "[stdout truncated"
+
+
+def reference_expectation(reference: TestExecutionOutput) -> Optional[str]:
+    """Expected output a reference run sets, or None if it sets none."""
+    if reference.execution_status != "passed" or _TRUNCATED_STDOUT in (reference.error or ""):
+        return None
+    return reference.output
+
+
+def verdict(result: TestExecutionOutput, reference: TestExecutionOutput) -> str:
+    """
+    Verdict on one run of the program under test, which was checked
+    against reference_expectation(reference).
+    """
+    if reference.execution_status == "error" or _TRUNCATED_STDOUT in (reference.error or ""):
+        return "undecided"
+    if result.execution_status == "error":
+        return "failed"
+    if reference.execution_status == "passed":
+        return result.execution_status
+    # The reference exits non-zero on this input; the program should too
+    if result.execution_status == "failed" and result.output == reference.output:
+        return "passed"
+    return "failed"
+
+
+class DifferentialOracle:
+    """
+    Runs a program under test against a reference implementation on a
+    ParallelBatchExecutor.
+    """
+
+    def __init__(self, batch_executor: ParallelBatchExecutor):
+        """
+        Initialize oracle.
+
+        Args:
+            batch_executor: Runs both programs (its caches are shared with other batches)
+        """
+        self.batch_executor = batch_executor
+
+    def reference_results(
+        self,
+        reference_code: str,
+        test_inputs_list: List[List[Any]],
+        mode: str = "forkserver",
+        timeout: Optional[float] = None,
+        build_profile: Optional[str] = None,
+        cache_results: bool = True,
+        input_protocol: str = "text",
+        usage: Optional[UsageSummary] = None
+    ) -> List[TestExecutionOutput]:
+        """
+        Run the reference on every input, without coverage (counting the runs in usage).
+
+        Raises:
+            ValueError: If the reference does not compile
+        """
+        results = self.batch_executor.execute(
+            reference_code, test_inputs_list, mode=mode, timeout=timeout,
+            build_profile=build_profile, cache_results=cache_results,
+            input_protocol=input_protocol, collect_coverage=False, usage=usage
+        )
+        failed_build = next(
+            (r for r in results if r.execution_status == "error" and (r.error or "").startswith("Compilation failed")),
+            None
+        )
+        if failed_build is not None:
+            raise ValueError(f"Reference implementation: {failed_build.error}")
+        return results
+
+    def execute(
+        self,
+        source_code: str,
+        reference_code: str,
+        test_inputs_list: List[List[Any]],
+        mode: str = "forkserver",
+        timeout: Optional[float] = None,
+        coverage_backend: str = "gcov",
+        coverage_scope: str = "all",
+        build_profile: Optional[str] = None,
+        run_mode: str = "coverage",
+        cache_results: bool = True,
+        input_protocol: str = "text"
+    ) -> DifferentialTestOutput:
+        """
+        Run the reference, then the program under test with the reference's
+        outputs as expected outputs (arguments as in ParallelBatchExecutor.execute;
+        the reference is built with the same mode, profile and input protocol).
+
+        Returns:
+            DifferentialTestOutput with one result and verdict per input, in input
+            order, and the resource usage of both programs' runs
+
+        Raises:
+            ValueError: If the reference does not compile
+        """
+        usage = UsageSummary()
+        references = self.reference_results(
+            reference_code, test_inputs_list, mode, timeout, build_profile,
+            cache_results, input_protocol, usage
+        )
+        results = self.batch_executor.execute(
+            source_code, test_inputs_list,
+            expected_outputs=[reference_expectation(r) for r in references],
+            mode=mode, timeout=timeout, coverage_backend=coverage_backend,
+            coverage_scope=coverage_scope, build_profile=build_profile,
+            run_mode=run_mode, cache_results=cache_results, input_protocol=input_protocol,
+            usage=usage
+        )
+        verdicts = [verdict(result, reference) for result, reference in zip(results, references)]
+        print(
+            f"[DEBUG] Differential run of {len(verdicts)} tests: {verdicts.count('passed')} passed, "
+            f"{verdicts.count('failed')} failed, {verdicts.count('undecided')} undecided"
+        )
+        return DifferentialTestOutput(
+            results=results,
+            reference_results=references,
+            verdicts=verdicts,
+            passed=verdicts.count("passed"),
+            failed=verdicts.count("failed"),
+            undecided=verdicts.count("undecided"),
+            resource_usage=usage.summary(self.batch_executor.max_workers)
+        )
@@ -0,0 +1,74 @@
+"""
+F4: Dual Builds
+Run modes that trade coverage for speed. Next to the instrumented build,
+a program can have an optimized build without coverage; runs that only
+need a verdict (or whose coverage is already known) use that build.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+from models import GCovData
+
+
+# "coverage": every input runs on the instrumented build (default)
+# "fast": every input runs on the uninstrumented build; results carry no coverage
+# "auto": only inputs whose coverage is not known yet run instrumented; the
+#         others run fast and get the coverage recorded for them earlier
+RUN_MODES = ["coverage", "fast", "auto"]
+
+# Uninstrumented build (the build profile's compiler and link flags are added)
+FAST_FLAGS = ["-O2"]
+
+
+class CoverageMemo:
+    """
+    Coverage of earlier instrumented runs, per (program, input).
+
+    Programs are assumed to be deterministic: the same input always takes
+    the same path, so its coverage only has to be measured once. Entries
+    are dropped least recently used first beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, program_key: str, input_str: Union[str, bytes]) -> Optional[tuple[List[GCovData], List[str]]]:
+        """(coverage_data, branches_taken) recorded for the input, or None."""
+        with self._lock:
+            entry = self._entries.get((program_key, input_str))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((program_key, input_str))
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        program_key: str,
+        input_str: Union[str, bytes],
+        coverage_data: List[GCovData],
+        branches_taken: List[str]
+    ):
+        """Record the coverage of an instrumented run that finished."""
+        with self._lock:
+            self._entries[(program_key, input_str)] = (coverage_data, branches_taken)
+            self._entries.move_to_end((program_key, input_str))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all recorded coverage."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Statistics for the /status endpoint."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,405 @@
+"""
+F4: Function Harness
+Test drivers for sources that define only the function under test. The
+generated main() reads one input per parameter from stdin, calls the
+function and prints what it returns, so users submit a bare function with
+no hand-written I/O code.
+
+The driver is an ordinary main(): it runs as a single-shot process, and the
+persistent and fork-server harnesses (harness.py) wrap it like any other
+program. It is appended after the submitted code, so line numbers do not
+move, and it is never instrumented, so coverage only shows the user's code.
+"""
+
+import functools
+import re
+from typing import Any, Dict, List, Optional
+
+from cfg_parser import find_function_definitions
+from input_protocol import RECORDS_SOURCE
+
+
+_INTEGER_TYPES = {
+    "short", "short int", "unsigned short", "unsigned short int",
+    "int", "signed", "signed int", "unsigned", "unsigned int",
+    "long", "long int", "unsigned long", "unsigned long int",
+    "long long", "long long int", "unsigned long long", "unsigned long long int",
+    "size_t", "int16_t", "int32_t", "int64_t", "uint16_t", "uint32_t", "uint64_t"
+}
+_FLOAT_TYPES = {"float", "double", "long double"}
+_SCALAR_TYPES = _INTEGER_TYPES | _FLOAT_TYPES | {"bool", "char", "std::string"}
+
+
+def value_type(declared: str) -> Optional[str]:
+    """
+    The type a driver declares for a parameter or return value of the given
+    declared type (const, references and std:: qualifiers of numeric types
+    dropped), or None if the driver can't read or print it.
+
+    Supported: integers, float/double, bool, char, std::string and
+    std::vector of those.
+    """
+    text = re.sub(r'\b(const|volatile)\b|&', ' ', declared)
+    text = re.sub(r'\s*([<>,]|::)\s*', r'\1', ' '.join(text.split()))
+    text = re.sub(r'^std::(?!string|vector)', '', text)
+    if text == "string":
+        text = "std::string"
+    if text in _SCALAR_TYPES:
+        return text
+    vector = re.fullmatch(r'(?:std::)?vector<(.+)>', text)
+    if vector:
+        element = value_type(vector.group(1))
+        if element in _SCALAR_TYPES:
+            return f"std::vector<{element}>"
+    return None
+
+
+# Parsing and printing helpers; TCG_DRIVER marks them uninstrumented
+_DRIVER_HELPERS = r'''
+#include <cctype>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <sstream>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace tcg_driver {
+
+TCG_DRIVER void parse(const std::string& text, std::string& out) { out = text; }
+TCG_DRIVER void parse(const std::string& text, char& out) { out = text.empty() ? '\0' : text[0]; }
+TCG_DRIVER void parse(const std::string& text, bool& out) {
+    out = text == "true" || text == "True" || strtod(text.c_str(), nullptr) != 0;
+}
+template <typename T> TCG_DRIVER void parse(const std::string& text, T& out) {
+    std::istringstream in(text);
+    in >> out;
+}
+TCG_DRIVER void put_utf8(std::string& out, unsigned long cp) {
+    if (cp < 0x80) {
+        out += (char)cp;
+    } else if (cp < 0x800) {
+        out += (char)(0xc0 | cp >> 6);
+        out += (char)(0x80 | (cp & 0x3f));
+    } else if (cp < 0x10000) {
+        out += (char)(0xe0 | cp >> 12);
+        out += (char)(0x80 | (cp >> 6 & 0x3f));
+        out += (char)(0x80 | (cp & 0x3f));
+    } else {
+        out += (char)(0xf0 | cp >> 18);
+        out += (char)(0x80 | (cp >> 12 & 0x3f));
+        out += (char)(0x80 | (cp >> 6 & 0x3f));
+        out += (char)(0x80 | (cp & 0x3f));
+    }
+}
+
+// Items of a list as Python prints it: "[1, 2.5, True]", "['a', 'b c']".
+// Quoted items lose their quotes and escapes; brackets are ignored.
+TCG_DRIVER std::vector<std::string> list_items(const std::string& text) {
+    std::vector<std::string> items;
+    std::string item;
+    bool have = false;
+    for (size_t k = 0; k < text.size(); k++) {
+        char c = text[k];
+        if (c == '\'' || c == '"') {
+            for (k++; k < text.size() && text[k] != c; k++) {
+                if (text[k] != '\\' || k + 1 == text.size()) {
+                    item += text[k];
+                    continue;
+                }
+                char e = text[++k];
+                size_t digits = e == 'x' ? 2 : e == 'u' ? 4 : e == 'U' ? 8 : 0;
+                if (digits && k + digits < text.size()) {
+                    put_utf8(item, strtoul(text.substr(k + 1, digits).c_str(), nullptr, 16));
+                    k += digits;
+                } else {
+                    item += e == 'n' ? '\n' : e == 't' ? '\t' : e == 'r' ? '\r' : e;
+                }
+            }
+            have = true;
+        } else if (c == '[' || c == ']' || c == ',' || isspace((unsigned char)c)) {
+            if (have) items.push_back(item);
+            item.clear();
+            have = false;
+        } else {
+            item += c;
+            have = true;
+        }
+    }
+    if (have) items.push_back(item);
+    return items;
+}
+
+// "[1, 2, 3]" / "['a', 'b']" (the text protocol's form) or "3 1 2 3" (length, then elements)
+template <typename T> TCG_DRIVER void parse(const std::string& text, std::vector<T>& out) {
+    out.clear();
+    std::vector<std::string> items;
+    if (text.find('[') != std::string::npos) {
+        items = list_items(text);
+    } else {
+        std::istringstream in(text);
+        size_t n = 0;
+        std::string item;
+        in >> n;
+        while (items.size() < n && in >> item) items.push_back(item);
+    }
+    for (const std::string& item : items) {
+        T value{};
+        parse(item, value);
+        out.push_back(value);
+    }
+}
+
+TCG_DRIVER void print(const std::string& v) { std::cout << v; }
+TCG_DRIVER void print(char v) { std::cout << v; }
+TCG_DRIVER void print(bool v) { std::cout << (v ? "true" : "false"); }
+// Floats print as the shortest text that reads back as the same value
+TCG_DRIVER void print(float v) {
+    char buf[64];
+    for (int precision = 1; precision <= 9; precision++) {
+        snprintf(buf, sizeof buf, "%.*g", precision, (double)v);
+        if (strtof(buf, nullptr) == v) break;
+    }
+    std::cout << buf;
+}
+TCG_DRIVER void print(double v) {
+    char buf[64];
+    for (int precision = 1; precision <= 17; precision++) {
+        snprintf(buf, sizeof buf, "%.*g", precision, v);
+        if (strtod(buf, nullptr) == v) break;
+    }
+    std::cout << buf;
+}
+TCG_DRIVER void print(long double v) {
+    char buf[64];
+    for (int precision = 1; precision <= 21; precision++) {
+        snprintf(buf, sizeof buf, "%.*Lg", precision, v);
+        if (strtold(buf, nullptr) == v) break;
+    }
+    std::cout << buf;
+}
+template <typename T> TCG_DRIVER void print(const T& v) { std::cout << v; }
+template <typename T> TCG_DRIVER void print(const std::vector<T>& v) {
+    for (size_t i = 0; i < v.size(); i++) {
+        if (i) std::cout << ' ';
+        print((T)v[i]);
+    }
+}
+
+TCG_DRIVER int missing(int index, int count) {
+    fprintf(stderr, "Missing input %d of %d on stdin\n", index, count);
+    return 2;
+}
+
+}  // namespace tcg_driver
+'''
+
+
+# Typed reads of binary inputs (input_protocol.py). A record whose type
+# matches the parameter goes straight into it; any other record is parsed
+# from its text form, as the text protocol would deliver it.
+_TYPED_READERS = RECORDS_SOURCE + r'''
+#include <limits>
+#include <type_traits>
+
+extern "C" int tcg_typed_input;
+extern "C" const unsigned char* tcg_input_next;
+extern "C" const unsigned char* tcg_input_end;
+
+namespace tcg_driver {
+
+// Before main(): the prologue keeps the records instead of rendering stdin
+TCG_DRIVER __attribute__((constructor)) void typed_input() { tcg_typed_input = 1; }
+
+template <typename T> TCG_DRIVER bool fits(int64_t v, std::true_type /* integral */) {
+    if (std::is_signed<T>::value) {
+        return v >= (int64_t)std::numeric_limits<T>::min() && v <= (int64_t)std::numeric_limits<T>::max();
+    }
+    return v >= 0 && (uint64_t)v <= (uint64_t)std::numeric_limits<T>::max();
+}
+template <typename T> TCG_DRIVER bool fits(int64_t, std::false_type) { return true; }
+
+template <typename T> TCG_DRIVER bool from_int(int64_t v, T& out) {
+    bool ok = fits<T>(v, std::is_integral<T>());
+    if (ok) out = (T)v;
+    return ok;
+}
+TCG_DRIVER bool from_int(int64_t v, bool& out) { out = v != 0; return true; }
+TCG_DRIVER bool from_int(int64_t, char&) { return false; }
+TCG_DRIVER bool from_int(int64_t, std::string&) { return false; }
+
+template <typename T> TCG_DRIVER bool from_double(double v, T& out) {
+    if (std::is_floating_point<T>::value) out = (T)v;
+    return std::is_floating_point<T>::value;
+}
+TCG_DRIVER bool from_double(double, bool&) { return false; }
+TCG_DRIVER bool from_double(double, char&) { return false; }
+TCG_DRIVER bool from_double(double, std::string&) { return false; }
+
+template <typename T> TCG_DRIVER bool from_bool(bool, T&) { return false; }
+TCG_DRIVER bool from_bool(bool v, bool& out) { out = v; return true; }
+
+template <typename T> TCG_DRIVER bool from_string(const unsigned char*, uint32_t, T&) { return false; }
+TCG_DRIVER bool from_string(const unsigned char* s, uint32_t n, char& out) { out = n ? (char)s[0] : '\0'; return true; }
+TCG_DRIVER bool from_string(const unsigned char* s, uint32_t n, std::string& out) {
+    out.assign((const char*)s, n);
+    return true;
+}
+
+template <typename T> TCG_DRIVER bool read_text(tcg_input::Reader& r, T& out, int depth) {
+    std::string text;
+    if (!tcg_input::render(r, text, depth)) return false;
+    parse(text, out);
+    return true;
+}
+
+// Records were checked by the prologue, so they are read without bounds checks
+template <typename T> TCG_DRIVER bool read(tcg_input::Reader& r, T& out, int depth) {
+    const unsigned char* p = r.p;
+    int64_t i;
+    double d;
+    uint32_t n;
+    bool direct = false;
+    if (*p == 'i') {
+        memcpy(&i, p + 1, 8);
+        direct = from_int(i, out);
+        r.p += direct ? 9 : 0;
+    } else if (*p == 'd') {
+        memcpy(&d, p + 1, 8);
+        direct = from_double(d, out);
+        r.p += direct ? 9 : 0;
+    } else if (*p == 'b') {
+        direct = from_bool(p[1] != 0, out);
+        r.p += direct ? 2 : 0;
+    } else if (*p == 's') {
+        memcpy(&n, p + 1, 4);
+        direct = from_string(p + 5, n, out);
+        r.p += direct ? 5 + n : 0;
+    }
+    return direct || read_text(r, out, depth);
+}
+
+template <typename T> TCG_DRIVER bool read(tcg_input::Reader& r, std::vector<T>& out, int depth) {
+    const unsigned char* start = r.p;
+    unsigned char tag = *r.p;
+    if (tag == 'I' || tag == 'D' || tag == 'L') {
+        uint32_t n;
+        memcpy(&n, r.p + 1, 4);
+        r.p += 5;
+        out.assign(n, T());
+        bool direct = true;
+        for (uint32_t k = 0; k < n && direct; k++) {
+            T value{};
+            if (tag == 'L') {
+                direct = read(r, value, depth + 1);
+            } else if (tag == 'I') {
+                int64_t v;
+                memcpy(&v, r.p, 8);
+                r.p += 8;
+                direct = from_int(v, value);
+            } else {
+                double v;
+                memcpy(&v, r.p, 8);
+                r.p += 8;
+                direct = from_double(v, value);
+            }
+            out[k] = value;
+        }
+        if (direct) return true;
+        r.p = start;
+    }
+    return read_text(r, out, depth);
+}
+
+}  // namespace tcg_driver
+'''
+
+
+def target_function(definitions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The function a generated driver calls: the last one defined, as helpers
+    come before the functions that use them. None if the source has its own
+    main() or defines no function.
+    """
+    if not definitions or any(d["name"] == "main" for d in definitions):
+        return None
+    return definitions[-1]
+
+
+def generate_driver(target: Dict[str, Any], attribute: str = "", typed_input: bool = False) -> str:
+    """
+    C++ source of a main() that calls target (a cfg_parser.find_function_definitions
+    entry). Input k (line k of stdin) becomes argument k; the return value
+    is printed on one line. Signatures the driver can't handle produce an
+    #error naming the parameter.
+
+    Args:
+        attribute: Put on every driver function to keep it uninstrumented
+        typed_input: Read the inputs as binary records (for builds that
+                     take the binary input protocol) instead of stdin lines
+    """
+    lines = [
+        "",
+        "// Test driver generated for a source without main() (function_harness.py)",
+        f"#define TCG_DRIVER {attribute.strip()} static",
+        _DRIVER_HELPERS
+    ]
+    if typed_input:
+        lines.append(_TYPED_READERS)
+
+    params = target["params"]
+    arg_types = [value_type(declared) for declared, _ in params]
+    unsupported = [
+        f"{declared} {name}".strip()
+        for (declared, name), arg_type in zip(params, arg_types) if arg_type is None
+    ]
+    returns_value = target["return_type"] != "void"
+    if returns_value and value_type(target["return_type"]) is None:
+        unsupported.append(f"return type {target['return_type']}")
+    if unsupported:
+        problems = ", ".join(unsupported).replace('"', "'")
+        lines.append(f'#error "Cannot generate a test driver for {target["name"]}: unsupported {problems}"')
+        return "\n".join(lines) + "\n"
+
+    if typed_input:
+        body = ["    tcg_input::Reader in{tcg_input_next, tcg_input_end};"]
+    else:
+        body = ["    std::string line;"]
+    args = []
+    for k, ((declared, _), arg_type) in enumerate(zip(params, arg_types)):
+        body.append(f"    {arg_type} arg{k}{{}};")
+        if typed_input:
+            body.append(f"    if (in.p == in.end) return tcg_driver::missing({k + 1}, {len(params)});")
+            body.append(f"    tcg_driver::read(in, arg{k}, 0);")
+        else:
+            body.append(f"    if (!std::getline(std::cin, line)) return tcg_driver::missing({k + 1}, {len(params)});")
+            body.append(f"    tcg_driver::parse(line, arg{k});")
+        args.append(f"std::move(arg{k})" if "&&" in declared else f"arg{k}")
+    call = f"{target['qualified_name']}({', '.join(args)})"
+    if returns_value:
+        body.append(f"    tcg_driver::print({call});")
+        body.append("    std::cout << std::endl;")
+    else:
+        body.append(f"    {call};")
+    body.append("    return 0;")
+
+    lines.append(f"{attribute}int main() {{")
+    lines.extend(body)
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+@functools.lru_cache(maxsize=256)
+def with_generated_main(source_code: str, attribute: str = "", typed_input: bool = False) -> str:
+    """
+    source_code followed by a generated driver if it has no main() of its
+    own (see generate_driver); other sources are returned unchanged.
+    """
+    target = target_function(find_function_definitions(source_code))
+    if target is None:
+        return source_code
+    print(f"[DEBUG] No main() in source - generating a test driver for {target['qualified_name']}")
+    return source_code.rstrip("\n") + "\n" + generate_driver(target, attribute, typed_input)
@@ -0,0 +1,425 @@
+"""
+F4: Native gcov Reader
+Decodes GCC's .gcno (flow graph) and .gcda (arc counter) files directly, so
+line and arc coverage can be computed without running the gcov binary.
+
+Supports the GCC 12+ on-disk format (record lengths in bytes, unpadded
+strings). Older files raise GcovFormatError so callers can fall back to gcov.
+"""
+
+import functools
+import struct
+from pathlib import Path
+from typing import Callable, List, Dict, Optional
+
+
+GCOV_NOTE_MAGIC = 0x67636e6f  # "gcno"
+GCOV_DATA_MAGIC = 0x67636461  # "gcda"
+
+TAG_FUNCTION = 0x01000000
+TAG_BLOCKS = 0x01410000
+TAG_ARCS = 0x01430000
+TAG_LINES = 0x01450000
+TAG_COUNTER_ARCS = 0x01a10000
+
+ARC_ON_TREE = 1  # Count not instrumented; solved from flow conservation
+ARC_FAKE = 2     # Call that may not return (exit(), throw)
+
+ENTRY_BLOCK = 0
+EXIT_BLOCK = 1
+
+
+class GcovFormatError(ValueError):
+    """The file is not a .gcno/.gcda file this reader understands."""
+
+
+class _Reader:
+    """Little-endian record stream over the bytes of a .gcno/.gcda file."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def at_end(self) -> bool:
+        return self.pos + 8 > len(self.data)
+
+    def u32(self) -> int:
+        value, = struct.unpack_from("<I", self.data, self.pos)
+        self.pos += 4
+        return value
+
+    def i32(self) -> int:
+        value, = struct.unpack_from("<i", self.data, self.pos)
+        self.pos += 4
+        return value
+
+    def counters(self, n: int) -> List[int]:
+        values = struct.unpack_from(f"<{n}q", self.data, self.pos)
+        self.pos += 8 * n
+        return list(values)
+
+    def string(self) -> Optional[str]:
+        length = self.u32()
+        if not length:
+            return None
+        raw = self.data[self.pos:self.pos + length]
+        self.pos += length
+        return raw.rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+def _open(data: bytes, magic: int) -> _Reader:
+    """Check magic and version; returns a reader positioned after the header."""
+    reader = _Reader(data)
+    if len(data) < 16 or reader.u32() != magic:
+        raise GcovFormatError("bad magic")
+    version = reader.u32().to_bytes(4, "big")  # e.g. b"B22*" for GCC 12.2
+    major = (version[0] - ord("A")) * 10 + (version[1] - ord("0"))
+    if major < 12:
+        raise GcovFormatError(f"unsupported gcov format version {version!r}")
+    return reader
+
+
+class FunctionGraph:
+    """Flow graph of one function, with the lookups line counting needs."""
+
+    def __init__(self, ident: int, name: str, artificial: bool, source_file: str):
+        self.ident = ident
+        self.name = name
+        self.artificial = artificial  # Compiler-generated (static initializers); gcov hides these
+        self.source_file = source_file
+        self.n_blocks = 0
+        self.arcs: List[tuple[int, int, int]] = []  # (src, dst, flags), file order
+        self.block_lines: Dict[int, List[tuple[str, int]]] = {}
+
+    def finish(self):
+        """Precompute adjacency and line/block maps once per graph."""
+        self.succ: List[List[int]] = [[] for _ in range(self.n_blocks)]
+        self.pred: List[List[int]] = [[] for _ in range(self.n_blocks)]
+        for a, (src, dst, _) in enumerate(self.arcs):
+            self.succ[src].append(a)
+            self.pred[dst].append(a)
+
+        # Counters exist only for arcs off the spanning tree, in arc order
+        self.counted_arcs = [
+            a for a, (_, _, flags) in enumerate(self.arcs) if not flags & ARC_ON_TREE
+        ]
+
+        # As in gcov, a block is "on" the last line it maps to; other lines
+        # it touches just add its count
+        self.line_blocks: Dict[tuple[str, int], List[int]] = {}
+        self.touched_lines: Dict[tuple[str, int], List[int]] = {}
+        for block, locations in self.block_lines.items():
+            for location in locations:
+                self.touched_lines.setdefault(location, []).append(block)
+            if locations:
+                self.line_blocks.setdefault(locations[-1], []).append(block)
+
+        # Arcs reported as branches: non-fake arcs out of blocks with more
+        # than one non-fake successor, listed by destination block like gcov
+        self.branch_arcs: Dict[int, List[int]] = {}
+        for block in range(self.n_blocks):
+            real = sorted(
+                (a for a in self.succ[block] if not self.arcs[a][2] & ARC_FAKE),
+                key=lambda a: self.arcs[a][1]
+            )
+            if len(real) > 1:
+                self.branch_arcs[block] = real
+
+
+class GcnoGraph:
+    """Parsed .gcno file: stamp plus one FunctionGraph per instrumented function."""
+
+    def __init__(self, stamp: int, functions: Dict[int, FunctionGraph]):
+        self.stamp = stamp
+        self.functions = functions
+
+    def source_path(self, source_name: str) -> Optional[str]:
+        """Full path recorded for the source file named source_name."""
+        for fn in self.functions.values():
+            for locations in fn.block_lines.values():
+                for file_name, _ in locations:
+                    if Path(file_name).name == source_name:
+                        return file_name
+        return None
+
+
+def read_gcno(path: str) -> GcnoGraph:
+    """Parse a .gcno file."""
+    reader = _open(Path(path).read_bytes(), GCOV_NOTE_MAGIC)
+    stamp = reader.u32()
+    reader.u32()     # checksum
+    reader.string()  # compilation directory
+    reader.u32()     # supports unexecuted-block flags
+
+    functions: Dict[int, FunctionGraph] = {}
+    fn: Optional[FunctionGraph] = None
+    while not reader.at_end():
+        tag = reader.u32()
+        length = reader.u32()
+        end = reader.pos + length
+        if tag == TAG_FUNCTION:
+            ident = reader.u32()
+            reader.u32()  # lineno checksum
+            reader.u32()  # cfg checksum
+            name = reader.string() or ""
+            artificial = bool(reader.u32())
+            fn = FunctionGraph(ident, name, artificial, reader.string() or "")
+            functions[ident] = fn
+        elif fn is None:
+            pass
+        elif tag == TAG_BLOCKS:
+            fn.n_blocks = reader.u32()
+        elif tag == TAG_ARCS:
+            src = reader.u32()
+            while reader.pos < end:
+                dst = reader.u32()
+                flags = reader.u32()
+                fn.arcs.append((src, dst, flags))
+        elif tag == TAG_LINES:
+            block = reader.u32()
+            locations = fn.block_lines.setdefault(block, [])
+            file_name = fn.source_file
+            while reader.pos < end:
+                line = reader.u32()
+                if line:
+                    locations.append((file_name, line))
+                    continue
+                file_name = reader.string()
+                if file_name is None:
+                    break
+        reader.pos = end
+
+    for fn in functions.values():
+        fn.finish()
+    return GcnoGraph(stamp, functions)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_gcno(path: str, mtime_ns: int, size: int) -> GcnoGraph:
+    return read_gcno(path)
+
+
+def load_gcno(path: str) -> GcnoGraph:
+    """
+    Parse a .gcno file once; later calls for the same (unchanged) file reuse
+    the graph, so each run only pays for reading its counters.
+    """
+    resolved = Path(path).resolve()
+    stat = resolved.stat()
+    return _load_gcno(str(resolved), stat.st_mtime_ns, stat.st_size)
+
+
+def read_gcda(path: str) -> tuple[int, Dict[int, List[int]]]:
+    """
+    Parse a .gcda file.
+
+    Returns:
+        (stamp, arc counters per function ident)
+    """
+    reader = _open(Path(path).read_bytes(), GCOV_DATA_MAGIC)
+    stamp = reader.u32()
+    reader.u32()  # checksum
+
+    counters: Dict[int, List[int]] = {}
+    ident: Optional[int] = None
+    while not reader.at_end():
+        tag = reader.u32()
+        length = reader.i32()
+        if tag == TAG_COUNTER_ARCS and ident is not None:
+            if length < 0:
+                # All-zero counter arrays are stored as a negative length only
+                counters[ident] = [0] * (-length // 8)
+                continue
+            counters[ident] = reader.counters(length // 8)
+            continue
+        end = reader.pos + max(length, 0)
+        if tag == TAG_FUNCTION:
+            ident = reader.u32() if length else None
+        reader.pos = end
+    return stamp, counters
+
+
+def _solve_flow(fn: FunctionGraph, counts: List[int]) -> tuple[List[int], List[int]]:
+    """
+    Derive every arc and block count from the instrumented arcs, using flow
+    conservation (in = block = out). Entry and exit carry the same count,
+    as they are joined when GCC builds the spanning tree.
+    """
+    arc_counts: List[Optional[int]] = [None] * len(fn.arcs)
+    for a, count in zip(fn.counted_arcs, counts):
+        arc_counts[a] = count
+    block_counts: List[Optional[int]] = [None] * fn.n_blocks
+
+    changed = True
+    while changed:
+        changed = False
+        for block in range(fn.n_blocks):
+            outs, ins = fn.succ[block], fn.pred[block]
+            if block_counts[block] is None:
+                if outs and all(arc_counts[a] is not None for a in outs):
+                    block_counts[block] = sum(arc_counts[a] for a in outs)
+                elif ins and all(arc_counts[a] is not None for a in ins):
+                    block_counts[block] = sum(arc_counts[a] for a in ins)
+                elif block in (ENTRY_BLOCK, EXIT_BLOCK) and fn.n_blocks > 1:
+                    block_counts[block] = block_counts[ENTRY_BLOCK + EXIT_BLOCK - block]
+                if block_counts[block] is None:
+                    continue
+                changed = True
+            for arcs in (outs, ins):
+                unknown = [a for a in arcs if arc_counts[a] is None]
+                if len(unknown) == 1:
+                    known = sum(arc_counts[a] for a in arcs if arc_counts[a] is not None)
+                    arc_counts[unknown[0]] = block_counts[block] - known
+                    changed = True
+
+    if any(count is None for count in block_counts):
+        raise GcovFormatError(f"flow graph of {fn.name} could not be solved")
+    return [count or 0 for count in arc_counts], block_counts
+
+
+def _cycles_count(fn: FunctionGraph, blocks: List[int], cs_count: Dict[int, int]) -> int:
+    """
+    Count of loops entirely on one line: walk the elementary circuits among
+    the line's blocks and take each one's minimum remaining arc count (the
+    same circuit search gcov uses).
+    """
+    on_line = set(blocks)
+    total = 0
+
+    def circuit(block: int, start: int, path: List[int], visited: set):
+        nonlocal total
+        for a in fn.succ[block]:
+            dst = fn.arcs[a][1]
+            if dst < start or dst not in on_line or cs_count[a] <= 0:
+                continue
+            path.append(a)
+            if dst == start:
+                cycle = min(cs_count[p] for p in path)
+                for p in path:
+                    cs_count[p] -= cycle
+                total += cycle
+            elif dst not in visited:
+                visited.add(dst)
+                circuit(dst, start, path, visited)
+                visited.discard(dst)
+            path.pop()
+
+    for start in blocks:
+        circuit(start, start, [], {start})
+    return total
+
+
+def files_coverage(
+    graph: GcnoGraph,
+    counters: Dict[int, List[int]],
+    keep: Callable[[str], bool]
+) -> Dict[str, tuple[Dict[int, int], Dict[int, List[int]]]]:
+    """
+    Line and branch counts per recorded source file for which keep(file)
+    is true, summed over functions.
+
+    Returns:
+        {file: (execution count per line, taken count per branch arc per line)}
+    """
+    files: Dict[str, tuple[Dict[int, int], Dict[int, List[int]]]] = {}
+
+    for ident, fn in graph.functions.items():
+        if fn.artificial:
+            continue
+        solved = None
+
+        for (file_name, line), touching in fn.touched_lines.items():
+            if not keep(file_name):
+                continue
+            if solved is None:
+                solved = _solve_flow(fn, counters.get(ident, []))
+                arc_counts, block_counts = solved
+                cs_count = dict(enumerate(arc_counts))
+            line_counts, branch_counts = files.setdefault(file_name, ({}, {}))
+            blocks = fn.line_blocks.get((file_name, line))
+            if blocks:
+                # Entries into the line's blocks from elsewhere, plus loops on the line
+                count = sum(
+                    arc_counts[a]
+                    for block in blocks for a in fn.pred[block]
+                    if fn.arcs[a][0] not in blocks
+                )
+                count += _cycles_count(fn, blocks, cs_count)
+                for block in blocks:
+                    branch_counts.setdefault(line, []).extend(
+                        arc_counts[a] for a in fn.branch_arcs.get(block, [])
+                    )
+            else:
+                count = sum(block_counts[block] for block in touching)
+            line_counts[line] = line_counts.get(line, 0) + count
+            branch_counts.setdefault(line, [])
+
+    return files
+
+
+def line_coverage(
+    graph: GcnoGraph,
+    counters: Dict[int, List[int]],
+    source_name: str
+) -> tuple[Dict[int, int], Dict[int, List[int]]]:
+    """
+    Line and branch counts for one source file, summed over functions.
+
+    Returns:
+        (execution count per line, taken count per branch arc per line)
+    """
+    line_counts: Dict[int, int] = {}
+    branch_counts: Dict[int, List[int]] = {}
+    for lines, branches in files_coverage(graph, counters, lambda f: Path(f).name == source_name).values():
+        for line, count in lines.items():
+            line_counts[line] = line_counts.get(line, 0) + count
+        for line, counts in branches.items():
+            branch_counts.setdefault(line, []).extend(counts)
+    return line_counts, branch_counts
+
+
+def read_coverage(
+    gcno_path: str,
+    gcda_path: str,
+    source_name: str
+) -> tuple[Optional[str], Dict[int, int], Dict[int, List[int]]]:
+    """
+    Line and branch counts of one run, read straight from its .gcno/.gcda.
+
+    Returns:
+        (recorded source path, execution count per line, branch counts per line)
+
+    Raises:
+        GcovFormatError if the files can't be decoded or don't belong together
+    """
+    graph, counters = _load_run(gcno_path, gcda_path)
+    line_counts, branch_counts = line_coverage(graph, counters, source_name)
+    return graph.source_path(source_name), line_counts, branch_counts
+
+
+def read_files_coverage(
+    gcno_path: str,
+    gcda_path: str,
+    keep: Callable[[str], bool]
+) -> Dict[str, tuple[Dict[int, int], Dict[int, List[int]]]]:
+    """
+    Like read_coverage, for every recorded source file (e.g. the sources and
+    headers of a project object) for which keep(file) is true.
+
+    Raises:
+        GcovFormatError if the files can't be decoded or don't belong together
+    """
+    graph, counters = _load_run(gcno_path, gcda_path)
+    return files_coverage(graph, counters, keep)
+
+
+def _load_run(gcno_path: str, gcda_path: str) -> tuple[GcnoGraph, Dict[int, List[int]]]:
+    """A run's graph and counters, checked to belong together."""
+    try:
+        graph = load_gcno(gcno_path)
+        stamp, counters = read_gcda(gcda_path)
+    except struct.error as e:
+        raise GcovFormatError(f"truncated file: {e}")
+    if stamp != graph.stamp:
+        raise GcovFormatError("stamp mismatch between .gcno and .gcda")
+    return graph, counters
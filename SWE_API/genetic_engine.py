@@ -57,19 +57,26 @@ def mutate(chromosome: Chromosome, rate: float):
     """
     Enhanced mutation to find faulty test cases.
     Includes: standard mutations, boundary values, equal values, sign changes, and aggressive exploration.
+    Genes keep their type (a float gene stays a float), so the binary input
+    protocol sends each one as the same record type as its parameter.
     """
     # SPECIAL MUTATION 1: Occasionally make genes equal (detects a == b bugs)
     if len(chromosome.genes) >= 2 and random.random() < 0.25:
         # Pick two random gene positions and make them equal
         idx1, idx2 = random.sample(range(len(chromosome.genes)), 2)
-        chromosome.genes[idx2] = chromosome.genes[idx1]
+        val1, val2 = chromosome.genes[idx1], chromosome.genes[idx2]
+        if type(val1) is type(val2):
+            chromosome.genes[idx2] = val1
+        elif isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+            chromosome.genes[idx2] = type(val2)(val1)
     
     # SPECIAL MUTATION 2: Make one positive, one negative (detects sign-related bugs)
     if len(chromosome.genes) >= 2 and random.random() < 0.25:
         idx1, idx2 = random.sample(range(len(chromosome.genes)), 2)
-        if isinstance(chromosome.genes[idx1], (int, float)) and isinstance(chromosome.genes[idx2], (int, float)):
-            chromosome.genes[idx1] = abs(chromosome.genes[idx1]) or random.randint(1, 50)
-            chromosome.genes[idx2] = -abs(chromosome.genes[idx2]) or random.randint(-50, -1)
+        val1, val2 = chromosome.genes[idx1], chromosome.genes[idx2]
+        if all(isinstance(val, (int, float)) and not isinstance(val, bool) for val in (val1, val2)):
+            chromosome.genes[idx1] = abs(val1) or type(val1)(random.randint(1, 50))
+            chromosome.genes[idx2] = -abs(val2) or type(val2)(random.randint(-50, -1))
     
     # SPECIAL MUTATION 3: Boundary value testing (10% chance)
     if random.random() < 0.1:
@@ -77,7 +84,7 @@ def mutate(chromosome: Chromosome, rate: float):
         val = chromosome.genes[idx]
         if isinstance(val, (int, float)) and not isinstance(val, bool):
             boundary_values = [0, -1, 1, -100, 100, -50, 50]
-            chromosome.genes[idx] = random.choice(boundary_values)
+            chromosome.genes[idx] = type(val)(random.choice(boundary_values))
             return  # Skip standard mutation this time
     
     # STANDARD MUTATION: Apply to each gene with given rate
@@ -111,4 +118,4 @@ def mutate(chromosome: Chromosome, rate: float):
                 
             # Mutate Booleans (Flip 0 -> 1)
             elif isinstance(val, bool) or val in [0, 1]: 
-                chromosome.genes[i] = 1 - val
\ No newline at end of file
+                chromosome.genes[i] = (not val) if isinstance(val, bool) else 1 - val
\ No newline at end of file
@@ -0,0 +1,408 @@
+"""
+F4: Execution Harnesses
+Generated C++ drivers that wrap the program's main() so that one process
+can serve many test inputs, plus the Python side of their protocol.
+"""
+
+import os
+import queue
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional
+
+from timeouts import kill_process_group
+from resource_usage import ResourceUsage
+from input_protocol import DECODER_SOURCE, PROLOGUE_SOURCE
+
+
+# Linking with --wrap=main routes the C runtime's call to main() into
+# __wrap_main (the driver) while __real_main still names the user's main.
+# The user's source is compiled unchanged, so main's implicit "return 0"
+# and exit() keep their normal meaning.
+HARNESS_LINK_FLAGS = ["-Wl,--wrap=main"]
+
+HARNESS_MODES = ["persistent", "forkserver"]
+
+# Largest file, in bytes, a harness run may write (its stdout and stderr
+# files); the harness process reads it from this environment variable
+OUTPUT_LIMIT_ENV = "TCG_OUTPUT_LIMIT"
+
+# Driver of plain binaries that take binary inputs (input_protocol.py): it
+# only decodes stdin before calling the program's main()
+BINARY_INPUT_DRIVER = "binary_input"
+
+
+_DRIVER_PROLOGUE = DECODER_SOURCE + r'''
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <string>
+#ifdef _WIN32
+#include <io.h>
+#define dup _dup
+#define fdopen _fdopen
+static int setenv(const char* name, const char* value, int) { return _putenv_s(name, value); }
+#else
+#include <csignal>
+#include <unistd.h>
+#include <sys/resource.h>
+#endif
+
+extern "C" int __real_main(int argc, char** argv);
+extern "C" void __gcov_reset(void);
+extern "C" void __gcov_dump(void);
+
+#ifndef _WIN32
+static long long usec(const struct timeval& tv) { return (long long)tv.tv_sec * 1000000 + tv.tv_usec; }
+
+// Appends " user_us system_us maxrss_kb minflt majflt" of a run to its status line.
+static void print_usage(FILE* out, const struct rusage& before, const struct rusage& after) {
+    fprintf(out, " %lld %lld %ld %ld %ld",
+            usec(after.ru_utime) - usec(before.ru_utime),
+            usec(after.ru_stime) - usec(before.ru_stime),
+            (long)after.ru_maxrss,
+            (long)(after.ru_minflt - before.ru_minflt),
+            (long)(after.ru_majflt - before.ru_majflt));
+}
+#endif
+
+#ifndef _WIN32
+// Caps every file the program writes (its stdout/stderr files) at
+// TCG_OUTPUT_LIMIT bytes while it runs. Writes past the cap fail (SIGXFSZ is
+// ignored) and the program carries on, as it would with a pipe nobody reads;
+// the caller reports the output as truncated. Lifted again before counters are
+// dumped, also when the program calls exit() (see watch_output).
+static void limit_output(bool on) {
+    const char* value = getenv("TCG_OUTPUT_LIMIT");
+    struct rlimit rl;
+    if (!value || getrlimit(RLIMIT_FSIZE, &rl) != 0) return;
+    rlim_t limit = (rlim_t)strtoull(value, nullptr, 10);
+    rl.rlim_cur = on && (rl.rlim_max == RLIM_INFINITY || limit < rl.rlim_max) ? limit : rl.rlim_max;
+    setrlimit(RLIMIT_FSIZE, &rl);
+}
+
+static void lift_output_limit() { limit_output(false); }
+
+// Once per process: exit-time handlers registered now run before gcov's dump
+static void watch_output() {
+    signal(SIGXFSZ, SIG_IGN);
+    atexit(lift_output_limit);
+}
+#else
+static void limit_output(bool) {}
+static void watch_output() {}
+#endif
+
+// Point stdin/stdout/stderr at the files of one run directory
+// (decoding binary inputs, see input_protocol.py).
+static bool redirect_stdio(const std::string& dir) {
+    if (!freopen((dir + "/stdin").c_str(), "r", stdin)) return false;
+    if (!freopen((dir + "/stdout").c_str(), "w", stdout)) return false;
+    if (!freopen((dir + "/stderr").c_str(), "w", stderr)) return false;
+    // A write past the output limit in an earlier run leaves the streams failed
+    std::cin.clear();
+    std::cout.clear();
+    std::cerr.clear();
+    return tcg_decode_stdin();
+}
+'''
+
+# Protocol: one run directory per line on the original stdin; one exit code
+# per line on the original stdout, followed by the run's resource usage
+# (getrusage of the harness process around main(); maxrss is the process
+# peak so far). Counters are reset before each run and dumped into
+# GCOV_PREFIX=<run directory> after it.
+PERSISTENT_DRIVER = _DRIVER_PROLOGUE + r'''
+extern "C" int __wrap_main(int argc, char** argv) {
+    FILE* proto_in = fdopen(dup(0), "r");
+    FILE* proto_out = fdopen(dup(1), "w");
+    char line[4096];
+    watch_output();
+
+    while (fgets(line, sizeof line, proto_in)) {
+        line[strcspn(line, "\r\n")] = '\0';
+        std::string dir(line);
+        if (!redirect_stdio(dir)) {
+            fprintf(proto_out, "-1\n");
+            fflush(proto_out);
+            continue;
+        }
+        setenv("GCOV_PREFIX", dir.c_str(), 1);
+
+        __gcov_reset();
+#ifndef _WIN32
+        struct rusage before, after;
+        getrusage(RUSAGE_SELF, &before);
+#endif
+        limit_output(true);
+        int rc = __real_main(argc, argv);
+        std::cout.flush();
+        std::cerr.flush();
+        fflush(stdout);
+        fflush(stderr);
+        limit_output(false);
+#ifndef _WIN32
+        getrusage(RUSAGE_SELF, &after);
+#endif
+        __gcov_dump();
+
+        fprintf(proto_out, "%d", rc & 0xff);
+#ifndef _WIN32
+        print_usage(proto_out, before, after);
+#endif
+        fprintf(proto_out, "\n");
+        fflush(proto_out);
+    }
+    // Leave without the exit-time gcov dump: counters belong to the runs
+    _exit(0);
+}
+'''
+
+# Protocol: one run directory per line on the original stdin. The server
+# forks once per run; the child runs main() and exits normally, so stdio is
+# flushed and counters are dumped under GCOV_PREFIX=<run directory> exactly
+# as in a fresh process. Each child leads its own process group. The server
+# answers with the child's pid (so the caller can kill the group on timeout), then with its exit code (negative signal
+# number if it was killed) and the child's resource usage from wait4().
+FORKSERVER_DRIVER = _DRIVER_PROLOGUE + r'''
+#include <sys/types.h>
+#include <sys/wait.h>
+
+extern "C" int __wrap_main(int argc, char** argv) {
+    FILE* proto_in = fdopen(dup(0), "r");
+    FILE* proto_out = fdopen(dup(1), "w");
+    char line[4096];
+
+    while (fgets(line, sizeof line, proto_in)) {
+        line[strcspn(line, "\r\n")] = '\0';
+        std::string dir(line);
+
+        fflush(proto_out);
+        pid_t pid = fork();
+        if (pid == 0) {
+            // Its own group, so a timeout also kills whatever the program started
+            setpgid(0, 0);
+            close(fileno(proto_in));
+            close(fileno(proto_out));
+            if (!redirect_stdio(dir)) _exit(127);
+            setenv("GCOV_PREFIX", dir.c_str(), 1);
+            watch_output();
+            limit_output(true);
+            exit(__real_main(argc, argv));
+        }
+
+        // Also set here, so the group exists before the caller can kill it
+        if (pid > 0) setpgid(pid, pid);
+        fprintf(proto_out, "%d\n", (int)pid);
+        fflush(proto_out);
+
+        int status = 0;
+        int rc = -1;
+        struct rusage none, usage;
+        memset(&none, 0, sizeof none);
+        memset(&usage, 0, sizeof usage);
+        if (pid > 0 && wait4(pid, &status, 0, &usage) == pid) {
+            if (WIFEXITED(status)) rc = WEXITSTATUS(status);
+            else if (WIFSIGNALED(status)) rc = -WTERMSIG(status);
+        }
+        fprintf(proto_out, "%d", rc);
+        print_usage(proto_out, none, usage);
+        fprintf(proto_out, "\n");
+        fflush(proto_out);
+    }
+    _exit(0);
+}
+'''
+
+_DRIVERS = {
+    "persistent": PERSISTENT_DRIVER,
+    "forkserver": FORKSERVER_DRIVER,
+    BINARY_INPUT_DRIVER: PROLOGUE_SOURCE,
+}
+
+
+def driver_source(mode: str) -> str:
+    """C++ source of the driver for a harness mode (or BINARY_INPUT_DRIVER)."""
+    if mode not in _DRIVERS:
+        raise ValueError(f"Unknown harness mode: {mode}")
+    return _DRIVERS[mode]
+
+
+def write_driver(build_dir: Path, mode: str) -> Path:
+    """
+    Write the driver source for a harness mode into build_dir.
+
+    Returns:
+        Path to the driver source file
+    """
+    driver_path = build_dir / f"harness_{mode}.cpp"
+    driver_path.write_text(driver_source(mode), encoding='utf-8')
+    return driver_path
+
+
+class PersistentHarness:
+    """
+    Drives one long-lived persistent harness process.
+
+    If the program exits or crashes inside a run, the exit status is reported
+    for that run and a fresh process is started for the next one.
+    """
+
+    def __init__(self, harness_path: str, cwd: str, env: Optional[dict] = None):
+        self.harness_path = harness_path
+        self.cwd = cwd
+        self.env = env
+        self.proc: Optional[subprocess.Popen] = None
+        self.responses: Optional[queue.Queue] = None
+        self.spawn_count = 0
+        # Resource usage of the last run, if the driver reported it
+        self.last_usage: Optional[ResourceUsage] = None
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            [self.harness_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.cwd,
+            env=self.env,
+            text=True,
+            bufsize=1,
+            # Own process group, so a kill also reaches anything the program started
+            start_new_session=True
+        )
+        self.spawn_count += 1
+        self.responses = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_responses,
+            args=(self.proc.stdout, self.responses),
+            daemon=True
+        )
+        reader.start()
+
+    @staticmethod
+    def _read_responses(stream, responses: queue.Queue):
+        for line in stream:
+            responses.put(line)
+        responses.put(None)  # EOF: the process has exited
+
+    def run(self, run_dir: Path, timeout: float) -> int:
+        """
+        Execute the program once against the files in run_dir.
+
+        Returns:
+            Exit code of the run (negative signal number if it crashed)
+
+        Raises:
+            subprocess.TimeoutExpired if the run did not finish in time
+        """
+        if self.proc is None:
+            self._start()
+        self.last_usage = None
+
+        try:
+            self.proc.stdin.write(f"{run_dir}\n")
+            self.proc.stdin.flush()
+            line = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            self._kill()
+            raise subprocess.TimeoutExpired([self.harness_path], timeout)
+        except BrokenPipeError:
+            line = None
+
+        if line is None:
+            # The program ended the whole process (exit() or a crash)
+            returncode = self.proc.wait()
+            self.proc = None
+            return returncode
+        return self._parse_status(line)
+
+    def _parse_status(self, line: str) -> int:
+        """Exit code from a driver status line; keeps the usage after it in last_usage."""
+        fields = line.split()
+        if len(fields) == 6:
+            self.last_usage = ResourceUsage.from_fields(fields[1:])
+        return int(fields[0])
+
+    def _kill(self):
+        if self.proc is not None:
+            kill_process_group(self.proc)
+            self.proc.wait()
+            self.proc = None
+
+    def close(self):
+        """Stop the harness process."""
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1)
+        except Exception:
+            pass
+        self._kill()
+
+
+class ForkServerHarness(PersistentHarness):
+    """
+    Drives one fork-server harness process (POSIX only).
+
+    The server itself never runs main(), so it survives crashes, exit() and
+    timeouts of individual runs; only the forked child's process group is killed.
+    """
+
+    def run(self, run_dir: Path, timeout: float) -> int:
+        """
+        Execute the program once, in a child forked from the server.
+
+        Returns:
+            Exit code of the run (negative signal number if it crashed)
+
+        Raises:
+            subprocess.TimeoutExpired if the run did not finish in time
+        """
+        if self.proc is None:
+            self._start()
+        self.last_usage = None
+
+        try:
+            self.proc.stdin.write(f"{run_dir}\n")
+            self.proc.stdin.flush()
+            pid_line = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            self._kill()
+            raise subprocess.TimeoutExpired([self.harness_path], timeout)
+        except BrokenPipeError:
+            pid_line = None
+
+        if pid_line is None:
+            self.proc.wait()
+            self.proc = None
+            raise RuntimeError("Fork server exited unexpectedly")
+
+        pid = int(pid_line)
+        try:
+            status_line = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            if pid > 0:
+                # The child and anything it started, as kill_process_group() does for processes
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            try:
+                # The server reports the killed child's status; drop it
+                self.responses.get(timeout=5)
+            except queue.Empty:
+                self._kill()
+            raise subprocess.TimeoutExpired([self.harness_path], timeout)
+
+        if status_line is None:
+            self.proc.wait()
+            self.proc = None
+            raise RuntimeError("Fork server exited unexpectedly")
+        if pid <= 0:
+            raise RuntimeError("Fork server could not fork")
+        return self._parse_status(status_line)
@@ -0,0 +1,455 @@
+"""
+F4: Binary Input Protocol
+Test inputs as packed, typed records instead of str() values joined by
+newlines. Large arrays, floats and strings with spaces or newlines reach
+the program exactly, and the server never formats or parses them as text.
+
+Layout (little-endian):
+    header   "TCGI" 0x01, u32 record count
+    record   tag byte + payload
+        'i'  int64          'I'  u32 n + n x int64
+        'd'  float64        'D'  u32 n + n x float64
+        'b'  u8 (0/1)       'L'  u32 n + n records (mixed lists)
+        's'  u32 length + UTF-8 bytes
+
+A prologue linked into the binary (DECODER_SOURCE) decodes the records
+in-process. Drivers generated for bare functions (function_harness.py)
+read them typed, straight into the parameters, with no text step. Other
+programs keep reading stdin as usual, and see exactly what the text
+protocol would send: each value's str(), one per line.
+"""
+
+import struct
+from typing import Any, List
+
+INPUT_PROTOCOLS = ["text", "binary"]
+
+MAGIC = b"TCGI\x01"
+
+# Environment variable that turns the prologue on (it leaves stdin alone otherwise)
+INPUT_PROTOCOL_ENV = "TCG_INPUT"
+
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_MAX_DEPTH = 64
+
+
+def pack_inputs(test_inputs: List[Any]) -> bytes:
+    """
+    Encode a test's input values (int, float, bool, str and lists of them).
+
+    Raises:
+        ValueError for values the protocol cannot represent
+    """
+    parts = [MAGIC, _U32.pack(len(test_inputs))]
+    for value in test_inputs:
+        _pack(value, parts, 0)
+    return b"".join(parts)
+
+
+def _pack(value: Any, parts: List[bytes], depth: int):
+    if depth > _MAX_DEPTH:
+        raise ValueError("Input nested too deeply")
+    try:
+        if isinstance(value, bool):
+            parts.append(b"b\x01" if value else b"b\x00")
+        elif isinstance(value, int):
+            parts.append(b"i" + _I64.pack(value))
+        elif isinstance(value, float):
+            parts.append(b"d" + _F64.pack(value))
+        elif isinstance(value, str):
+            data = value.encode("utf-8")
+            parts.append(b"s" + _U32.pack(len(data)) + data)
+        elif isinstance(value, (list, tuple)):
+            kinds = {type(item) for item in value}
+            if kinds == {int}:
+                parts.append(b"I" + _U32.pack(len(value)) + struct.pack(f"<{len(value)}q", *value))
+            elif kinds == {float}:
+                parts.append(b"D" + _U32.pack(len(value)) + struct.pack(f"<{len(value)}d", *value))
+            else:
+                parts.append(b"L" + _U32.pack(len(value)))
+                for item in value:
+                    _pack(item, parts, depth + 1)
+        else:
+            raise ValueError(f"Cannot encode input of type {type(value).__name__}")
+    except struct.error as e:
+        raise ValueError(f"Cannot encode input {value!r}: {e}")
+
+
+def unpack_inputs(data: bytes) -> List[Any]:
+    """
+    Decode what pack_inputs() produced (tuples come back as lists).
+
+    Raises:
+        ValueError if data is not a well-formed record stream
+    """
+    if data[:len(MAGIC)] != MAGIC or len(data) < len(MAGIC) + 4:
+        raise ValueError("Not a binary input stream")
+    (count,) = _U32.unpack_from(data, len(MAGIC))
+    pos = len(MAGIC) + 4
+    values = []
+    try:
+        for _ in range(count):
+            value, pos = _unpack(data, pos, 0)
+            values.append(value)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed binary input: {e}")
+    if pos != len(data):
+        raise ValueError("Malformed binary input: trailing bytes")
+    return values
+
+
+def _unpack(data: bytes, pos: int, depth: int) -> tuple[Any, int]:
+    if depth > _MAX_DEPTH:
+        raise ValueError("Input nested too deeply")
+    tag = data[pos:pos + 1]
+    pos += 1
+    if tag == b"b":
+        return data[pos] != 0, pos + 1
+    if tag == b"i":
+        return _I64.unpack_from(data, pos)[0], pos + 8
+    if tag == b"d":
+        return _F64.unpack_from(data, pos)[0], pos + 8
+    (n,) = _U32.unpack_from(data, pos)
+    pos += 4
+    if tag == b"s":
+        if pos + n > len(data):
+            raise ValueError("Malformed binary input: string past the end")
+        return data[pos:pos + n].decode("utf-8"), pos + n
+    if tag == b"I":
+        return list(struct.unpack_from(f"<{n}q", data, pos)), pos + 8 * n
+    if tag == b"D":
+        return list(struct.unpack_from(f"<{n}d", data, pos)), pos + 8 * n
+    if tag == b"L":
+        items = []
+        for _ in range(n):
+            item, pos = _unpack(data, pos, depth + 1)
+            items.append(item)
+        return items, pos
+    raise ValueError(f"Malformed binary input: unknown tag {tag!r}")
+
+
+# Record reader and text renderer, shared by the decoding prologue below and
+# by typed function drivers (function_harness.py). The includer defines
+# TCG_DRIVER, the storage class (plus attributes) of every function here.
+RECORDS_SOURCE = r'''
+#include <cmath>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <string>
+#if __cplusplus >= 201703L
+#include <charconv>
+#endif
+
+namespace tcg_input {
+
+struct Reader {
+    const unsigned char* p;
+    const unsigned char* end;
+};
+
+TCG_DRIVER bool take(Reader& r, void* out, size_t n) {
+    if ((size_t)(r.end - r.p) < n) return false;
+    memcpy(out, r.p, n);
+    r.p += n;
+    return true;
+}
+
+TCG_DRIVER void put_int(std::string& out, int64_t v) {
+    char buf[24];
+    char* p = buf + sizeof buf;
+    uint64_t u = v < 0 ? 0 - (uint64_t)v : (uint64_t)v;
+    do {
+        *--p = (char)('0' + u % 10);
+        u /= 10;
+    } while (u);
+    if (v < 0) *--p = '-';
+    out.append(p, buf + sizeof buf - p);
+}
+
+// Shortest "d.ddde<exponent>" that reads back as v (finite), NUL-terminated
+TCG_DRIVER int shortest(double v, char* buf, size_t size) {
+#ifdef __cpp_lib_to_chars
+    char* end = std::to_chars(buf, buf + size - 1, v, std::chars_format::scientific).ptr;
+    *end = '\0';
+    return (int)(end - buf);
+#else
+    int len = 0;
+    for (int precision = 0; precision <= 16; precision++) {
+        len = snprintf(buf, size, "%.*e", precision, v);
+        if (strtod(buf, nullptr) == v) break;
+    }
+    return len;
+#endif
+}
+
+// Python's repr() of a float: fixed notation for exponents -5..15
+TCG_DRIVER void put_double(std::string& out, double v) {
+    if (std::isnan(v)) {
+        out += "nan";
+        return;
+    }
+    if (std::isinf(v)) {
+        out += v < 0 ? "-inf" : "inf";
+        return;
+    }
+    char buf[40], digits[24];
+    int len = shortest(v, buf, sizeof buf);
+    int ndigits = 0, exponent = 0;
+    for (int k = 0; k < len; k++) {
+        if (buf[k] == 'e') {
+            exponent = atoi(buf + k + 1);
+            break;
+        }
+        if (buf[k] >= '0' && buf[k] <= '9') digits[ndigits++] = buf[k];
+    }
+    if (buf[0] == '-') out += '-';
+    int point = exponent + 1;
+    if (point > -4 && point <= 16) {
+        if (point <= 0) {
+            out += "0.";
+            out.append(-point, '0');
+            out.append(digits, ndigits);
+        } else if (point < ndigits) {
+            out.append(digits, point);
+            out += '.';
+            out.append(digits + point, ndigits - point);
+        } else {
+            out.append(digits, ndigits);
+            out.append(point - ndigits, '0');
+            out += ".0";
+        }
+        return;
+    }
+    out += digits[0];
+    if (ndigits > 1) {
+        out += '.';
+        out.append(digits + 1, ndigits - 1);
+    }
+    snprintf(buf, sizeof buf, "e%+03d", exponent);
+    out += buf;
+}
+
+// Python's repr() of a string (exact for ASCII and Latin-1; other
+// characters are copied as they are)
+TCG_DRIVER void put_repr(std::string& out, const char* s, uint32_t n) {
+    static const char hex[] = "0123456789abcdef";
+    char quote = memchr(s, '\'', n) && !memchr(s, '"', n) ? '"' : '\'';
+    out += quote;
+    for (uint32_t k = 0; k < n; k++) {
+        unsigned char c = (unsigned char)s[k];
+        // U+0080..U+00A0 and U+00AD are the Latin-1 characters Python escapes
+        if (c == 0xc2 && k + 1 < n && ((unsigned char)s[k + 1] <= 0xa0 || (unsigned char)s[k + 1] == 0xad)) {
+            c = (unsigned char)s[++k];
+        } else if (c == quote || c == '\\') {
+            out += '\\';
+            out += (char)c;
+            continue;
+        } else if (c == '\t' || c == '\n' || c == '\r') {
+            out += '\\';
+            out += c == '\t' ? 't' : c == '\n' ? 'n' : 'r';
+            continue;
+        } else if ((c >= 0x20 && c < 0x7f) || c >= 0x80) {
+            out += (char)c;
+            continue;
+        }
+        out += "\\x";
+        out += hex[c >> 4];
+        out += hex[c & 15];
+    }
+    out += quote;
+}
+
+// Appends what the text protocol sends for the record at r: Python's str()
+// of the value (repr() for values inside lists). False if it is malformed.
+TCG_DRIVER bool render(Reader& r, std::string& out, int depth) {
+    unsigned char tag;
+    if (depth > 64 || !take(r, &tag, 1)) return false;
+    switch (tag) {
+    case 'b': {
+        unsigned char v;
+        if (!take(r, &v, 1)) return false;
+        out += v ? "True" : "False";
+        return true;
+    }
+    case 'i': {
+        int64_t v;
+        if (!take(r, &v, 8)) return false;
+        put_int(out, v);
+        return true;
+    }
+    case 'd': {
+        double v;
+        if (!take(r, &v, 8)) return false;
+        put_double(out, v);
+        return true;
+    }
+    }
+    uint32_t n;
+    if (!take(r, &n, 4)) return false;
+    if (tag == 's') {
+        if ((size_t)(r.end - r.p) < n) return false;
+        if (depth) {
+            put_repr(out, (const char*)r.p, n);
+        } else {
+            out.append((const char*)r.p, n);
+        }
+        r.p += n;
+        return true;
+    }
+    if (tag != 'I' && tag != 'D' && tag != 'L') return false;
+    out += '[';
+    for (uint32_t k = 0; k < n; k++) {
+        if (k) out += ", ";
+        if (tag == 'I') {
+            int64_t v;
+            if (!take(r, &v, 8)) return false;
+            put_int(out, v);
+        } else if (tag == 'D') {
+            double v;
+            if (!take(r, &v, 8)) return false;
+            put_double(out, v);
+        } else if (!render(r, out, depth + 1)) {
+            return false;
+        }
+    }
+    out += ']';
+    return true;
+}
+
+}  // namespace tcg_input
+'''
+
+# Included by every generated driver (harness.py). tcg_decode_stdin() is a
+# no-op unless TCG_INPUT=binary; otherwise it reads all of stdin and checks
+# the records. Programs that read their inputs typed (tcg_typed_input set
+# before main) then take them from tcg_input_next..tcg_input_end; for all
+# others the records are rendered as text into an in-memory file that
+# becomes stdin (for <cstdio>, std::cin and reads of fd 0). Returns false
+# for malformed input.
+DECODER_SOURCE = r'''
+#ifndef TCG_DRIVER
+#define TCG_DRIVER static
+#endif
+''' + RECORDS_SOURCE + r'''
+#include <iostream>
+#ifdef _WIN32
+#include <io.h>
+#define dup2 _dup2
+#define fileno _fileno
+#else
+#include <unistd.h>
+#endif
+#ifdef __linux__
+#include <sys/mman.h>
+#endif
+
+extern "C" {
+int tcg_typed_input = 0;
+const unsigned char* tcg_input_next = nullptr;
+const unsigned char* tcg_input_end = nullptr;
+}
+
+namespace tcg_input {
+
+static bool skip(Reader& r, int depth) {
+    unsigned char tag;
+    uint32_t n;
+    if (depth > 64 || !take(r, &tag, 1)) return false;
+    size_t size = tag == 'b' ? 1 : tag == 'i' || tag == 'd' ? 8 : 0;
+    if (size) {
+        if ((size_t)(r.end - r.p) < size) return false;
+        r.p += size;
+        return true;
+    }
+    if (!take(r, &n, 4)) return false;
+    if (tag == 'L') {
+        for (uint32_t k = 0; k < n; k++) {
+            if (!skip(r, depth + 1)) return false;
+        }
+        return true;
+    }
+    size = tag == 's' ? 1 : tag == 'I' || tag == 'D' ? 8 : 0;
+    if (!size || (size_t)(r.end - r.p) / size < n) return false;
+    r.p += size * n;
+    return true;
+}
+
+static bool replace_stdin(const std::string& text) {
+    bool ok = true;
+#ifdef __linux__
+    int fd = memfd_create("tcg_input", 0);
+    if (fd < 0) return false;
+    for (size_t done = 0; ok && done < text.size();) {
+        ssize_t wrote = write(fd, text.data() + done, text.size() - done);
+        ok = wrote > 0;
+        done += ok ? (size_t)wrote : 0;
+    }
+    ok = ok && lseek(fd, 0, SEEK_SET) == 0 && dup2(fd, fileno(stdin)) >= 0;
+    close(fd);
+#else
+    FILE* tmp = tmpfile();
+    if (!tmp) return false;
+    ok = fwrite(text.data(), 1, text.size(), tmp) == text.size() && fflush(tmp) == 0
+        && dup2(fileno(tmp), fileno(stdin)) >= 0;
+    fclose(tmp);
+#endif
+    // Drops the buffered bytes and EOF flag; the shared offset goes back to 0
+    clearerr(stdin);
+    rewind(stdin);
+    std::cin.clear();
+    return ok;
+}
+
+}  // namespace tcg_input
+
+static bool tcg_decode_stdin() {
+    const char* protocol = getenv("TCG_INPUT");
+    if (!protocol || strcmp(protocol, "binary") != 0) return true;
+
+    // Typed readers keep pointing into this until the next run
+    static std::string data;
+    data.clear();
+    char buf[65536];
+    size_t got;
+    while ((got = fread(buf, 1, sizeof buf, stdin)) > 0) data.append(buf, got);
+
+    tcg_input::Reader r{(const unsigned char*)data.data(), (const unsigned char*)data.data() + data.size()};
+    char magic[5];
+    uint32_t count;
+    if (!tcg_input::take(r, magic, 5) || memcmp(magic, "TCGI\x01", 5) != 0 || !tcg_input::take(r, &count, 4)) {
+        return false;
+    }
+    if (tcg_typed_input) {
+        tcg_input_next = r.p;
+        for (uint32_t i = 0; i < count; i++) {
+            if (!tcg_input::skip(r, 0)) return false;
+        }
+        tcg_input_end = r.p;
+        return r.p == r.end;
+    }
+    std::string text;
+    text.reserve(2 * data.size());
+    for (uint32_t i = 0; i < count; i++) {
+        if (!tcg_input::render(r, text, 0)) return false;
+        text += '\n';
+    }
+    return r.p == r.end && tcg_input::replace_stdin(text);
+}
+'''
+
+# Linked into plain binaries that take binary inputs (see harness.py)
+PROLOGUE_SOURCE = DECODER_SOURCE + r'''
+extern "C" int __real_main(int argc, char** argv);
+
+extern "C" int __wrap_main(int argc, char** argv) {
+    if (!tcg_decode_stdin()) {
+        fputs("Malformed binary input on stdin\n", stderr);
+        return 2;
+    }
+    return __real_main(argc, argv);
+}
+'''
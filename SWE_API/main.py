@@ -1,30 +1,112 @@
-from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import PlainTextResponse
+from fastapi import FastAPI, HTTPException, Response, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import json
 import uuid
 import random
 import os
+from typing import List, Optional
+from contextlib import asynccontextmanager
 
 from models import (
     SourceCodeInput, CFGOutput, CFGNode, CFGEdge, 
     GAConfigInput, EvolveInput, PopulationOutput, Chromosome,
     FitnessEvaluationInput, FitnessEvaluationOutput, BranchCoverageResult,
-    TestExecutionInput, TestExecutionOutput,
+    TestExecutionInput, TestExecutionOutput, DifferentialTestInput, DifferentialTestOutput,
+    ProjectExecutionInput,
     FaultLocalizationInput, FaultLocalizationOutput, TestResult,
     ReportRequest, ReportOutput
 )
 from database import (
     stored_cfgs, active_populations, fitness_evaluations,
-    test_executions, fault_analyses, generated_reports
+    test_executions, fault_analyses, generated_reports, compiled_binaries
 )
 from cfg_parser import analyze_cpp_code
 import genetic_engine as engine
 from fitness_evaluator import FitnessEvaluator
-from test_executor import TestExecutor, execute_test_case
+from test_executor import EXECUTION_MODES, COVERAGE_BACKENDS, COVERAGE_SCOPES
+from compile_cache import CompileCache
+from compile_scheduler import CompileScheduler
+from sandbox_pool import SandboxPool
+from timeouts import TimeoutPolicy
+from dual_build import RUN_MODES, CoverageMemo
+from result_cache import ResultCache
+from output_capture import DEFAULT_OUTPUT_LIMIT
+from input_protocol import INPUT_PROTOCOLS
+from resource_usage import UsageSummary
+from build_profiles import PROFILES, calibrate, default_profile_name, last_calibration, set_default_profile
+from batch_executor import ParallelBatchExecutor
+from differential_oracle import DifferentialOracle
+from project_build import Project
+from async_executor import execute_test_case_async
 from fault_localizer import TarantulaLocalizer, analyze_from_executions
 from reporter import FaultLocalizationReporter, generate_quick_report
 
-app = FastAPI(title="Automated Test Case Generator")
+# Shared build cache for every F3/F4 endpoint (indexed in database.compiled_binaries);
+# COMPILE_CONCURRENCY compiler processes run at once (default: CPU count), the rest queue
+compile_cache = CompileCache(
+    index=compiled_binaries,
+    scheduler=CompileScheduler(max_concurrent=int(os.environ.get("COMPILE_CONCURRENCY", 0)) or None)
+)
+
+# Worker pool for batch endpoints (size from BATCH_WORKERS, default: CPU count)
+batch_workers = int(os.environ.get("BATCH_WORKERS", 0)) or os.cpu_count() or 1
+
+# Reusable working directories for every executor; SANDBOX_TMPFS=1 keeps them in memory
+sandbox_pool = SandboxPool(
+    size=batch_workers + 4,
+    use_tmpfs=os.environ.get("SANDBOX_TMPFS", "0") == "1"
+)
+
+# Run timeouts learned per binary from earlier runs; ADAPTIVE_TIMEOUTS=0 always uses the full timeout
+timeout_policy = TimeoutPolicy() if os.environ.get("ADAPTIVE_TIMEOUTS", "1") == "1" else None
+
+# Coverage of inputs already run instrumented, for run_mode "auto"
+coverage_memo = CoverageMemo()
+
+# Results of identical runs (same binary content and input), for RESULT_CACHE_TTL
+# seconds; RESULT_CACHE=0 disables it, requests can opt out with cache_results=false
+result_cache = ResultCache(
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", 3600))
+) if os.environ.get("RESULT_CACHE", "1") == "1" else None
+
+# Bytes of stdout (and of stderr) kept per test run
+output_limit = int(os.environ.get("OUTPUT_LIMIT", 0)) or DEFAULT_OUTPUT_LIMIT
+
+# CPU time, memory and page faults of every test run since startup
+resource_usage = UsageSummary()
+
+batch_executor = ParallelBatchExecutor(
+    max_workers=batch_workers,
+    compile_cache=compile_cache,
+    sandbox_pool=sandbox_pool,
+    timeout_policy=timeout_policy,
+    coverage_memo=coverage_memo,
+    result_cache=result_cache,
+    output_limit=output_limit
+)
+
+# Expected outputs from a reference implementation, run on the batch workers
+differential_oracle = DifferentialOracle(batch_executor)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # BUILD_PROFILE names the default build profile; "auto" (default) measures
+    # the available profiles on this host in the background and picks the fastest
+    build_profile = os.environ.get("BUILD_PROFILE", "auto")
+    if build_profile == "auto":
+        asyncio.get_running_loop().run_in_executor(None, calibrate)
+    else:
+        set_default_profile(build_profile)
+    yield
+    # Reclaim every sandbox on shutdown
+    batch_executor.shutdown()
+    sandbox_pool.close()
+
+
+app = FastAPI(title="Automated Test Case Generator", lifespan=lifespan)
 
 # Helper function to sanitize source code
 def sanitize_source_code(code: str) -> str:
@@ -40,6 +122,32 @@ def sanitize_source_code(code: str) -> str:
     code = code.replace('\uFEFF', '')   # Zero-width no-break space (BOM)
     return code
 
+# Helper function to reject unknown execution options
+def validate_execution_options(
+    execution_mode: Optional[str] = None,
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    build_profile: Optional[str] = None,
+    run_mode: str = "coverage",
+    input_protocol: str = "text",
+    coverage_backends: List[str] = COVERAGE_BACKENDS
+):
+    """
+    Raise HTTPException 400 for an option outside its allowed values.
+    None skips a check (endpoints without an execution_mode, the default build profile).
+    """
+    options = [
+        ("execution_mode", execution_mode, EXECUTION_MODES),
+        ("coverage_backend", coverage_backend, coverage_backends),
+        ("coverage_scope", coverage_scope, COVERAGE_SCOPES),
+        ("build_profile", build_profile, list(PROFILES)),
+        ("run_mode", run_mode, RUN_MODES),
+        ("input_protocol", input_protocol, INPUT_PROTOCOLS)
+    ]
+    for name, value, allowed in options:
+        if value is not None and value not in allowed:
+            raise HTTPException(status_code=400, detail=f"{name} must be one of {allowed}")
+
 # Enable CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -214,6 +322,11 @@ async def evaluate_fitness(data: FitnessEvaluationInput):
     Evaluate fitness of a single test case based on branch coverage.
     Requires: CFG from F1, compiled source code, test inputs.
     """
+    validate_execution_options(
+        None, data.coverage_backend, data.coverage_scope,
+        data.build_profile, data.run_mode, data.input_protocol
+    )
+    
     if data.cfg_id not in stored_cfgs:
         raise HTTPException(status_code=404, detail="CFG not found")
     
@@ -224,10 +337,22 @@ async def evaluate_fitness(data: FitnessEvaluationInput):
         sanitized_code = sanitize_source_code(data.source_code)
         
         # Execute test case with source code
-        execution_result = execute_test_case(
+        execution_result = await execute_test_case_async(
             source_code=sanitized_code,
-            test_inputs=data.test_case.genes
+            test_inputs=data.test_case.genes,
+            compile_cache=compile_cache,
+            sandbox_pool=sandbox_pool,
+            timeout_policy=timeout_policy,
+            coverage_backend=data.coverage_backend,
+            coverage_scope=data.coverage_scope,
+            build_profile=data.build_profile,
+            run_mode=data.run_mode,
+            coverage_memo=coverage_memo,
+            result_cache=result_cache if data.cache_results else None,
+            output_limit=output_limit,
+            input_protocol=data.input_protocol
         )
+        resource_usage.add(execution_result)
         
         # Calculate branch coverage
         total_branches = cfg_data.total_nodes
@@ -253,11 +378,31 @@ async def evaluate_fitness(data: FitnessEvaluationInput):
 
 
 @app.post("/fitness/evaluate-population", response_model=FitnessEvaluationOutput, tags=["F3"])
-async def evaluate_population_fitness(cfg_id: str, source_code: str):
+async def evaluate_population_fitness(
+    cfg_id: str,
+    source_code: str,
+    execution_mode: str = "process",
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    build_profile: Optional[str] = None,
+    run_mode: str = "coverage",
+    cache_results: bool = True,
+    input_protocol: str = "text"
+):
     """
     Evaluate fitness for entire population of test cases.
     This connects F2 (population) with F3 (fitness evaluation) and F4 (test execution).
+    execution_mode "process" (default) starts one process per individual;
+    "forkserver" forks each one from a harness process, and "persistent"
+    runs the whole population in one harness process (globals are not reset). coverage_backend "native"
+    reads coverage files in-process instead of running gcov per individual;
+    coverage_scope "target" instruments only the function under test.
     """
+    validate_execution_options(
+        execution_mode, coverage_backend, coverage_scope,
+        build_profile, run_mode, input_protocol
+    )
+    
     if cfg_id not in stored_cfgs:
         raise HTTPException(status_code=404, detail="CFG not found")
     
@@ -268,18 +413,31 @@ async def evaluate_population_fitness(cfg_id: str, source_code: str):
     population = active_populations[cfg_id].individuals
     
     try:
-        # Execute all test cases and collect results
-        test_results = []
-        for individual in population:
-            execution_result = execute_test_case(
-                source_code=source_code,
-                test_inputs=individual.genes
-            )
-            test_results.append((individual.id, execution_result))
+        # Execute all test cases and collect results (off the event loop)
+        usage = UsageSummary()
+        execution_results = await asyncio.to_thread(
+            batch_executor.execute,
+            source_code=source_code,
+            test_inputs_list=[individual.genes for individual in population],
+            mode=execution_mode,
+            coverage_backend=coverage_backend,
+            coverage_scope=coverage_scope,
+            build_profile=build_profile,
+            run_mode=run_mode,
+            cache_results=cache_results,
+            input_protocol=input_protocol,
+            usage=usage
+        )
+        resource_usage.add_all(execution_results)
+        test_results = [
+            (individual.id, execution_result)
+            for individual, execution_result in zip(population, execution_results)
+        ]
         
         # Evaluate fitness for entire population
         evaluator = FitnessEvaluator(cfg_data)
         output = evaluator.evaluate_population(cfg_id, test_results)
+        output.resource_usage = usage.summary(batch_executor.max_workers)
         
         # Update chromosomes with fitness scores
         for individual, result in zip(population, output.results):
@@ -301,19 +459,36 @@ async def execute_test(data: TestExecutionInput):
     Compile source code with coverage instrumentation and execute test.
     Uses GCC with --coverage flag and gcov for coverage data collection.
     """
+    validate_execution_options(
+        None, data.coverage_backend, data.coverage_scope,
+        data.build_profile, data.run_mode, data.input_protocol
+    )
+    
     try:
         # Sanitize source code
         sanitized_code = sanitize_source_code(data.source_code)
         
         # Execute test with coverage collection
-        result = execute_test_case(
+        result = await execute_test_case_async(
             source_code=sanitized_code,
             test_inputs=data.test_inputs,
-            expected_output=data.expected_output
+            expected_output=data.expected_output,
+            compile_cache=compile_cache,
+            sandbox_pool=sandbox_pool,
+            timeout_policy=timeout_policy,
+            coverage_backend=data.coverage_backend,
+            coverage_scope=data.coverage_scope,
+            build_profile=data.build_profile,
+            run_mode=data.run_mode,
+            coverage_memo=coverage_memo,
+            result_cache=result_cache if data.cache_results else None,
+            output_limit=output_limit,
+            input_protocol=data.input_protocol
         )
         
         # Store execution result
         test_executions[result.test_id] = result
+        resource_usage.add(result)
         
         return result
     
@@ -322,20 +497,48 @@ async def execute_test(data: TestExecutionInput):
 
 
 @app.post("/test/execute-batch", response_model=list[TestExecutionOutput], tags=["F4"])
-async def execute_test_batch(source_code: str, test_cases: list[list]):
+async def execute_test_batch(
+    source_code: str,
+    test_cases: list[list],
+    response: Response,
+    execution_mode: str = "process",
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    build_profile: Optional[str] = None,
+    run_mode: str = "coverage",
+    cache_results: bool = True,
+    input_protocol: str = "text"
+):
     """
     Execute multiple test cases on the same source code.
-    More efficient than individual executions.
+    More efficient than individual executions: the source is compiled once and,
+    in the opt-in "persistent" mode, every test runs inside one harness process.
+    The batch's aggregate resource usage is in the X-Resource-Usage header (JSON).
     """
+    validate_execution_options(
+        execution_mode, coverage_backend, coverage_scope,
+        build_profile, run_mode, input_protocol
+    )
+    
     try:
-        results = []
-        for test_inputs in test_cases:
-            result = execute_test_case(
-                source_code=source_code,
-                test_inputs=test_inputs
-            )
+        usage = UsageSummary()
+        results = await asyncio.to_thread(
+            batch_executor.execute,
+            source_code=sanitize_source_code(source_code),
+            test_inputs_list=test_cases,
+            mode=execution_mode,
+            coverage_backend=coverage_backend,
+            coverage_scope=coverage_scope,
+            build_profile=build_profile,
+            run_mode=run_mode,
+            cache_results=cache_results,
+            input_protocol=input_protocol,
+            usage=usage
+        )
+        for result in results:
             test_executions[result.test_id] = result
-            results.append(result)
+        resource_usage.add_all(results)
+        response.headers["X-Resource-Usage"] = json.dumps(usage.summary(batch_executor.max_workers))
         
         return results
     
@@ -343,6 +546,151 @@ async def execute_test_batch(source_code: str, test_cases: list[list]):
         raise HTTPException(status_code=500, detail=f"Batch test execution failed: {str(e)}")
 
 
+@app.post("/test/execute-batch-stream", tags=["F4"])
+async def execute_test_batch_stream(
+    source_code: str,
+    test_cases: list[list],
+    execution_mode: str = "process",
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    build_profile: Optional[str] = None,
+    run_mode: str = "coverage",
+    cache_results: bool = True,
+    input_protocol: str = "text"
+):
+    """
+    Streaming variant of /test/execute-batch.
+    Responds with NDJSON: one {"index": i, "result": {...}} line per test case,
+    written as soon as the test finishes (not in input order). A failure ends
+    the stream with an {"error": "..."} line. Disconnecting stops the batch.
+    """
+    validate_execution_options(
+        execution_mode, coverage_backend, coverage_scope,
+        build_profile, run_mode, input_protocol
+    )
+    
+    results = batch_executor.execute_iter(
+        source_code=sanitize_source_code(source_code),
+        test_inputs_list=test_cases,
+        mode=execution_mode,
+        coverage_backend=coverage_backend,
+        coverage_scope=coverage_scope,
+        build_profile=build_profile,
+        run_mode=run_mode,
+        cache_results=cache_results,
+        input_protocol=input_protocol
+    )
+    
+    async def stream():
+        pending = None
+        try:
+            while True:
+                pending = asyncio.ensure_future(asyncio.to_thread(next, results, None))
+                item = await asyncio.shield(pending)
+                if item is None:
+                    break
+                index, result = item
+                test_executions[result.test_id] = result
+                resource_usage.add(result)
+                yield f'{{"index": {index}, "result": {result.model_dump_json()}}}\n'
+        except Exception as e:
+            yield json.dumps({"error": f"Batch test execution failed: {str(e)}"}) + "\n"
+        finally:
+            # A disconnect can interrupt a pending step; let it finish before closing
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            await asyncio.to_thread(results.close)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/test/execute-project", response_model=list[TestExecutionOutput], tags=["F4"])
+async def execute_project_tests(data: ProjectExecutionInput, response: Response):
+    """
+    Execute test cases on a multi-file program (sources and headers).
+    Each source is compiled to its own object, reused until the source or a
+    header it includes changes; coverage covers every project file. The
+    batch's aggregate resource usage is in the X-Resource-Usage header (JSON).
+    """
+    validate_execution_options(
+        data.execution_mode, data.coverage_backend, data.coverage_scope,
+        data.build_profile, data.run_mode, data.input_protocol,
+        coverage_backends=["gcov", "native"]
+    )
+    if data.expected_outputs is not None and len(data.expected_outputs) != len(data.test_cases):
+        raise HTTPException(status_code=400, detail="expected_outputs must have one entry per test case")
+    try:
+        project = Project({path: sanitize_source_code(content) for path, content in data.files.items()})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        usage = UsageSummary()
+        results = await asyncio.to_thread(
+            batch_executor.execute,
+            source_code=project,
+            test_inputs_list=data.test_cases,
+            expected_outputs=data.expected_outputs,
+            mode=data.execution_mode,
+            coverage_backend=data.coverage_backend,
+            coverage_scope=data.coverage_scope,
+            build_profile=data.build_profile,
+            run_mode=data.run_mode,
+            cache_results=data.cache_results,
+            input_protocol=data.input_protocol,
+            usage=usage
+        )
+        for result in results:
+            test_executions[result.test_id] = result
+        resource_usage.add_all(results)
+        response.headers["X-Resource-Usage"] = json.dumps(usage.summary(batch_executor.max_workers))
+        
+        return results
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Project test execution failed: {str(e)}")
+
+
+@app.post("/test/differential", response_model=DifferentialTestOutput, tags=["F4"])
+async def execute_differential_tests(data: DifferentialTestInput):
+    """
+    Execute test cases against a reference implementation.
+    The reference runs first (without coverage); its output on each input is
+    the expected output of the program under test. Returns every result with
+    a "passed"/"failed"/"undecided" verdict, for the whole batch in one call.
+    """
+    validate_execution_options(
+        data.execution_mode, data.coverage_backend, data.coverage_scope,
+        data.build_profile, data.run_mode, data.input_protocol
+    )
+    
+    try:
+        output = await asyncio.to_thread(
+            differential_oracle.execute,
+            source_code=sanitize_source_code(data.source_code),
+            reference_code=sanitize_source_code(data.reference_code),
+            test_inputs_list=data.test_cases,
+            mode=data.execution_mode,
+            coverage_backend=data.coverage_backend,
+            coverage_scope=data.coverage_scope,
+            build_profile=data.build_profile,
+            run_mode=data.run_mode,
+            cache_results=data.cache_results,
+            input_protocol=data.input_protocol
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Differential test execution failed: {str(e)}")
+    
+    for result in output.results:
+        test_executions[result.test_id] = result
+    resource_usage.add_all(output.reference_results)
+    resource_usage.add_all(output.results)
+    
+    return output
+
+
 # --- F5 ENDPOINT: FAULT LOCALIZATION (TARANTULA) ---
 @app.post("/fault-localization/analyze", response_model=FaultLocalizationOutput, tags=["F5"])
 async def analyze_faults(data: FaultLocalizationInput):
@@ -464,6 +812,8 @@ async def get_status():
     """
     Get system status and statistics.
     """
+    # Walks every sandbox on disk
+    sandbox_stats = await asyncio.to_thread(sandbox_pool.stats)
     return {
         "status": "running",
         "cfgs_stored": len(stored_cfgs),
@@ -471,7 +821,15 @@ async def get_status():
         "fitness_evaluations": len(fitness_evaluations),
         "test_executions": len(test_executions),
         "fault_analyses": len(fault_analyses),
-        "generated_reports": len(generated_reports)
+        "generated_reports": len(generated_reports),
+        "compile_cache": compile_cache.stats(),
+        "sandbox_pool": sandbox_stats,
+        "timeouts": timeout_policy.stats() if timeout_policy else None,
+        "coverage_memo": coverage_memo.stats(),
+        "result_cache": result_cache.stats() if result_cache else None,
+        "resource_usage": {"total": resource_usage.summary(batch_executor.max_workers)},
+        "build_profile": {"default": default_profile_name(), "calibration": last_calibration()},
+        "batch_workers": batch_executor.max_workers
     }
 
 
@@ -486,5 +844,10 @@ async def clear_all_data():
     test_executions.clear()
     fault_analyses.clear()
     generated_reports.clear()
+    # Removes every cached build from disk
+    await asyncio.to_thread(compile_cache.clear)
+    coverage_memo.clear()
+    if result_cache:
+        result_cache.clear()
     
     return {"message": "All data cleared successfully"}
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 
 # --- F1 MODELS (Code Analysis) ---
 class SourceCodeInput(BaseModel):
@@ -68,6 +68,12 @@ class FitnessEvaluationInput(BaseModel):
     test_case: TestCaseInput
     source_code: str
     cfg_id: str
+    coverage_backend: str = "gcov"  # "gcov", "native" or "sancov"
+    coverage_scope: str = "all"  # "all" or "target" (only the functions under test)
+    build_profile: Optional[str] = None  # Name in build_profiles.PROFILES (None: server default)
+    run_mode: str = "coverage"  # "coverage", "fast" (no coverage) or "auto" (coverage only for new inputs)
+    cache_results: bool = True  # Reuse results of identical earlier runs; False for nondeterministic programs
+    input_protocol: str = "text"  # "text" (one str() value per line) or "binary" (packed typed records)
 
 class BranchCoverageResult(BaseModel):
     test_case_id: str
@@ -84,6 +90,7 @@ class FitnessEvaluationOutput(BaseModel):
     results: List[BranchCoverageResult]
     best_fitness: float
     avg_fitness: float
+    resource_usage: Optional[Dict[str, Any]] = None  # Aggregate of this evaluation's runs (resource_usage.UsageSummary)
     # Frontend compatibility - single test case result
     test_case_id: Optional[str] = None
     branch_coverage: Optional[float] = None
@@ -95,12 +102,31 @@ class TestExecutionInput(BaseModel):
     source_code: str
     test_inputs: List[Any]
     expected_output: Optional[Any] = None
+    coverage_backend: str = "gcov"  # "gcov", "native" or "sancov"
+    coverage_scope: str = "all"  # "all" or "target" (only the functions under test)
+    build_profile: Optional[str] = None  # Name in build_profiles.PROFILES (None: server default)
+    run_mode: str = "coverage"  # "coverage", "fast" (no coverage) or "auto" (coverage only for new inputs)
+    cache_results: bool = True  # Reuse results of identical earlier runs; False for nondeterministic programs
+    input_protocol: str = "text"  # "text" (one str() value per line) or "binary" (packed typed records)
+
+class ProjectExecutionInput(BaseModel):
+    files: Dict[str, str]  # Sources and headers by path relative to the project root ("src/main.cpp": "...")
+    test_cases: List[List[Any]]
+    expected_outputs: Optional[List[Optional[Any]]] = None  # One per test case (None entries skip the check)
+    execution_mode: str = "process"  # One of test_executor.EXECUTION_MODES
+    coverage_backend: str = "gcov"  # "gcov" or "native" (sancov builds single sources only)
+    coverage_scope: str = "all"  # "all" or "target" (every project file except main)
+    build_profile: Optional[str] = None  # Name in build_profiles.PROFILES (None: server default)
+    run_mode: str = "coverage"  # "coverage", "fast" (no coverage) or "auto" (coverage only for new inputs)
+    cache_results: bool = True  # Reuse results of identical earlier runs; False for nondeterministic programs
+    input_protocol: str = "text"  # "text" (one str() value per line) or "binary" (packed typed records)
 
 class GCovData(BaseModel):
-    file_name: str
+    file_name: str  # Project-relative path for project builds
     line_number: int
     execution_count: int
     source_line: str
+    branch_counts: Optional[List[int]] = None  # Taken count per gcov branch on this line (JSON collector)
 
 class TestExecutionOutput(BaseModel):
     test_id: str
@@ -110,6 +136,35 @@ class TestExecutionOutput(BaseModel):
     coverage_data: List[GCovData]
     branches_taken: List[str]
     execution_time: float
+    timeout: Optional[float] = None  # Seconds the run was allowed (adaptive, see timeouts.py)
+    cached: bool = False  # Reused from the result cache instead of run again
+    # Kernel accounting of the test process (rusage); None where not measured
+    cpu_user_time: Optional[float] = None  # Seconds
+    cpu_system_time: Optional[float] = None  # Seconds
+    max_rss_kb: Optional[int] = None  # Peak resident memory
+    minor_page_faults: Optional[int] = None
+    major_page_faults: Optional[int] = None
+
+class DifferentialTestInput(BaseModel):
+    source_code: str  # Program under test
+    reference_code: str  # Reference implementation whose outputs are the expected outputs
+    test_cases: List[List[Any]]
+    execution_mode: str = "forkserver"  # One of test_executor.EXECUTION_MODES, for both programs
+    coverage_backend: str = "gcov"  # "gcov", "native" or "sancov" (program under test only)
+    coverage_scope: str = "all"  # "all" or "target" (only the functions under test)
+    build_profile: Optional[str] = None  # Name in build_profiles.PROFILES (None: server default)
+    run_mode: str = "coverage"  # "coverage", "fast" (no coverage) or "auto" (coverage only for new inputs)
+    cache_results: bool = True  # Reuse results of identical earlier runs; False for nondeterministic programs
+    input_protocol: str = "text"  # "text" (one str() value per line) or "binary" (packed typed records)
+
+class DifferentialTestOutput(BaseModel):
+    results: List[TestExecutionOutput]  # Program under test, checked against the reference outputs
+    reference_results: List[TestExecutionOutput]  # Reference runs (without coverage)
+    verdicts: List[str]  # Per test: "passed", "failed" or "undecided" (see differential_oracle.VERDICTS)
+    passed: int
+    failed: int
+    undecided: int
+    resource_usage: Optional[Dict[str, Any]] = None  # Aggregate of both programs' runs (resource_usage.UsageSummary)
 
 # --- F5 MODELS (Fault Localization) ---
 class TestResult(BaseModel):
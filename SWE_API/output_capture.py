@@ -0,0 +1,262 @@
+"""
+F4: Output Capture
+Bounded capture of a test program's stdout/stderr. Output is decoded as it
+arrives and checked against the expected output on the fly, so a run whose
+output can no longer match (or that exceeds the byte cap) can be stopped
+right away instead of being buffered in full.
+"""
+
+import codecs
+import io
+import os
+import selectors
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from timeouts import DEFAULT_TIMEOUT, kill_process_group, limit_cpu_time, run_limited
+from resource_usage import ResourceUsage, wait_with_usage
+
+
+# Bytes kept per stream (stdout and stderr each)
+DEFAULT_OUTPUT_LIMIT = 1 << 20
+
+_READ_SIZE = 1 << 16
+
+
+class ExpectedOutputMatcher:
+    """
+    Incremental form of the pass check str(output.strip()) == str(expected).
+
+    Fed decoded text chunk by chunk; possible turns False as soon as no
+    continuation of the output seen so far could pass.
+    """
+
+    def __init__(self, expected_output: Any):
+        self.expected = str(expected_output)
+        self._pos = 0
+        self._started = False
+        # Stripped output never starts or ends with whitespace
+        self.possible = self.expected == self.expected.strip()
+
+    def feed(self, text: str) -> bool:
+        """Check the next chunk of output; returns self.possible."""
+        if not self.possible or not text:
+            return self.possible
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return True
+            self._started = True
+
+        take = min(len(text), len(self.expected) - self._pos)
+        if text[:take] != self.expected[self._pos:self._pos + take]:
+            self.possible = False
+        elif take < len(text) and not text[take:].isspace():
+            # Anything after the expected text must be trailing whitespace
+            self.possible = False
+        self._pos += take
+        return self.possible
+
+
+class OutputBuffer:
+    """
+    One captured stream: at most `limit` bytes, decoded incrementally
+    (UTF-8, invalid bytes replaced, newlines translated like text mode).
+    """
+
+    def __init__(self, limit: int = DEFAULT_OUTPUT_LIMIT, expected_output: Optional[Any] = None):
+        self.limit = limit
+        self.size = 0
+        self.truncated = False
+        self._decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True
+        )
+        self._parts: List[str] = []
+        self._matcher = ExpectedOutputMatcher(expected_output) if expected_output is not None else None
+
+    @property
+    def diverged(self) -> bool:
+        """True once the output can no longer equal the expected output."""
+        return self._matcher is not None and not self._matcher.possible
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Append raw output; bytes beyond the limit are dropped.
+
+        Returns:
+            False once the run's result is settled (limit hit or output diverged)
+        """
+        room = self.limit - self.size
+        if len(data) > room:
+            data = data[:room]
+            self.truncated = True
+        if data:
+            self.size += len(data)
+            text = self._decoder.decode(data)
+            self._parts.append(text)
+            if self._matcher is not None:
+                self._matcher.feed(text)
+        return not (self.truncated or self.diverged)
+
+    def text(self) -> str:
+        """Everything captured so far."""
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._parts.append(tail)
+        return "".join(self._parts)
+
+
+class CapturedRun:
+    """Exit code, bounded output and resource usage of one program run."""
+
+    def __init__(
+        self,
+        returncode: int,
+        stdout: OutputBuffer,
+        stderr: OutputBuffer,
+        stopped: bool = False,
+        usage: Optional[ResourceUsage] = None
+    ):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        # Killed because its output diverged or hit the limit
+        self.stopped = stopped
+        self.usage = usage
+
+    @property
+    def output(self) -> str:
+        return self.stdout.text().strip()
+
+    @property
+    def error(self) -> Optional[str]:
+        """Stripped stderr, followed by a note on truncation or an early stop."""
+        notes = [self.stderr.text().strip()]
+        for name, buffer in (("stdout", self.stdout), ("stderr", self.stderr)):
+            if buffer.truncated:
+                notes.append(f"[{name} truncated at {buffer.limit} bytes]")
+        if self.stopped and self.stdout.diverged:
+            notes.append("[stopped early: output diverged from the expected output]")
+        elif self.stopped:
+            notes.append("[stopped early: output limit exceeded]")
+        return "\n".join(note for note in notes if note) or None
+
+
+def read_captured(path: Path, limit: int = DEFAULT_OUTPUT_LIMIT, expected_output: Optional[Any] = None) -> OutputBuffer:
+    """Load at most `limit` bytes of an output file into an OutputBuffer."""
+    buffer = OutputBuffer(limit, expected_output)
+    try:
+        with open(path, "rb") as f:
+            while not buffer.truncated:
+                data = f.read(_READ_SIZE)
+                if not data:
+                    break
+                buffer.feed(data)
+    except FileNotFoundError:
+        pass
+    return buffer
+
+
+def run_captured(
+    cmd: List[str],
+    input_data: Optional[bytes] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+    expected_output: Optional[Any] = None,
+    output_limit: int = DEFAULT_OUTPUT_LIMIT,
+    stop_early: bool = True,
+    cpu_limit: bool = True,
+    on_start: Optional[Callable[[subprocess.Popen], None]] = None
+) -> CapturedRun:
+    """
+    timeouts.run_limited() with bounded, streamed output capture and the
+    child's resource usage (see resource_usage.wait_with_usage).
+
+    Args:
+        expected_output: Checked against stdout while it arrives (None skips the check)
+        output_limit: Bytes kept per stream
+        stop_early: Kill the program's process group as soon as stdout
+                    diverges or a stream hits the limit. Otherwise the
+                    program runs to completion (so its exit code and
+                    coverage are complete) and further output is discarded.
+        on_start: Called with the process once it runs, e.g. to kill it from another thread
+
+    Raises:
+        subprocess.TimeoutExpired if the timeout expired
+    """
+    stdout = OutputBuffer(output_limit, expected_output)
+    stderr = OutputBuffer(output_limit)
+    if os.name != "posix":
+        # Pipes cannot be polled with selectors here; capture first, then bound
+        result = run_limited(cmd, input_data, timeout, cwd, env, text=False, cpu_limit=cpu_limit)
+        stdout.feed(result.stdout)
+        stderr.feed(result.stderr)
+        return CapturedRun(result.returncode, stdout, stderr)
+
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input_data else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True
+    )
+    if cpu_limit:
+        limit_cpu_time(proc.pid, timeout)
+    if on_start is not None:
+        on_start(proc)
+    deadline = time.monotonic() + timeout
+    stopped = False
+    pending = memoryview(input_data or b"")
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            if input_data:
+                os.set_blocking(proc.stdin.fileno(), False)
+                selector.register(proc.stdin, selectors.EVENT_WRITE)
+            selector.register(proc.stdout, selectors.EVENT_READ, stdout)
+            selector.register(proc.stderr, selectors.EVENT_READ, stderr)
+
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                for key, _ in selector.select(remaining):
+                    if key.fileobj is proc.stdin:
+                        try:
+                            pending = pending[os.write(key.fd, pending):]
+                        except BlockingIOError:
+                            continue
+                        except BrokenPipeError:
+                            pending = pending[:0]
+                        if not pending:
+                            selector.unregister(key.fileobj)
+                            proc.stdin.close()
+                        continue
+                    data = os.read(key.fd, _READ_SIZE)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    elif not key.data.feed(data) and stop_early and not stopped:
+                        # Output settles the result; the pipes hit EOF once the group is gone
+                        kill_process_group(proc)
+                        stopped = True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        _, usage = wait_with_usage(proc, remaining)
+    except BaseException:
+        kill_process_group(proc)
+        proc.wait()
+        raise
+    finally:
+        for stream in (proc.stdin, proc.stdout, proc.stderr):
+            if stream is not None:
+                stream.close()
+
+    return CapturedRun(proc.returncode, stdout, stderr, stopped, usage)
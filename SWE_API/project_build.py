@@ -0,0 +1,203 @@
+"""
+F4: Project Builds
+Programs made of several source files and headers. Each source compiles
+to its own object, cached by content like whole programs are (compile_cache.py),
+and the objects are linked together. An object's key covers its source
+and every project header the source includes, as the compiler reports them
+(-MM), so editing one .cpp of a ten-file project rebuilds one object and
+editing a header rebuilds only the sources that include it.
+
+Coverage covers every project file, headers included: each object's .gcno
+is kept next to the linked program, and a manifest there lists them.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+SOURCE_EXTENSIONS = (".cpp", ".cc", ".cxx", ".c")
+HEADER_EXTENSIONS = (".h", ".hpp", ".hh", ".hxx", ".inl", ".ipp")
+
+# Written next to a linked project: the objects' .gcno stems and the project's files
+PROJECT_MANIFEST = "project_manifest.json"
+
+
+class Project:
+    """Files of a multi-file program, by path relative to the project root."""
+
+    def __init__(self, files: Dict[str, str]):
+        """
+        Args:
+            files: Content per relative path ("src/main.cpp", "include/util.h", ...)
+
+        Raises:
+            ValueError: For absolute or escaping paths, or a project without sources
+        """
+        self.files: Dict[str, str] = {}
+        for path, content in files.items():
+            normalized = posixpath.normpath(path.replace("\\", "/"))
+            if normalized.startswith(("/", "../")) or normalized in (".", ".."):
+                raise ValueError(f"Project paths must stay inside the project: {path}")
+            self.files[normalized] = content
+        self.sources: List[str] = sorted(p for p in self.files if p.endswith(SOURCE_EXTENSIONS))
+        self.headers: List[str] = sorted(p for p in self.files if p.endswith(HEADER_EXTENSIONS))
+        if not self.sources:
+            raise ValueError(f"A project needs at least one source file ({', '.join(SOURCE_EXTENSIONS)})")
+        stems = [object_stem(p) for p in self.sources]
+        if len(set(stems)) != len(stems):
+            raise ValueError("Source paths must differ in more than punctuation")
+        self._digests: Dict[str, str] = {}
+
+    def digest(self, path: str) -> str:
+        """Content hash of one file ("missing" for files not in the project)."""
+        if path not in self.files:
+            return "missing"
+        digest = self._digests.get(path)
+        if digest is None:
+            digest = hashlib.sha256(self.files[path].encode("utf-8")).hexdigest()[:32]
+            self._digests[path] = digest
+        return digest
+
+    def key(self) -> str:
+        """Hash of every file's path and content."""
+        h = hashlib.sha256()
+        for path in sorted(self.files):
+            h.update(f"{path}\0{self.digest(path)}\0".encode("utf-8"))
+        return h.hexdigest()[:32]
+
+    def include_flags(self) -> List[str]:
+        """The project root, and include/ if there is one, as include directories."""
+        flags = ["-I."]
+        if any(p.startswith("include/") for p in self.files):
+            flags.append("-Iinclude")
+        return flags
+
+    def write(self, root: Path):
+        """
+        Write every file under root. Files already there with the same
+        content are left alone; sources and headers of an earlier version
+        that are not in the project are removed, so #includes can't find them.
+        """
+        for existing in root.rglob("*"):
+            if existing.suffix in SOURCE_EXTENSIONS + HEADER_EXTENSIONS and existing.is_file():
+                if existing.relative_to(root).as_posix() not in self.files:
+                    existing.unlink()
+        for path, content in self.files.items():
+            target = root / path
+            try:
+                if target.read_text(encoding="utf-8") == content:
+                    continue
+            except (OSError, UnicodeDecodeError):
+                target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content, encoding="utf-8")
+
+
+def object_stem(path: str) -> str:
+    """Name of a source's object and .gcno, unique in the project ("src/a.cpp" -> "src_a_cpp")."""
+    return re.sub(r"[^A-Za-z0-9_]", "_", path)
+
+
+def parse_dependencies(make_rule: str, project: Project) -> List[str]:
+    """Project headers in a compiler's -MM make rule (system headers and the source itself dropped)."""
+    _, _, prerequisites = make_rule.replace("\\\n", " ").partition(":")
+    headers = set()
+    for dependency in prerequisites.split():
+        path = posixpath.normpath(dependency)
+        if path in project.files and not path.endswith(SOURCE_EXTENSIONS):
+            headers.add(path)
+    return sorted(headers)
+
+
+def object_key_parts(project: Project, source: str, headers: List[str]) -> List[str]:
+    """
+    What a source's object depends on, for its compile cache key: its path,
+    the contents of the headers it includes and the names of every project
+    header (a header added or removed can change what an #include finds).
+    """
+    return [
+        f"source={source}",
+        *(f"header={h}:{project.digest(h)}" for h in headers),
+        "headers=" + ",".join(project.headers)
+    ]
+
+
+class DependencyIndex:
+    """
+    Project headers each source includes, per (source path, content,
+    toolchain), as found by the last -MM run, with the content hash each
+    header had then. The list only holds while every one of those headers
+    is unchanged: an edited header can start including another one, so
+    a recorded list whose headers changed is rescanned instead of reused.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self.hits = 0
+        self.scans = 0
+
+    def get(self, key: str, project: Project) -> Optional[List[str]]:
+        """Recorded headers for key, or None if the source has to be scanned."""
+        with self._lock:
+            digests = self._entries.get(key)
+            if digests is None:
+                return None
+            if any(project.digest(h) != d for h, d in digests.items()):
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return sorted(digests)
+
+    def put(self, key: str, headers: List[str], project: Project):
+        """Record a scan's headers, with their current contents' hashes."""
+        with self._lock:
+            self._entries[key] = {h: project.digest(h) for h in headers}
+            self._entries.move_to_end(key)
+            self.scans += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "scans": self.scans}
+
+
+def write_manifest(build_dir: Path, project: Project, source_root: Path):
+    """
+    Record a linked project's objects and files next to it (see read_manifest).
+    source_root holds a copy of the files, for the source lines of coverage rows.
+    """
+    manifest = {
+        "objects": [object_stem(p) for p in project.sources],
+        "files": sorted(project.files),
+        "root": str(source_root)
+    }
+    (build_dir / PROJECT_MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+
+
+def read_manifest(coverage_dir: Path) -> Optional[dict]:
+    """The manifest of the project a run's coverage belongs to, or None for single-file programs."""
+    path = coverage_dir / PROJECT_MANIFEST
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _load_manifest(str(path.resolve()), stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_manifest(path: str, mtime_ns: int) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
@@ -0,0 +1,181 @@
+"""
+F4: Resource Accounting
+Per-test CPU time, peak memory and page faults, taken from the kernel's
+rusage for the test process (wait4) instead of wall-clock time around it,
+plus aggregates over batches to find expensive inputs and size worker pools.
+"""
+
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+from models import TestExecutionOutput
+
+
+class ResourceUsage:
+    """What one test run cost, as reported by the kernel."""
+
+    def __init__(
+        self,
+        cpu_user_time: float,
+        cpu_system_time: float,
+        max_rss_kb: int,
+        minor_page_faults: int,
+        major_page_faults: int
+    ):
+        self.cpu_user_time = cpu_user_time
+        self.cpu_system_time = cpu_system_time
+        self.max_rss_kb = max_rss_kb
+        self.minor_page_faults = minor_page_faults
+        self.major_page_faults = major_page_faults
+
+    @classmethod
+    def from_rusage(cls, ru) -> "ResourceUsage":
+        """From a resource.struct_rusage (ru_maxrss is in bytes on macOS, KiB elsewhere)."""
+        max_rss = ru.ru_maxrss // 1024 if sys.platform == "darwin" else ru.ru_maxrss
+        return cls(ru.ru_utime, ru.ru_stime, max_rss, ru.ru_minflt, ru.ru_majflt)
+
+    @classmethod
+    def from_fields(cls, fields: list) -> "ResourceUsage":
+        """From a harness driver's report: user_us system_us maxrss_kb minflt majflt."""
+        user_us, system_us, max_rss_kb, minor, major = (int(field) for field in fields)
+        return cls(user_us / 1e6, system_us / 1e6, max_rss_kb, minor, major)
+
+    def fields(self) -> Dict[str, Any]:
+        """Keyword arguments for TestExecutionOutput."""
+        return {
+            "cpu_user_time": round(self.cpu_user_time, 6),
+            "cpu_system_time": round(self.cpu_system_time, 6),
+            "max_rss_kb": self.max_rss_kb,
+            "minor_page_faults": self.minor_page_faults,
+            "major_page_faults": self.major_page_faults
+        }
+
+
+def usage_fields(usage: Optional[ResourceUsage]) -> Dict[str, Any]:
+    """TestExecutionOutput keyword arguments for usage (none if it was not measured)."""
+    return usage.fields() if usage is not None else {}
+
+
+def wait_with_usage(proc: subprocess.Popen, timeout: float) -> tuple[int, Optional[ResourceUsage]]:
+    """
+    proc.wait(timeout) that also returns the child's rusage. Where wait4()
+    is unavailable (Windows) the usage is None.
+
+    Raises:
+        subprocess.TimeoutExpired if the process is still running after timeout
+    """
+    if not hasattr(os, "wait4"):
+        return proc.wait(timeout), None
+
+    deadline = time.monotonic() + timeout
+    pidfd = None
+    delay = 0.0005
+    try:
+        while True:
+            try:
+                pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+            except ChildProcessError:
+                # Reaped elsewhere
+                return proc.wait(), None
+            if pid:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            if pidfd is None and hasattr(os, "pidfd_open"):
+                try:
+                    pidfd = os.pidfd_open(proc.pid)
+                except OSError:
+                    pidfd = -1
+            if pidfd is not None and pidfd >= 0:
+                # Readable once the process has exited
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.05)
+    finally:
+        if pidfd is not None and pidfd >= 0:
+            os.close(pidfd)
+
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, ResourceUsage.from_rusage(ru)
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class UsageSummary:
+    """
+    Aggregate resource usage of many test runs.
+
+    Results reused from the result cache count as runs but not towards
+    CPU time, memory or faults (they cost nothing this time). Percentiles
+    and the most expensive inputs cover the last `window` measured runs.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self._lock = threading.Lock()
+        self._cpu: deque = deque(maxlen=window)  # (cpu seconds, test_id)
+        self._started = time.monotonic()
+        self.runs = 0
+        self.measured = 0
+        self.cpu_seconds = 0.0
+        self.peak_rss_kb = 0
+        self.minor_page_faults = 0
+        self.major_page_faults = 0
+
+    def add(self, result: TestExecutionOutput):
+        """Count one finished test."""
+        with self._lock:
+            self.runs += 1
+            if result.cached or result.cpu_user_time is None:
+                return
+            cpu = result.cpu_user_time + result.cpu_system_time
+            self.measured += 1
+            self.cpu_seconds += cpu
+            self.peak_rss_kb = max(self.peak_rss_kb, result.max_rss_kb or 0)
+            self.minor_page_faults += result.minor_page_faults or 0
+            self.major_page_faults += result.major_page_faults or 0
+            self._cpu.append((cpu, result.test_id))
+
+    def add_all(self, results: Iterable[TestExecutionOutput]) -> "UsageSummary":
+        for result in results:
+            self.add(result)
+        return self
+
+    def summary(self, workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Totals, CPU-time percentiles and the most expensive test_ids. With
+        workers, also how busy the pool was: parallelism is CPU seconds per
+        wall-clock second since the summary was created, utilization that
+        divided by the pool size.
+        """
+        with self._lock:
+            samples = sorted(self._cpu)
+            cpu = [seconds for seconds, _ in samples]
+            wall_seconds = time.monotonic() - self._started
+            summary: Dict[str, Any] = {
+                "runs": self.runs,
+                "measured": self.measured,
+                "cpu_seconds": round(self.cpu_seconds, 6),
+                "cpu_p50": round(_percentile(cpu, 0.5), 6) if cpu else None,
+                "cpu_p95": round(_percentile(cpu, 0.95), 6) if cpu else None,
+                "cpu_max": round(cpu[-1], 6) if cpu else None,
+                "peak_rss_kb": self.peak_rss_kb,
+                "minor_page_faults": self.minor_page_faults,
+                "major_page_faults": self.major_page_faults,
+                "most_expensive": [test_id for _, test_id in reversed(samples[-5:])],
+                "wall_seconds": round(wall_seconds, 3)
+            }
+            if workers is not None and wall_seconds > 0:
+                parallelism = self.cpu_seconds / wall_seconds
+                summary["parallelism"] = round(parallelism, 3)
+                summary["utilization"] = round(parallelism / workers, 3)
+        return summary
@@ -0,0 +1,136 @@
+"""
+F4: Result Cache
+Memoizes test results of deterministic programs. The GA re-submits elites
+and duplicate gene vectors every generation; running the same binary on
+the same input again would only reproduce the stored result.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+from models import TestExecutionOutput
+
+
+class ResultCache:
+    """
+    TestExecutionOutput per (binary content hash, stdin, expected output,
+    whether coverage was collected).
+
+    Keyed on the binary's content rather than its path, so a program
+    rebuilt at the same path never hits stale entries. Only completed runs
+    are stored (not timeouts or executor errors, which depend on load).
+    Entries expire after ttl seconds and the least recently used ones are
+    dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 3600):
+        """
+        Initialize result cache.
+
+        Args:
+            max_entries: Results kept at most
+            ttl: Seconds a result stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (stored_at, result), in least-recently-used order
+        self._entries: "OrderedDict[tuple, tuple[float, TestExecutionOutput]]" = OrderedDict()
+        # (path, mtime_ns, size) -> content hash
+        self._hashes: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def binary_hash(self, binary_path: str) -> str:
+        """Content hash of a binary (re-read only when the file changes)."""
+        st = os.stat(binary_path)
+        file_id = (binary_path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._hashes.get(file_id)
+            if digest is not None:
+                self._hashes.move_to_end(file_id)
+                return digest
+
+        h = hashlib.sha256()
+        with open(binary_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()[:32]
+
+        with self._lock:
+            self._hashes[file_id] = digest
+            while len(self._hashes) > 1024:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def key(
+        self,
+        binary_path: str,
+        input_str: Union[str, bytes],
+        expected_output: Optional[Any],
+        coverage: bool = True
+    ) -> Optional[tuple]:
+        """
+        Cache key for one run, or None if the binary cannot be read. Runs
+        without coverage get their own keys, so their results (which have
+        none) are never served to runs that need it.
+        """
+        try:
+            digest = self.binary_hash(binary_path)
+        except OSError:
+            return None
+        expected = None if expected_output is None else str(expected_output)
+        return digest, input_str, expected, coverage
+
+    def get(self, key: Optional[tuple]) -> Optional[TestExecutionOutput]:
+        """Stored result under key (as a copy with a fresh test_id), or None."""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        return result.model_copy(update={"test_id": str(uuid.uuid4())[:8], "cached": True})
+
+    def put(self, key: Optional[tuple], result: TestExecutionOutput):
+        """Store the result of a completed run."""
+        if key is None or result.execution_status == "error":
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result.model_copy())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every stored result."""
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Statistics for the /status endpoint."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,315 @@
+"""
+F4: SanitizerCoverage Backend
+Edge/block hit signal for fast search: the program is built with
+-fsanitize-coverage and a small runtime whose callbacks count hits in a
+shared-memory map that Python reads directly with mmap (POSIX only).
+"""
+
+import bisect
+import functools
+import mmap
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+
+# Environment variable naming the shared-memory file the runtime maps
+SANCOV_ENV = "SANCOV_SHM"
+
+# Map layout: uint32 number of slots hit, uint32 number of blocks dropped
+# because the map was full, the list of hit slots (uint32, in first-hit
+# order), SLOTS saturating 8-bit hit counters, then SLOTS uint32 PC offsets
+# (relative to the executable's load address) recorded on first hit. The
+# list lets reads and resets touch only the slots that were hit.
+#
+# Slots form an open-addressing table keyed by PC offset: each edge/block a
+# run hits owns its own slot, so hits of different blocks never merge. A
+# block that finds no free slot within 256 probes is counted as dropped.
+SLOTS = 1 << 16
+_LIST = 8
+_COUNTS = _LIST + 4 * SLOTS
+_PCS = _COUNTS + SLOTS
+MAP_BYTES = _PCS + 4 * SLOTS
+
+# Common flags; PIE keeps recorded PC offsets equal to addr2line addresses
+SANCOV_FLAGS = ["-g", "-O0", "-fPIE"]
+SANCOV_LINK_FLAGS = ["-pie"]
+
+SANCOV_RUNTIME = r'''
+#include <stdint.h>
+#include <stdlib.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <unistd.h>
+
+#define SANCOV_SLOTS (1u << 16)
+#define SANCOV_MAX_PROBES 256
+#define SANCOV_BYTES (8 + SANCOV_SLOTS * 9)
+
+extern "C" char __executable_start;
+
+static uint8_t sancov_fallback[SANCOV_BYTES];
+static uint32_t* sancov_hit_count = 0;
+static uint32_t* sancov_dropped = 0;
+static uint32_t* sancov_hit_list = 0;
+static uint8_t* sancov_counts = 0;
+static uint32_t* sancov_pcs = 0;
+
+// Map the file named by SANCOV_SHM; without it, hits go to a private buffer.
+static void sancov_attach() {
+    uint8_t* area = sancov_fallback;
+    const char* path = getenv("SANCOV_SHM");
+    if (path) {
+        int fd = open(path, O_RDWR);
+        if (fd >= 0) {
+            void* mapped = mmap(0, SANCOV_BYTES, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+            close(fd);
+            if (mapped != MAP_FAILED) area = (uint8_t*)mapped;
+        }
+    }
+    sancov_hit_count = (uint32_t*)area;
+    sancov_dropped = (uint32_t*)(area + 4);
+    sancov_hit_list = (uint32_t*)(area + 8);
+    sancov_pcs = (uint32_t*)(area + 8 + SANCOV_SLOTS * 5);
+    sancov_counts = area + 8 + SANCOV_SLOTS * 4;
+}
+
+// Count a hit of the edge/block at pc in its own slot (linear probing from
+// the offset's hash; a slot is free while its counter is 0)
+static inline void sancov_hit(uintptr_t pc) {
+    if (!sancov_counts) sancov_attach();
+    uint32_t offset = (uint32_t)(pc - (uintptr_t)&__executable_start);
+    uint32_t slot = (offset * 2654435761u) >> 16;
+    for (uint32_t probes = 0; sancov_counts[slot] && sancov_pcs[slot] != offset; probes++) {
+        if (probes == SANCOV_MAX_PROBES) {
+            ++*sancov_dropped;
+            return;
+        }
+        slot = (slot + 1) & (SANCOV_SLOTS - 1);
+    }
+    if (!sancov_counts[slot]) {
+        sancov_pcs[slot] = offset;
+        sancov_hit_list[(*sancov_hit_count)++] = slot;
+    }
+    if (sancov_counts[slot] != 255) sancov_counts[slot]++;
+}
+
+// clang: -fsanitize-coverage=trace-pc-guard, one guard per edge
+extern "C" void __sanitizer_cov_trace_pc_guard_init(uint32_t* start, uint32_t* stop) {
+    static uint32_t next = 0;
+    if (start == stop || *start) return;
+    for (uint32_t* guard = start; guard < stop; guard++) *guard = ++next;
+}
+
+extern "C" void __sanitizer_cov_trace_pc_guard(uint32_t* guard) {
+    if (*guard) sancov_hit((uintptr_t)__builtin_return_address(0));
+}
+
+// gcc: -fsanitize-coverage=trace-pc, one call per basic block
+extern "C" void __sanitizer_cov_trace_pc(void) {
+    sancov_hit((uintptr_t)__builtin_return_address(0));
+}
+
+// Harness drivers reset/dump gcov counters between runs; here the caller
+// resets the shared map instead
+extern "C" __attribute__((weak)) void __gcov_reset(void) {}
+extern "C" __attribute__((weak)) void __gcov_dump(void) {}
+'''
+
+# Compiler-generated static initializers (gcc and clang names). They run at
+# process start, not per test, so - as in gcov - their hits are not reported.
+_STARTUP_FUNCTIONS = ("_GLOBAL__sub_I_", "__static_initialization_and_destruction", "__cxx_global_var_init")
+
+
+@functools.lru_cache(maxsize=None)
+def sancov_toolchain() -> tuple[str, List[str]]:
+    """
+    Compiler and instrumentation flags: clang's trace-pc-guard (edges) when
+    clang++ is installed, otherwise gcc's trace-pc (basic blocks).
+    """
+    if shutil.which("clang++"):
+        return "clang++", SANCOV_FLAGS + ["-fsanitize-coverage=trace-pc-guard"]
+    return "g++", SANCOV_FLAGS + ["-fsanitize-coverage=trace-pc"]
+
+
+def sancov_skip_attribute() -> str:
+    """Attribute that leaves a function uninstrumented under sancov_toolchain()."""
+    if sancov_toolchain()[0] == "clang++":
+        return '__attribute__((no_sanitize("coverage"))) '
+    return "__attribute__((no_sanitize_coverage)) "
+
+
+def write_runtime(build_dir: Path) -> Path:
+    """Write the callback runtime source into build_dir."""
+    runtime_path = build_dir / "sancov_runtime.cpp"
+    runtime_path.write_text(SANCOV_RUNTIME, encoding='utf-8')
+    return runtime_path
+
+
+class CoverageMap:
+    """
+    Shared-memory hit map for one process (or one harness batch). Lives on
+    /dev/shm where available, so reading and resetting it never touches disk.
+    """
+
+    def __init__(self):
+        shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, self.path = tempfile.mkstemp(prefix="sancov_", dir=shm_dir)
+        try:
+            os.ftruncate(fd, MAP_BYTES)
+            self._map = mmap.mmap(fd, MAP_BYTES)
+        finally:
+            os.close(fd)
+
+    def _hit_slots(self) -> tuple:
+        n, = struct.unpack_from("=I", self._map, 0)
+        return struct.unpack_from(f"={min(n, SLOTS)}I", self._map, _LIST)
+
+    def reset(self):
+        """Clear hit counters before the next run."""
+        for slot in self._hit_slots():
+            self._map[_COUNTS + slot] = 0
+        struct.pack_into("=II", self._map, 0, 0, 0)
+
+    def dropped(self) -> int:
+        """Hits of blocks that found no free slot (the map was nearly full)."""
+        return struct.unpack_from("=I", self._map, 4)[0]
+
+    def hits(self) -> Dict[int, int]:
+        """
+        Returns:
+            Hit count (saturating at 255) per PC offset
+        """
+        hits: Dict[int, int] = {}
+        for slot in self._hit_slots():
+            offset, = struct.unpack_from("=I", self._map, _PCS + 4 * slot)
+            hits[offset] = self._map[_COUNTS + slot]
+        dropped = self.dropped()
+        if dropped:
+            print(f"[WARNING] sancov map full: {dropped} hits of blocks beyond its {SLOTS} slots not recorded")
+        return hits
+
+    def close(self):
+        """Unmap and delete the shared-memory file."""
+        self._map.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class PcTable:
+    """
+    Meaning of the PC offsets recorded for one binary.
+
+    Edge ids are "<function>+0x<offset>", which stay the same in every binary
+    linked from the same program object (plain, persistent and fork-server
+    builds). Symbols are read once with nm; source lines are resolved lazily
+    with addr2line, so steady-state runs start no extra process.
+    """
+
+    def __init__(self, binary_path: str):
+        self.binary_path = binary_path
+        self._starts, self._names = self._read_symbols(binary_path)
+        self._resolved: Dict[int, Optional[tuple[str, Optional[tuple[str, int]]]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_symbols(binary_path: str) -> tuple[List[int], List[str]]:
+        try:
+            result = subprocess.run(
+                ["nm", "--defined-only", binary_path],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"[WARNING] nm unavailable, sancov edge ids fall back to raw offsets: {e}")
+            return [], []
+        symbols = []
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[1] in "TtWw":
+                symbols.append((int(parts[0], 16), parts[2]))
+        symbols.sort()
+        return [address for address, _ in symbols], [name for _, name in symbols]
+
+    def _function(self, offset: int) -> Optional[tuple[str, int]]:
+        # Recorded PCs are return addresses; step back into the call instruction
+        i = bisect.bisect_right(self._starts, offset - 1) - 1
+        if i < 0:
+            return None
+        return self._names[i], self._starts[i]
+
+    def resolve(self, offsets) -> Dict[int, tuple[str, Optional[tuple[str, int]]]]:
+        """
+        Returns:
+            (edge id, (file, line) or None) per offset. PCs inside static
+            initializers are left out.
+        """
+        with self._lock:
+            missing = [offset for offset in offsets if offset not in self._resolved]
+            if missing:
+                self._resolve(missing)
+            return {
+                offset: self._resolved[offset]
+                for offset in offsets
+                if self._resolved[offset] is not None
+            }
+
+    def _resolve(self, offsets: List[int]):
+        try:
+            result = subprocess.run(
+                ["addr2line", "-e", self.binary_path],
+                input="\n".join(hex(offset - 1) for offset in offsets),
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            locations = result.stdout.splitlines()
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"[WARNING] addr2line unavailable, sancov lines not resolved: {e}")
+            locations = []
+
+        for i, offset in enumerate(offsets):
+            function = self._function(offset)
+            if function is None:
+                edge_id = f"E{offset:x}"
+            elif any(name in function[0] for name in _STARTUP_FUNCTIONS):
+                self._resolved[offset] = None
+                continue
+            else:
+                edge_id = f"{function[0]}+0x{offset - function[1]:x}"
+            location = _parse_location(locations[i]) if i < len(locations) else None
+            self._resolved[offset] = (edge_id, location)
+
+
+_pc_tables: Dict[tuple, PcTable] = {}
+_pc_tables_lock = threading.Lock()
+_MAX_PC_TABLES = 64
+
+
+def pc_table(binary_path: str) -> PcTable:
+    """PcTable for a binary, shared by every run of the same (unchanged) file."""
+    stat = os.stat(binary_path)
+    key = (binary_path, stat.st_mtime_ns)
+    with _pc_tables_lock:
+        table = _pc_tables.get(key)
+        if table is None:
+            if len(_pc_tables) >= _MAX_PC_TABLES:
+                _pc_tables.pop(next(iter(_pc_tables)))
+            table = _pc_tables[key] = PcTable(binary_path)
+        return table
+
+
+def _parse_location(text: str) -> Optional[tuple[str, int]]:
+    """Parse addr2line's "file:line (discriminator n)" output."""
+    file_name, _, line = text.partition(" ")[0].rpartition(":")
+    if not file_name or file_name == "??" or not line.isdigit() or line == "0":
+        return None
+    return file_name, int(line)
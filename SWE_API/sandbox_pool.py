@@ -0,0 +1,202 @@
+"""
+F4: Sandbox Pool
+Pre-created, reusable working directories for test executors. A sandbox is
+emptied when it is released, and the whole pool is removed on shutdown, so
+executors never leave directories or coverage files behind.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# tmpfs mounts tried (in order) when the pool is asked to stay off disk
+TMPFS_DIRS = ["/dev/shm", f"/run/user/{os.getuid()}" if hasattr(os, "getuid") else ""]
+
+
+def _tmpfs_dir() -> Optional[str]:
+    """First writable tmpfs directory that allows executing binaries, or None."""
+    for candidate in TMPFS_DIRS:
+        if not candidate or not os.path.isdir(candidate) or not os.access(candidate, os.W_OK):
+            continue
+        # Test programs are built and run inside the sandbox
+        if os.statvfs(candidate).f_flag & os.ST_NOEXEC:
+            continue
+        return candidate
+    return None
+
+
+def _usage(path: Path) -> tuple[int, int]:
+    """
+    Returns:
+        (total file bytes, file count) below path, ignoring files that
+        disappear while they are being counted
+    """
+    total = 0
+    count = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+                count += 1
+            except OSError:
+                pass
+    return total, count
+
+
+class SandboxPool:
+    """
+    Fixed set of sandbox directories handed out to one executor at a time.
+
+    When every sandbox is busy, acquire() creates an extra one; releasing
+    shrinks the pool back to its size. Released sandboxes are emptied in
+    place (the directory itself is kept), which is cheaper than mkdtemp +
+    rmtree per executor.
+    """
+
+    def __init__(
+        self,
+        size: int = 8,
+        root_dir: Optional[str] = None,
+        use_tmpfs: bool = False
+    ):
+        """
+        Initialize sandbox pool.
+
+        Args:
+            size: Number of sandboxes kept ready
+            root_dir: Directory holding the sandboxes. If None, uses a new
+                      temporary directory (on tmpfs when use_tmpfs is set).
+            use_tmpfs: Put the temporary directory on a tmpfs mount (see
+                       TMPFS_DIRS); falls back to the default temp dir if none is usable
+        """
+        self.size = size
+        self.tmpfs = False
+        if root_dir:
+            self.root = Path(root_dir).absolute()
+            self.root.mkdir(parents=True, exist_ok=True)
+        else:
+            parent = None
+            if use_tmpfs:
+                parent = _tmpfs_dir()
+                if parent is None:
+                    print("[WARNING] No executable tmpfs mount found - sandboxes use the default temp dir")
+            self.tmpfs = parent is not None
+            self.root = Path(tempfile.mkdtemp(prefix="sandbox_pool_", dir=parent))
+
+        self._lock = threading.Lock()
+        self._idle: List[Path] = []
+        self._busy: set = set()
+        self._next_id = 0
+        self._closed = False
+        self.created = 0
+        self.acquired = 0
+        self.reused = 0
+        self.reset_bytes = 0
+        self.reset_files = 0
+        self.peak_bytes = 0
+
+        for _ in range(size):
+            self._idle.append(self._create())
+
+    def _create(self) -> Path:
+        """Create a new sandbox directory (caller holds the lock or is __init__)."""
+        path = self.root / f"sandbox_{self._next_id}"
+        self._next_id += 1
+        path.mkdir()
+        self.created += 1
+        return path
+
+    def acquire(self) -> Path:
+        """Take an empty sandbox out of the pool."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Sandbox pool is closed")
+            self.acquired += 1
+            if self._idle:
+                path = self._idle.pop()
+                self.reused += 1
+            else:
+                path = self._create()
+            self._busy.add(path)
+            return path
+
+    def release(self, path: Path):
+        """Empty a sandbox and return it to the pool (or delete it if the pool is full)."""
+        path = Path(path)
+        with self._lock:
+            if path not in self._busy:
+                return
+            self._busy.discard(path)
+
+        size_bytes, file_count = _usage(path)
+        self._empty(path)
+
+        with self._lock:
+            self.reset_bytes += size_bytes
+            self.reset_files += file_count
+            self.peak_bytes = max(self.peak_bytes, size_bytes)
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(path)
+                return
+        shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _empty(path: Path):
+        """Delete everything inside path, keeping path itself."""
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    @contextmanager
+    def sandbox(self):
+        """Context manager form of acquire()/release()."""
+        path = self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def disk_usage(self) -> int:
+        """Bytes currently stored in all sandboxes."""
+        return _usage(self.root)[0]
+
+    def stats(self) -> Dict[str, object]:
+        """Pool statistics for the /status endpoint."""
+        disk_bytes = self.disk_usage()
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "tmpfs": self.tmpfs,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": len(self._busy),
+                "created": self.created,
+                "acquired": self.acquired,
+                "reused": self.reused,
+                "disk_bytes": disk_bytes,
+                "reset_bytes": self.reset_bytes,
+                "reset_files": self.reset_files,
+                "peak_sandbox_bytes": self.peak_bytes
+            }
+
+    def close(self):
+        """Delete every sandbox; sandboxes still in use are deleted too."""
+        with self._lock:
+            self._closed = True
+            self._idle.clear()
+            self._busy.clear()
+        shutil.rmtree(self.root, ignore_errors=True)
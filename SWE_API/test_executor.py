@@ -4,14 +4,126 @@ Automates compilation, execution, and coverage collection workflow.
 """
 
 import os
+import json
+import contextlib
+import functools
 import subprocess
 import tempfile
+import threading
 import time
 import uuid
 import re
+import posixpath
+import shutil
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterator, Union
 from models import TestExecutionOutput, GCovData
+from compile_cache import CompileCache
+from compile_scheduler import BuildCancelled
+from sandbox_pool import SandboxPool
+from pch import include_prefix
+from build_profiles import get_profile
+from dual_build import FAST_FLAGS, RUN_MODES, CoverageMemo
+from result_cache import ResultCache
+from timeouts import COMPILE_TIMEOUT, DEFAULT_TIMEOUT, TimeoutPolicy, kill_process_group, run_limited
+from output_capture import DEFAULT_OUTPUT_LIMIT, CapturedRun, read_captured, run_captured
+from resource_usage import usage_fields
+from cfg_parser import find_function_definitions
+from gcov_reader import GcovFormatError, read_coverage, read_files_coverage
+from branch_index import branch_index
+from function_harness import with_generated_main
+from project_build import (
+    PROJECT_MANIFEST, Project, object_key_parts, object_stem, parse_dependencies,
+    read_manifest, write_manifest
+)
+from sancov import (
+    SANCOV_ENV, SANCOV_LINK_FLAGS, CoverageMap, pc_table, sancov_skip_attribute,
+    sancov_toolchain, write_runtime
+)
+from harness import (
+    BINARY_INPUT_DRIVER, HARNESS_LINK_FLAGS, HARNESS_MODES, OUTPUT_LIMIT_ENV, PersistentHarness,
+    ForkServerHarness, driver_source, write_driver
+)
+from input_protocol import INPUT_PROTOCOL_ENV, INPUT_PROTOCOLS, pack_inputs
+
+
+# Instrumentation flag for gcov builds; compiler, other flags and linker come
+# from the build profile (build_profiles.py). All of it is part of the compile cache key.
+COVERAGE_FLAGS = ["--coverage"]
+
+# Batch execution modes: one process per test, or a harness process (see harness.py)
+EXECUTION_MODES = ["process", "persistent", "forkserver"]
+
+# Coverage backends: the gcov binary, decoding .gcno/.gcda in-process
+# (gcov_reader.py), or a -fsanitize-coverage build with a shared-memory hit map (sancov.py)
+COVERAGE_BACKENDS = ["gcov", "native", "sancov"]
+
+# Coverage scopes: instrument the whole program, or only the code under test
+# (the functions cfg_parser analyzes, i.e. everything but main, in the program's own file)
+COVERAGE_SCOPES = ["all", "target"]
+
+# Leaves a function out of --coverage instrumentation (GCC and clang)
+NO_COVERAGE_ATTRIBUTE = "__attribute__((no_profile_instrument_function)) "
+
+
+def _binary_name(stem: str) -> str:
+    """Add .exe extension on Windows"""
+    return f"{stem}.exe" if os.name == 'nt' else stem
+
+
+def input_text(test_inputs: List[Any]) -> str:
+    """The stdin a test's input values are fed as: one value per line."""
+    return "\n".join(str(inp) for inp in test_inputs) + "\n"
+
+
+def input_data(test_inputs: List[Any], input_protocol: str = "text") -> bytes:
+    """Stdin bytes for a test in one of input_protocol.INPUT_PROTOCOLS."""
+    if input_protocol == "binary":
+        return pack_inputs(test_inputs)
+    return input_text(test_inputs).encode()
+
+
+@functools.lru_cache(maxsize=None)
+def gcov_supports_json() -> bool:
+    """
+    Whether gcov can print its JSON intermediate format to stdout
+    (-j/--json-format with -t/--stdout, GCC 9+). Probed once per process.
+    """
+    try:
+        result = subprocess.run(["gcov", "--help"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return "--json-format" in result.stdout and "--stdout" in result.stdout
+
+
+@functools.lru_cache(maxsize=64)
+def _source_lines(source_path: str, mtime_ns: int, size: int) -> tuple:
+    """Lines of a compiled source file; keyed on mtime/size so rewrites are re-read."""
+    return tuple(Path(source_path).read_text(encoding='utf-8', errors='replace').splitlines())
+
+
+@functools.lru_cache(maxsize=256)
+def _restrict_to_targets(source_code: str, attribute: str) -> str:
+    """
+    Prefix main's definition with an attribute that keeps it uninstrumented.
+    The attribute goes on the line the definition starts on, so line numbers
+    do not move. Sources with no function besides main are left unchanged.
+    """
+    definitions = find_function_definitions(source_code)
+    if all(d["name"] == "main" for d in definitions):
+        print("[WARNING] No function under test found - instrumenting main")
+        return source_code
+    return _uninstrumented_main(source_code, attribute)
+
+
+@functools.lru_cache(maxsize=256)
+def _uninstrumented_main(source_code: str, attribute: str) -> str:
+    """_restrict_to_targets() for a source that may hold nothing but main (e.g. a project's main.cpp)."""
+    for definition in reversed(find_function_definitions(source_code)):
+        if definition["name"] == "main":
+            offset = definition["offset"]
+            source_code = source_code[:offset] + attribute + source_code[offset:]
+    return source_code
 
 
 class TestExecutor:
@@ -20,192 +132,892 @@ class TestExecutor:
     and gcov-based coverage data collection.
     """
     
-    def __init__(self, work_dir: Optional[str] = None):
+    def __init__(
+        self,
+        work_dir: Optional[str] = None,
+        compile_cache: Optional[CompileCache] = None,
+        coverage_backend: str = "gcov",
+        coverage_scope: str = "all",
+        sandbox_pool: Optional[SandboxPool] = None,
+        build_profile: Optional[str] = None,
+        timeout_policy: Optional[TimeoutPolicy] = None,
+        result_cache: Optional[ResultCache] = None,
+        output_limit: int = DEFAULT_OUTPUT_LIMIT,
+        input_protocol: str = "text"
+    ):
         """
         Initialize test executor.
         
         Args:
             work_dir: Working directory for compilation and execution.
-                     If None, uses a temporary directory.
+                     If None, uses a sandbox from sandbox_pool, or a temporary
+                     directory that cleanup() deletes.
+            compile_cache: Shared build cache. If None, every compile runs g++.
+            coverage_backend: "gcov" runs the gcov binary after each test;
+                     "native" decodes the .gcno/.gcda files in-process;
+                     "sancov" builds with SanitizerCoverage and reads hits from shared memory
+            coverage_scope: "all" instruments the whole program; "target" only
+                     the functions under test, so main and header code pay no
+                     counter updates and report no coverage
+            sandbox_pool: Pool that work_dir=None executors borrow their directory from
+            build_profile: Name of the gcov build profile (build_profiles.PROFILES);
+                     None uses the default, which calibration may have changed.
+                     The sancov backend always uses its own toolchain.
+            timeout_policy: Shared runtime history that shortens run timeouts
+                     for binaries whose earlier runs were fast. If None, every
+                     run gets the full timeout.
+            result_cache: Results of earlier runs of the same binary and
+                     input, returned instead of running again. Leave it None
+                     for nondeterministic programs.
+            output_limit: Bytes of stdout (and of stderr) kept per run. Runs
+                     without coverage are stopped once they exceed it or
+                     their output diverges from the expected output.
+            input_protocol: "text" feeds inputs as str() values, one per line;
+                     "binary" as packed records (input_protocol.py) that a
+                     prologue linked into the program decodes
         """
+        if input_protocol not in INPUT_PROTOCOLS:
+            raise ValueError(f"Unknown input protocol: {input_protocol}. Use one of {INPUT_PROTOCOLS}")
+        self.input_protocol = input_protocol
+        self.build_profile = get_profile(build_profile)
+        self.cleanup_files = []
+        self.sandbox_pool = None
+        self.owns_work_dir = False
         if work_dir:
-            self.work_dir = Path(work_dir)
+            self.work_dir = Path(work_dir).absolute()
             self.work_dir.mkdir(parents=True, exist_ok=True)
+        elif sandbox_pool is not None:
+            self.work_dir = sandbox_pool.acquire()
+            self.sandbox_pool = sandbox_pool
         else:
             self.work_dir = Path(tempfile.mkdtemp(prefix="test_exec_"))
+            self.owns_work_dir = True
         
-        self.cleanup_files = []
+        self.compile_cache = compile_cache
+        # Compile cache entries this executor uses, pinned until cleanup()
+        self.pinned_keys: List[str] = []
+        # Compiler processes running for this executor, killed by cancel_compiles()
+        self._compilers: List[subprocess.Popen] = []
+        self._compilers_lock = threading.Lock()
+        self.compiles_cancelled = False
+        self.coverage_backend = coverage_backend
+        self.coverage_scope = coverage_scope
+        self.timeout_policy = timeout_policy
+        self.result_cache = result_cache
+        self.output_limit = output_limit
+        # Read coverage from gcov's JSON on stdout; old toolchains use .gcov text files
+        self.gcov_json = gcov_supports_json()
+    
+    @staticmethod
+    def _sanitize(source_code: str) -> str:
+        """Remove invisible Unicode characters that break compilation."""
+        # Replace non-breaking spaces (\u00A0, \u202F, etc.) with regular spaces
+        sanitized_code = source_code
+        # Remove common problematic Unicode characters
+        sanitized_code = sanitized_code.replace('\u00A0', ' ')  # Non-breaking space
+        sanitized_code = sanitized_code.replace('\u202F', ' ')  # Narrow no-break space
+        sanitized_code = sanitized_code.replace('\u2009', ' ')  # Thin space
+        sanitized_code = sanitized_code.replace('\u200B', '')   # Zero-width space
+        sanitized_code = sanitized_code.replace('\uFEFF', '')   # Zero-width no-break space (BOM)
+        return sanitized_code
+    
+    def _prepare_source(self, source_code: str) -> str:
+        """
+        Sanitize, add a test driver to sources without main (see
+        function_harness.py), then (in "target" scope) exclude main from
+        instrumentation.
+        """
+        sanitized_code = self._sanitize(source_code)
+        attribute = sancov_skip_attribute() if self.coverage_backend == "sancov" else NO_COVERAGE_ATTRIBUTE
+        sanitized_code = with_generated_main(sanitized_code, attribute, self.input_protocol == "binary")
+        if self.coverage_scope == "target":
+            sanitized_code = _restrict_to_targets(sanitized_code, attribute)
+        return sanitized_code
+    
+    def _coverage_flags(self, source_filename: str) -> List[str]:
+        """
+        COVERAGE_FLAGS and the build profile's compile flags, plus (in "target"
+        scope) a filter to the program's own file.
+        """
+        flags = COVERAGE_FLAGS + self.build_profile.compile_flags
+        if self.coverage_scope == "target":
+            # Drops counters in header code (e.g. std::string templates) the program instantiates
+            return flags + [f"-fprofile-filter-files={re.escape(source_filename)}$"]
+        return flags
     
     def compile_with_coverage(
         self,
-        source_code: str,
+        source_code: Union[str, Project],
         source_filename: str = "test_program.cpp"
     ) -> tuple[bool, str, str]:
         """
         Compile C/C++ source code with GCC coverage flags.
         
+        If the executor has a compile cache, identical sources are built once
+        and later calls return the cached binary (or cached compile error).
+        
         Args:
-            source_code: C/C++ source code to compile
+            source_code: C/C++ source code to compile, or a multi-file Project
             source_filename: Name for the source file
         
         Returns:
             (success, binary_path, error_message)
         """
-        source_path = self.work_dir / source_filename
-        # Add .exe extension on Windows
-        binary_name = "test_program.exe" if os.name == 'nt' else "test_program"
-        binary_path = self.work_dir / binary_name
+        driver = BINARY_INPUT_DRIVER if self.input_protocol == "binary" else None
+        if isinstance(source_code, Project):
+            return self._compile_project(source_code, driver)
+        sanitized_code = self._prepare_source(source_code)
+        return self._compile_linked(sanitized_code, source_filename, driver)
+    
+    def compile_harness(
+        self,
+        source_code: Union[str, Project],
+        mode: str = "forkserver",
+        source_filename: str = "test_program.cpp"
+    ) -> tuple[bool, str, str]:
+        """
+        Compile the program with coverage and link it against a generated
+        driver (see harness.py) so one process can run many inputs.
+        
+        Args:
+            source_code: C/C++ source code (with its own main(), or one is
+                generated), or a multi-file Project
+            mode: Harness mode, one of harness.HARNESS_MODES
+            source_filename: Name for the source file
+        
+        Returns:
+            (success, harness_path, error_message)
+        """
+        if isinstance(source_code, Project):
+            return self._compile_project(source_code, mode)
+        sanitized_code = self._prepare_source(source_code)
+        return self._compile_linked(sanitized_code, source_filename, mode)
+    
+    def compile_for_mode(
+        self,
+        source_code: Union[str, Project],
+        mode: str
+    ) -> tuple[str, bool, str, str]:
+        """
+        Build what a batch execution mode needs. Harness modes fall back to
+        "process" when the harness cannot be built (e.g. fork() on Windows).
+        
+        Returns:
+            (mode_used, success, binary_or_harness_path, error_message)
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {mode}. Use one of {EXECUTION_MODES}")
+        
+        if mode in HARNESS_MODES:
+            success, harness_path, error = self.compile_harness(source_code, mode=mode)
+            if success:
+                return mode, True, harness_path, ""
+            print(f"[WARNING] {mode} harness unavailable, running one process per test: {error}")
+        
+        success, binary_path, error = self.compile_with_coverage(source_code)
+        return "process", success, binary_path, error
+    
+    def compile_fast(
+        self,
+        source_code: Union[str, Project],
+        source_filename: str = "test_program.cpp"
+    ) -> tuple[bool, str, str]:
+        """
+        Compile the program optimized and without coverage instrumentation,
+        for runs that only need a verdict (see dual_build.RUN_MODES).
+        
+        Returns:
+            (success, binary_path, error_message)
+        """
+        if isinstance(source_code, Project):
+            driver = BINARY_INPUT_DRIVER if self.input_protocol == "binary" else None
+            return self._compile_project(source_code, driver, fast=True)
+        # Same source as the coverage build, so both can share a work_dir
+        sanitized_code = self._prepare_source(source_code)
+        compiler = self.build_profile.compiler
+        link_flags = self.build_profile.link_flags
+        binary_input = self.input_protocol == "binary"
+        stem = "test_program_fast_binary_input" if binary_input else "test_program_fast"
+        if binary_input:
+            link_flags = link_flags + HARNESS_LINK_FLAGS
+        
+        def build(build_dir: Path) -> tuple[bool, str, str]:
+            source_path = build_dir / source_filename
+            binary_path = build_dir / _binary_name(stem)
+            error = self._write_source(sanitized_code, source_path, build_dir)
+            if error:
+                return False, "", error
+            sources = [str(source_path)]
+            if binary_input:
+                sources.append(str(write_driver(build_dir, BINARY_INPUT_DRIVER)))
+            
+            pch = None
+            if self.compile_cache is not None:
+                pch = self.compile_cache.pch.acquire(include_prefix(sanitized_code), compiler, FAST_FLAGS)
+            try:
+                pch_flags = ["-include", str(pch)] if pch is not None else []
+                partial_path = build_dir / f"{stem}.partial"
+                success, error = self._run_compiler(
+                    [compiler, *FAST_FLAGS, *pch_flags, *sources, *link_flags, "-o", str(partial_path)],
+                    build_dir
+                )
+            finally:
+                if pch is not None:
+                    self.compile_cache.pch.release(pch)
+            if not success:
+                return False, "", error
+            os.replace(partial_path, binary_path)
+            if build_dir == self.work_dir:
+                self.cleanup_files.append(binary_path)
+            print(f"[DEBUG] Fast build successful: {binary_path}")
+            return True, str(binary_path), ""
+        
+        if self.compile_cache is not None:
+            key = self.compile_cache.make_key(
+                sanitized_code, compiler, FAST_FLAGS + link_flags + [source_filename, stem]
+            )
+            return self._compile_cached(key, build)
+        return build(self.work_dir)
+    
+    def _program_key(self, source_code: Union[str, Project], source_filename: str = "test_program.cpp") -> str:
+        """Identifies the coverage a program reports: its source and instrumentation."""
+        compiler, flags = self._toolchain(source_filename)
+        if isinstance(source_code, Project):
+            prepared = self._prepare_project(source_code)
+            compiler, flags, _ = self._project_toolchain(prepared)
+            return CompileCache.make_key(prepared.key(), compiler, [self.coverage_backend, *flags])
+        return CompileCache.make_key(
+            self._prepare_source(source_code), compiler, [self.coverage_backend, *flags]
+        )
+    
+    def _toolchain(self, source_filename: str) -> tuple[str, List[str]]:
+        """Compiler and flags for the program object of this executor's coverage backend."""
+        if self.coverage_backend == "sancov":
+            return sancov_toolchain()
+        return self.build_profile.compiler, self._coverage_flags(source_filename)
+    
+    def _link_flags(self) -> List[str]:
+        """Flags for linking the program object into an executable."""
+        if self.coverage_backend == "sancov":
+            return list(SANCOV_LINK_FLAGS)
+        return COVERAGE_FLAGS + self.build_profile.link_flags
+    
+    def _compile_linked(
+        self,
+        sanitized_code: str,
+        source_filename: str,
+        mode: Optional[str] = None
+    ) -> tuple[bool, str, str]:
+        """
+        Compile the program object (once per source), then link it into a
+        plain binary, or into a harness when mode is one of harness.HARNESS_MODES.
+        
+        Returns:
+            (success, binary_or_harness_path, error_message)
+        """
+        def build(build_dir: Path) -> tuple[bool, str, str]:
+            return self._build_object(sanitized_code, source_filename, build_dir)
+        
+        key = None
+        if self.compile_cache is not None:
+            compiler, flags = self._toolchain(source_filename)
+            # Link flags too: every executable linked from the object lives next to it
+            key = self.compile_cache.make_key(
+                sanitized_code, compiler, flags + self._link_flags() + [source_filename, "object"]
+            )
+            success, object_path, error = self._compile_cached(key, build)
+        else:
+            success, object_path, error = build(self.work_dir)
+        
+        if not success:
+            return False, "", error
+        return self._link(Path(object_path), mode, key)
+    
+    def _prepare_project(self, project: Project) -> Project:
+        """_prepare_source() for every file of a project, without generating a driver."""
+        attribute = NO_COVERAGE_ATTRIBUTE
+        files = {}
+        for path, content in project.files.items():
+            content = self._sanitize(content)
+            if self.coverage_scope == "target" and path in project.sources and re.search(r'\bmain\s*\(', content):
+                content = _uninstrumented_main(content, attribute)
+            files[path] = content
+        return Project(files)
+    
+    def _project_toolchain(self, project: Project, fast: bool = False) -> tuple[str, List[str], List[str]]:
+        """Compiler, per-object compile flags and link flags of a project build."""
+        compiler = self.build_profile.compiler
+        if fast:
+            return compiler, FAST_FLAGS + project.include_flags(), list(self.build_profile.link_flags)
+        flags = COVERAGE_FLAGS + self.build_profile.compile_flags
+        if self.coverage_scope == "target":
+            # Every project file, headers included; library headers stay uninstrumented
+            flags = flags + ["-fprofile-filter-files=" + ";".join(f"{re.escape(p)}$" for p in sorted(project.files))]
+        return compiler, flags + project.include_flags(), self._link_flags()
+    
+    def _compile_project(
+        self,
+        project: Project,
+        mode: Optional[str] = None,
+        fast: bool = False
+    ) -> tuple[bool, str, str]:
+        """
+        Compile every source of a project to its own object and link them
+        (see project_build.py). With a compile cache, objects whose source
+        and included headers did not change are reused; without one, the
+        project is built from scratch in work_dir.
+        
+        Args:
+            project: The program's files
+            mode: None for a plain binary, or a driver to link in, as in _link()
+            fast: Build optimized without coverage (see compile_fast)
+        
+        Returns:
+            (success, binary_or_harness_path, error_message)
+        """
+        if self.coverage_backend == "sancov" and not fast:
+            return False, "", "Projects can't be built for the sancov coverage backend; use gcov or native"
+        project = self._prepare_project(project)
+        compiler, flags, link_flags = self._project_toolchain(project, fast)
+        # Uncached builds: objects, .gcno files and executables share one directory
+        root = self.work_dir / ("project_fast" if fast else "project")
+        if self.compile_cache is None:
+            root.mkdir(exist_ok=True)
+            project.write(root)
+            if root not in self.cleanup_files:
+                self.cleanup_files.append(root)
+        
+        objects = []
+        for source in project.sources:
+            success, object_path, error = self._project_object(project, source, compiler, flags, root)
+            if not success:
+                return False, "", error
+            objects.append(object_path)
+        
+        stem = "project_fast" if fast else "project"
+        if mode:
+            stem = f"{stem}_{mode}"
+        
+        def build(build_dir: Path) -> tuple[bool, str, str]:
+            objects_and_driver = list(objects)
+            flags_used = list(link_flags)
+            if mode:
+                success, driver_object_path, error = self._compile_driver(mode)
+                if not success:
+                    return False, "", error
+                objects_and_driver.append(driver_object_path)
+                flags_used += HARNESS_LINK_FLAGS
+            if not fast:
+                # Coverage of every object is read next to the executable
+                source_root = build_dir
+                if build_dir != root:
+                    source_root = build_dir / "sources"
+                    project.write(source_root)
+                    for object_path in objects:
+                        gcno = Path(object_path).with_suffix(".gcno")
+                        shutil.copyfile(gcno, build_dir / gcno.name)
+                write_manifest(build_dir, project, source_root)
+            binary_path = build_dir / _binary_name(stem)
+            partial_path = build_dir / f"{stem}.partial"
+            success, error = self._run_compiler(
+                [compiler, *objects_and_driver, *flags_used, "-o", str(partial_path)], build_dir
+            )
+            if not success:
+                return False, "", error
+            os.replace(partial_path, binary_path)
+            print(f"[DEBUG] Project linked from {len(objects)} objects: {binary_path}")
+            return True, str(binary_path), ""
+        
+        if self.compile_cache is not None:
+            # Objects live in directories named after their keys, so their paths identify them
+            key = self.compile_cache.make_key(
+                "\n".join(objects), compiler, link_flags + [stem, "project"]
+            )
+            return self._compile_cached(key, build)
+        return build(root)
+    
+    def _project_object(
+        self,
+        project: Project,
+        source: str,
+        compiler: str,
+        flags: List[str],
+        root: Path
+    ) -> tuple[bool, str, str]:
+        """
+        Object of one project source, keyed (with a compile cache) on the
+        source and the headers it includes.
+        
+        Returns:
+            (success, object_path, error_message)
+        """
+        def build(build_dir: Path) -> tuple[bool, str, str]:
+            if build_dir != root:
+                project.write(build_dir)
+            object_path = build_dir / f"{object_stem(source)}.o"
+            # The source path stays relative, so coverage reports project paths
+            success, error = self._run_compiler(
+                [compiler, *flags, "-c", source, "-o", str(object_path)], build_dir
+            )
+            if not success:
+                return False, "", error
+            print(f"[DEBUG] Compiled project source: {source}")
+            return True, str(object_path), ""
+        
+        if self.compile_cache is None:
+            return build(root)
+        
+        success, headers, error = self._project_dependencies(project, source, compiler, flags)
+        if not success:
+            return False, "", error
+        key = self.compile_cache.make_key(
+            project.files[source], compiler, flags + object_key_parts(project, source, headers)
+        )
+        return self._compile_cached(key, build)
+    
+    def _project_dependencies(
+        self,
+        project: Project,
+        source: str,
+        compiler: str,
+        flags: List[str]
+    ) -> tuple[bool, List[str], str]:
+        """
+        Project headers a source includes: recorded in the compile cache's
+        dependency index, or found by running the preprocessor (-MM).
+        
+        Returns:
+            (success, header_paths, error_message)
+        """
+        index = self.compile_cache.dependencies
+        key = self.compile_cache.make_key(
+            project.files[source], compiler, flags + [source, "headers=" + ",".join(project.headers)]
+        )
+        headers = index.get(key, project)
+        if headers is not None:
+            return True, headers, ""
+        
+        scan_dir = self.work_dir / "project_scan"
+        scan_dir.mkdir(exist_ok=True)
+        project.write(scan_dir)
+        if scan_dir not in self.cleanup_files:
+            self.cleanup_files.append(scan_dir)
+        rule_path = scan_dir / f"{object_stem(source)}.d"
+        # -MG: a missing header is the compile's error to report, not the scan's
+        success, error = self._run_compiler(
+            [compiler, *flags, "-MM", "-MG", "-MF", str(rule_path), source], scan_dir
+        )
+        if not success:
+            return False, [], error
+        headers = parse_dependencies(rule_path.read_text(encoding="utf-8"), project)
+        index.put(key, headers, project)
+        print(f"[DEBUG] {source} includes {headers}")
+        return True, headers, ""
+    
+    def _compile_cached(
+        self,
+        key: str,
+        build: Callable[[Path], tuple[bool, str, str]]
+    ) -> tuple[bool, str, str]:
+        """
+        Compile through the content-addressed cache. Callers asking for a
+        key that is already being built share that build's result, even an
+        uncached one (see compile_scheduler.py).
+        Cached files are owned by the cache, so they are never added to
+        cleanup_files; the entry is pinned until cleanup() instead.
+        """
+        cache = self.compile_cache
+        pinned = False
         
-        # Write source code to file
+        def build_and_store() -> tuple[bool, str, str]:
+            nonlocal pinned
+            # The same build may have finished between the lookup and now
+            entry = cache.lookup(key, record_stats=False, pin=True)
+            if entry is None:
+                build_dir = cache.build_dir(key)
+                build_dir.mkdir(parents=True, exist_ok=True)
+                success, binary_path, error = build(build_dir)
+                if not success and not error.startswith("Compilation failed"):
+                    # Timeouts and missing compilers are environmental; don't cache them
+                    return success, binary_path, error
+                entry = cache.store(key, success, binary_path, error, pin=True)
+            pinned = True
+            return entry.success, entry.binary_path, entry.error
+        
+        entry = cache.lookup(key, pin=True)
+        if entry is None:
+            result = cache.scheduler.coalesce(key, build_and_store)
+            # Callers that waited for another's build pin its entry themselves
+            if pinned or cache.pin(key):
+                self.pinned_keys.append(key)
+            return result
+        
+        self.pinned_keys.append(key)
+        print(f"[DEBUG] Compile cache hit: {key}")
+        return entry.success, entry.binary_path, entry.error
+    
+    def _build_object(
+        self,
+        sanitized_code: str,
+        source_filename: str,
+        build_dir: Path
+    ) -> tuple[bool, str, str]:
+        """
+        Write the source into build_dir and compile it to an object there
+        (plus the hit-map runtime for sancov). The common leading #includes
+        come from a precompiled header when the compile cache has one.
+        
+        Returns:
+            (success, object_path, error_message)
+        """
+        compiler, flags = self._toolchain(source_filename)
+        sancov = self.coverage_backend == "sancov"
+        source_path = build_dir / source_filename
+        object_path = build_dir / ("test_program_sancov.o" if sancov else "test_program.o")
+        
+        error = self._write_source(sanitized_code, source_path, build_dir)
+        if error:
+            return False, "", error
+        
+        # -fprofile-arcs: Generates .gcda files (execution counts)
+        # -ftest-coverage: Generates .gcno files (graph info)
+        # --coverage: Shorthand for both
+        steps = []
+        if sancov:
+            try:
+                runtime_path = write_runtime(build_dir)
+            except Exception as e:
+                error_msg = f"Failed to write sancov runtime: {e}"
+                print(f"[ERROR] {error_msg}")
+                return False, "", error_msg
+            runtime_object_path = build_dir / "sancov_runtime.o"
+            steps.append([compiler, "-O2", "-fPIE", "-c", str(runtime_path), "-o", str(runtime_object_path)])
+            if build_dir == self.work_dir:
+                self.cleanup_files.extend([runtime_path, runtime_object_path])
+        
+        pch = None
+        if self.compile_cache is not None:
+            pch = self.compile_cache.pch.acquire(include_prefix(sanitized_code), compiler, flags)
         try:
-            # SANITIZE: Remove invisible Unicode characters that break compilation
-            # Replace non-breaking spaces (\u00A0, \u202F, etc.) with regular spaces
-            sanitized_code = source_code
-            # Remove common problematic Unicode characters
-            sanitized_code = sanitized_code.replace('\u00A0', ' ')  # Non-breaking space
-            sanitized_code = sanitized_code.replace('\u202F', ' ')  # Narrow no-break space
-            sanitized_code = sanitized_code.replace('\u2009', ' ')  # Thin space
-            sanitized_code = sanitized_code.replace('\u200B', '')   # Zero-width space
-            sanitized_code = sanitized_code.replace('\uFEFF', '')   # Zero-width no-break space (BOM)
+            pch_flags = ["-include", str(pch)] if pch is not None else []
+            steps.insert(0, [compiler, *flags, *pch_flags, "-c", str(source_path), "-o", str(object_path)])
+            for compile_cmd in steps:
+                success, error = self._run_compiler(compile_cmd, build_dir)
+                if not success:
+                    return False, "", error
+        finally:
+            if pch is not None:
+                self.compile_cache.pch.release(pch)
+        
+        if build_dir == self.work_dir:
+            self.cleanup_files.append(object_path)
+        
+        print(f"[DEBUG] Compilation successful: {object_path}")
+        return True, str(object_path), ""
+    
+    def _compile_driver(self, mode: str) -> tuple[bool, str, str]:
+        """
+        Compile the harness driver for mode. Drivers do not depend on the
+        program, so with a compile cache each one is compiled only once.
+        
+        Returns:
+            (success, driver_object_path, error_message)
+        """
+        if self.coverage_backend == "sancov":
+            compiler, flags, suffix = sancov_toolchain()[0], ["-O0", "-fPIE"], "_sancov"
+        else:
+            compiler, flags, suffix = self.build_profile.compiler, ["-O0"], ""
+        
+        def build(build_dir: Path) -> tuple[bool, str, str]:
+            driver_object_path = build_dir / f"harness_{mode}{suffix}.o"
+            try:
+                driver_path = write_driver(build_dir, mode)
+            except Exception as e:
+                error_msg = f"Failed to write harness driver: {e}"
+                print(f"[ERROR] {error_msg}")
+                return False, "", error_msg
+            success, error = self._run_compiler(
+                [compiler, *flags, "-c", str(driver_path), "-o", str(driver_object_path)], build_dir
+            )
+            if not success:
+                return False, "", error
+            if build_dir == self.work_dir:
+                self.cleanup_files.extend([driver_path, driver_object_path])
+            return True, str(driver_object_path), ""
+        
+        if self.compile_cache is not None:
+            key = self.compile_cache.make_key(driver_source(mode), compiler, flags + [f"driver={mode}"])
+            return self._compile_cached(key, build)
+        return build(self.work_dir)
+    
+    def _link(
+        self,
+        object_path: Path,
+        mode: Optional[str],
+        key: Optional[str] = None
+    ) -> tuple[bool, str, str]:
+        """
+        Link the program object into an executable next to it (and its .gcno).
+        In a cached build each executable is linked once and later calls
+        return the existing file; uncached builds are always relinked, since
+        the object in work_dir may have been rebuilt from another source.
+        
+        Args:
+            object_path: Program object from _build_object
+            mode: None for a plain binary, or one of harness.HARNESS_MODES
+            key: Compile cache key of the object's build, if cached
+        
+        Returns:
+            (success, binary_path, error_message)
+        """
+        build_dir = object_path.parent
+        if self.coverage_backend == "sancov":
+            compiler = sancov_toolchain()[0]
+            objects = [str(object_path), str(build_dir / "sancov_runtime.o")]
+            stem = "test_program_sancov"
+        else:
+            compiler = self.build_profile.compiler
+            objects = [str(object_path)]
+            stem = "test_program"
+        link_flags = self._link_flags()
+        if mode:
+            stem = f"{stem}_{mode}"
+            link_flags += HARNESS_LINK_FLAGS
+        binary_path = build_dir / _binary_name(stem)
+        if key and binary_path.exists():
+            print(f"[DEBUG] Already linked: {binary_path}")
+            return True, str(binary_path), ""
+        
+        def link() -> tuple[bool, str, str]:
+            # Another link of the same executable may have finished since the check above
+            if key and binary_path.exists():
+                return True, str(binary_path), ""
+            
+            if mode:
+                success, driver_object_path, error = self._compile_driver(mode)
+                if not success:
+                    return False, "", error
+                objects.append(driver_object_path)
+            
+            # Link under a temporary name so a failed link never leaves a binary behind
+            partial_path = build_dir / f"{stem}.partial"
+            success, error = self._run_compiler(
+                [compiler, *objects, *link_flags, "-o", str(partial_path)], build_dir
+            )
+            if not success:
+                return False, "", error
+            os.replace(partial_path, binary_path)
+            
+            if key:
+                self.compile_cache.grow(key, binary_path.stat().st_size)
+            elif build_dir == self.work_dir:
+                self.cleanup_files.append(binary_path)
             
+            print(f"[DEBUG] Link successful: {binary_path}")
+            return True, str(binary_path), ""
+        
+        if key:
+            # Executables are not cache entries of their own; concurrent links of one share it
+            return self.compile_cache.scheduler.coalesce(f"{key}/{stem}", link)
+        return link()
+    
+    def _write_source(
+        self,
+        sanitized_code: str,
+        source_path: Path,
+        build_dir: Path
+    ) -> Optional[str]:
+        """Write source code to file. Returns an error message on failure."""
+        try:
             with open(source_path, 'w', encoding='utf-8') as f:
                 f.write(sanitized_code)
-            self.cleanup_files.append(source_path)
+            if build_dir == self.work_dir:
+                self.cleanup_files.append(source_path)
             print(f"[DEBUG] Source file written: {source_path}")
+            return None
         except Exception as e:
             error_msg = f"Failed to write source: {e}"
             print(f"[ERROR] {error_msg}")
-            return False, "", error_msg
+            return error_msg
+    
+    def _run_compiler(self, compile_cmd: List[str], build_dir: Path) -> tuple[bool, str]:
+        """
+        Run one compiler/linker command in build_dir, in one of the
+        compile cache scheduler's slots when there is a cache.
         
-        # Compile with coverage flags
-        # -fprofile-arcs: Generates .gcda files (execution counts)
-        # -ftest-coverage: Generates .gcno files (graph info)
-        # --coverage: Shorthand for both
-        compile_cmd = [
-            "g++",
-            "--coverage",           # Enable coverage instrumentation
-            "-g",                    # Debug symbols
-            "-O0",                   # No optimization for accurate coverage
-            str(source_path),
-            "-o", str(binary_path)
-        ]
+        Returns:
+            (success, error_message)
         
+        Raises:
+            BuildCancelled if cancel_compiles() was called
+        """
         try:
-            print(f"[DEBUG] Compiling: {' '.join(compile_cmd)}")
-            result = subprocess.run(
-                compile_cmd,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=str(self.work_dir)
-            )
+            slot = self.compile_cache.scheduler.slot() if self.compile_cache is not None else contextlib.nullcontext()
+            with slot:
+                if self.compiles_cancelled:
+                    raise BuildCancelled(" ".join(compile_cmd))
+                print(f"[DEBUG] Compiling: {' '.join(compile_cmd)}")
+                # Timeouts kill the whole group, including cc1plus/as/ld under the driver
+                result = run_limited(
+                    compile_cmd,
+                    timeout=COMPILE_TIMEOUT,
+                    cwd=str(build_dir),
+                    cpu_limit=False,
+                    on_start=self._compiler_started
+                )
+            # A killed compiler's errors say nothing about the source
+            if self.compiles_cancelled:
+                raise BuildCancelled(" ".join(compile_cmd))
             
             if result.returncode != 0:
                 error_msg = f"Compilation failed: {result.stderr}"
                 print(f"[ERROR] {error_msg}")
-                return False, "", error_msg
-            
-            if not binary_path.exists():
-                error_msg = f"Binary not created: {binary_path}"
-                print(f"[ERROR] {error_msg}")
-                return False, "", error_msg
+                return False, error_msg
             
-            self.cleanup_files.append(binary_path)
-            print(f"[DEBUG] Compilation successful: {binary_path}")
-            return True, str(binary_path), ""
+            return True, ""
             
+        except BuildCancelled:
+            print(f"[DEBUG] Compile cancelled: {compile_cmd[0]}")
+            raise
         except subprocess.TimeoutExpired:
             error_msg = "Compilation timeout"
             print(f"[ERROR] {error_msg}")
-            return False, "", error_msg
+            return False, error_msg
         except FileNotFoundError:
             error_msg = "g++ not found. Please install MinGW-w64 or GCC on Windows"
             print(f"[ERROR] {error_msg}")
-            return False, "", error_msg
+            return False, error_msg
         except Exception as e:
             error_msg = f"Compilation error: {e}"
             print(f"[ERROR] {error_msg}")
-            return False, "", error_msg
+            return False, error_msg
+        finally:
+            with self._compilers_lock:
+                self._compilers = [p for p in self._compilers if p.returncode is None]
+    
+    def _compiler_started(self, proc: subprocess.Popen):
+        """Track a compiler process so cancel_compiles() can kill it."""
+        with self._compilers_lock:
+            self._compilers.append(proc)
+            if self.compiles_cancelled:
+                kill_process_group(proc)
+    
+    def cancel_compiles(self):
+        """
+        Kill this executor's running compiler processes (with everything
+        they started) and make its further compile steps raise BuildCancelled,
+        e.g. when the request that needed the build was cancelled.
+        Builds other executors were waiting for are started again by them.
+        """
+        with self._compilers_lock:
+            self.compiles_cancelled = True
+            for proc in self._compilers:
+                if proc.returncode is None:
+                    kill_process_group(proc)
     
     def execute_test(
         self,
         binary_path: str,
         test_inputs: List[Any],
         expected_output: Optional[Any] = None,
-        timeout: int = 5
+        timeout: Optional[float] = None,
+        collect_coverage: bool = True
     ) -> TestExecutionOutput:
         """
         Execute compiled binary with test inputs and collect results.
         
+        Every run writes its .gcda into its own run directory (GCOV_PREFIX),
+        so counters never accumulate across runs and one binary can be
+        executed by many threads at once.
+        
         Args:
             binary_path: Path to compiled binary
             test_inputs: List of input values for the program
             expected_output: Expected output (for pass/fail determination)
-            timeout: Execution timeout in seconds
+            timeout: Longest the run may take, in seconds (default
+                     DEFAULT_TIMEOUT). With a timeout policy, binaries whose
+                     earlier runs were fast get less; result.timeout reports
+                     the value used.
+            collect_coverage: False for builds from compile_fast(); the
+                     result then has no coverage data
         
         Returns:
             TestExecutionOutput with execution results and coverage data
         """
+        # Prepare stdin
+        stdin = input_data(test_inputs, self.input_protocol)
+        cache_key, cached = self._cached_result(binary_path, stdin, expected_output, collect_coverage)
+        if cached is not None:
+            return cached
+        
         test_id = str(uuid.uuid4())[:8]
         start_time = time.time()
         
-        # Prepare input string
-        input_str = "\n".join(str(inp) for inp in test_inputs) + "\n"
+        ceiling = timeout or DEFAULT_TIMEOUT
+        timeout = self._run_timeout(binary_path, ceiling)
+        
+        # Per-run coverage directory, removed once its data has been parsed
+        build_dir = Path(binary_path).parent
+        run_dir = self.work_dir / f"run_{test_id}"
+        env = self._run_env(build_dir, prefix=run_dir)
+        coverage_map = self._coverage_map(env) if collect_coverage else None
         
         try:
-            # Execute the binary
-            print(f"[DEBUG] Executing: {binary_path} with inputs: {test_inputs}")
-            result = subprocess.run(
+            run_dir.mkdir(parents=True)
+            
+            # Execute the binary. Runs that need coverage go on to the end
+            # even when their output has already failed the check.
+            print(f"[DEBUG] Executing: {binary_path} with inputs: {test_inputs} (timeout {timeout}s)")
+            result = run_captured(
                 [binary_path],
-                input=input_str,
-                capture_output=True,
-                text=True,
+                input_data=stdin,
                 timeout=timeout,
-                cwd=str(self.work_dir)
+                cwd=str(self.work_dir),
+                env=env,
+                expected_output=expected_output,
+                output_limit=self.output_limit,
+                stop_early=not collect_coverage
             )
             
             execution_time = time.time() - start_time
-            output = result.stdout.strip()
-            error = result.stderr.strip() if result.stderr else None
+            if not result.stopped:
+                self._record_runtime(binary_path, execution_time)
+            output = result.output
+            error = result.error
             
             print(f"[DEBUG] Execution output: '{output}', expected: '{expected_output}'")
             if result.returncode != 0:
                 print(f"[DEBUG] Execution failed with return code: {result.returncode}")
             
             # Determine pass/fail status
-            if result.returncode != 0:
-                status = "failed"
-            elif expected_output is not None:
-                status = "passed" if str(output) == str(expected_output) else "failed"
-            else:
-                status = "passed"  # No expected output, just check if it ran
+            status = self._determine_status(result.returncode, output, expected_output)
             
             print(f"[DEBUG] Test status: {status}")
             
             # Collect coverage data
-            coverage_data, branches_taken = self._collect_coverage_data()
+            if not collect_coverage:
+                coverage_data, branches_taken = [], []
+            elif coverage_map is not None:
+                coverage_data, branches_taken = self._collect_sancov(coverage_map, binary_path)
+            else:
+                self._link_gcno(build_dir, run_dir)
+                coverage_data, branches_taken = self._collect_coverage_data(run_dir)
             print(f"[DEBUG] Coverage data collected: {len(coverage_data)} lines, {len(branches_taken)} branches")
             
-            return TestExecutionOutput(
+            return self._remember(cache_key, TestExecutionOutput(
                 test_id=test_id,
                 execution_status=status,
                 output=output,
                 error=error,
                 coverage_data=coverage_data,
                 branches_taken=branches_taken,
-                execution_time=round(execution_time, 3)
-            )
+                execution_time=round(execution_time, 3),
+                timeout=timeout,
+                **usage_fields(result.usage)
+            ))
             
         except subprocess.TimeoutExpired:
-            return TestExecutionOutput(
-                test_id=test_id,
-                execution_status="error",
-                output=None,
-                error="Execution timeout",
-                coverage_data=[],
-                branches_taken=[],
-                execution_time=timeout
-            )
+            return self._timeout_output(test_id, timeout, ceiling)
         except Exception as e:
             return TestExecutionOutput(
                 test_id=test_id,
@@ -214,41 +1026,520 @@ class TestExecutor:
                 error=str(e),
                 coverage_data=[],
                 branches_taken=[],
-                execution_time=time.time() - start_time
+                execution_time=time.time() - start_time,
+                timeout=timeout
             )
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            if coverage_map is not None:
+                coverage_map.close()
+    
+    def _cached_result(
+        self,
+        binary_path: str,
+        stdin: bytes,
+        expected_output: Optional[Any],
+        collect_coverage: bool = True
+    ) -> tuple[Optional[tuple], Optional[TestExecutionOutput]]:
+        """
+        Returns:
+            (result cache key, stored result or None); (None, None) without a result cache
+        """
+        if self.result_cache is None:
+            return None, None
+        key = self.result_cache.key(binary_path, stdin, expected_output, collect_coverage)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            print(f"[DEBUG] Result cache hit: {binary_path} with input {stdin[:200]!r}")
+        return key, cached
+    
+    def _remember(self, cache_key: Optional[tuple], result: TestExecutionOutput) -> TestExecutionOutput:
+        """Store a fresh result in the result cache; returns it unchanged."""
+        if self.result_cache is not None:
+            self.result_cache.put(cache_key, result)
+        return result
+    
+    def _run_timeout(self, binary_path: str, ceiling: float) -> float:
+        """Timeout for the next run of binary_path: the policy's choice, or ceiling."""
+        if self.timeout_policy is None:
+            return ceiling
+        return self.timeout_policy.timeout_for(binary_path, ceiling)
+    
+    def _record_runtime(self, binary_path: str, seconds: float):
+        """Feed a run that finished in time into the timeout policy."""
+        if self.timeout_policy is not None:
+            self.timeout_policy.record(binary_path, seconds)
+    
+    def _timeout_output(self, test_id: str, timeout: float, ceiling: float) -> TestExecutionOutput:
+        """Result for a run that was killed after timeout seconds."""
+        print(f"[WARNING] Run {test_id} killed after {timeout}s (ceiling {ceiling}s)")
+        if self.timeout_policy is not None:
+            self.timeout_policy.record_timeout(timeout, ceiling)
+        return TestExecutionOutput(
+            test_id=test_id,
+            execution_status="error",
+            output=None,
+            error="Execution timeout",
+            coverage_data=[],
+            branches_taken=[],
+            execution_time=timeout,
+            timeout=timeout
+        )
+    
+    def iter_many(
+        self,
+        path: str,
+        mode: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        timeout: Optional[float] = None,
+        collect_coverage: bool = True
+    ) -> Iterator[TestExecutionOutput]:
+        """
+        Run many test inputs against a build from compile_for_mode() (or,
+        with collect_coverage=False and mode "process", from compile_fast()).
+        Harness builds run with collect_coverage=False skip reading coverage,
+        for callers that only want outputs.
+        
+        Yields each result, in input order, as soon as its run finishes.
+        Closing the generator early skips the remaining inputs.
+        """
+        if mode in ("persistent", "forkserver"):
+            harness_class = PersistentHarness if mode == "persistent" else ForkServerHarness
+            yield from self._iter_harness(
+                harness_class, path, test_inputs_list, expected_outputs, timeout, collect_coverage
+            )
+            return
+        
+        expected_outputs = expected_outputs or [None] * len(test_inputs_list)
+        for test_inputs, expected_output in zip(test_inputs_list, expected_outputs):
+            yield self.execute_test(path, test_inputs, expected_output, timeout, collect_coverage)
+    
+    def execute_many(
+        self,
+        path: str,
+        mode: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        timeout: Optional[float] = None,
+        collect_coverage: bool = True
+    ) -> List[TestExecutionOutput]:
+        """
+        List form of iter_many().
+        
+        Returns:
+            One TestExecutionOutput per input, in input order
+        """
+        return list(self.iter_many(
+            path, mode, test_inputs_list, expected_outputs, timeout, collect_coverage
+        ))
+    
+    def iter_source(
+        self,
+        source_code: Union[str, Project],
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        mode: str = "process",
+        run_mode: str = "coverage",
+        timeout: Optional[float] = None,
+        coverage_memo: Optional[CoverageMemo] = None,
+        runner: Optional[Callable[..., Iterator[tuple[int, TestExecutionOutput]]]] = None,
+        collect_coverage: bool = True
+    ) -> Iterator[tuple[int, TestExecutionOutput]]:
+        """
+        Build what run_mode needs and run every input, yielding
+        (input index, result) pairs as the runs finish.
+        
+        In "auto" mode, inputs found in coverage_memo run on the fast build
+        and get their recorded coverage; the rest run instrumented and are
+        recorded. Without a memo, repeated inputs within the call are still
+        only instrumented once. Instrumented inputs are yielded before fast
+        ones, so only the coverage of first runs that repeat later is kept.
+        
+        Args:
+            source_code: C/C++ source code, or a multi-file Project (project_build.py)
+            test_inputs_list: Input values per test
+            expected_outputs: Expected output per test (None entries skip the check)
+            mode: Execution mode for instrumented runs (fast runs use "process")
+            run_mode: One of dual_build.RUN_MODES
+            timeout: Per-test timeout ceiling in seconds (see execute_test)
+            coverage_memo: Coverage recorded by earlier "auto" runs
+            runner: Takes the arguments of iter_many and yields (position, result)
+                pairs in any order, e.g. to run in parallel
+            collect_coverage: False runs the instrumented inputs on the same
+                build but skips reading their coverage (e.g. a reference
+                implementation, whose outputs are all that matters)
+        
+        Yields:
+            (index into test_inputs_list, TestExecutionOutput), once per input
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {mode}. Use one of {EXECUTION_MODES}")
+        if run_mode not in RUN_MODES:
+            raise ValueError(f"Unknown run mode: {run_mode}. Use one of {RUN_MODES}")
+        expected_outputs = expected_outputs or [None] * len(test_inputs_list)
+        runner = runner or (lambda *args: enumerate(self.iter_many(*args)))
+        
+        indices = list(range(len(test_inputs_list)))
+        instrumented, fast = (indices, []) if run_mode == "coverage" else ([], indices)
+        if run_mode == "auto":
+            memo = coverage_memo if coverage_memo is not None else CoverageMemo()
+            program_key = self._program_key(source_code)
+            texts = [input_data(test_inputs, self.input_protocol) for test_inputs in test_inputs_list]
+            # Known coverage per fast input; repeats of a new input take it from its first run
+            known: Dict[int, tuple] = {}
+            seen = set()
+            instrumented, fast = [], []
+            for i, text in enumerate(texts):
+                entry = memo.get(program_key, text) if text not in seen else None
+                if entry is not None:
+                    known[i] = entry
+                    fast.append(i)
+                elif text in seen:
+                    fast.append(i)
+                else:
+                    seen.add(text)
+                    instrumented.append(i)
+            repeated = {texts[i] for i in fast if i not in known}
+            first_coverage: Dict[str, tuple] = {}
+        
+        def run(run_indices: List[int], path: str, run_in_mode: str, collect_coverage: bool):
+            pairs = runner(
+                path, run_in_mode,
+                [test_inputs_list[i] for i in run_indices],
+                [expected_outputs[i] for i in run_indices],
+                timeout, collect_coverage
+            )
+            try:
+                for position, result in pairs:
+                    yield run_indices[position], result
+            finally:
+                close = getattr(pairs, "close", None)
+                if close is not None:
+                    close()
+        
+        if instrumented:
+            mode_used, success, path, error = self.compile_for_mode(source_code, mode)
+            if not success:
+                for i in indices:
+                    yield i, compilation_error_output(error)
+                return
+            for i, result in run(instrumented, path, mode_used, collect_coverage):
+                if run_mode == "auto" and result.execution_status != "error":
+                    memo.put(program_key, texts[i], result.coverage_data, result.branches_taken)
+                    if texts[i] in repeated:
+                        first_coverage[texts[i]] = (result.coverage_data, result.branches_taken)
+                yield i, result
+        
+        if fast:
+            success, path, error = self.compile_fast(source_code)
+            if not success:
+                for i in fast:
+                    yield i, compilation_error_output(error)
+                return
+            for i, result in run(fast, path, "process", False):
+                if run_mode == "auto" and result.execution_status != "error":
+                    coverage = known.get(i) or first_coverage.get(texts[i])
+                    if coverage is not None:
+                        result.coverage_data, result.branches_taken = coverage
+                yield i, result
+    
+    def execute_source(
+        self,
+        source_code: Union[str, Project],
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        mode: str = "process",
+        run_mode: str = "coverage",
+        timeout: Optional[float] = None,
+        coverage_memo: Optional[CoverageMemo] = None,
+        runner: Optional[Callable[..., Iterator[tuple[int, TestExecutionOutput]]]] = None,
+        collect_coverage: bool = True
+    ) -> List[TestExecutionOutput]:
+        """
+        List form of iter_source() (same arguments).
+        
+        Returns:
+            One TestExecutionOutput per input, in input order
+        """
+        results: List[Optional[TestExecutionOutput]] = [None] * len(test_inputs_list)
+        for i, result in self.iter_source(
+            source_code, test_inputs_list, expected_outputs, mode, run_mode,
+            timeout, coverage_memo, runner, collect_coverage
+        ):
+            results[i] = result
+        return results
+    
+    def execute_persistent(
+        self,
+        harness_path: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        timeout: Optional[float] = None
+    ) -> List[TestExecutionOutput]:
+        """
+        Run many test inputs through one persistent harness process.
+        
+        Each input gets its own run directory holding stdin/stdout/stderr and
+        the .gcda written by the harness, so coverage is exact per input.
+        
+        Args:
+            harness_path: Path returned by compile_harness(mode="persistent")
+            test_inputs_list: One list of input values per test
+            expected_outputs: Expected output per test (None entries skip the check)
+            timeout: Per-test timeout ceiling in seconds (see execute_test)
+        
+        Returns:
+            One TestExecutionOutput per input, in input order
+        """
+        return self._execute_harness(
+            PersistentHarness, harness_path, test_inputs_list, expected_outputs, timeout
+        )
+    
+    def execute_forkserver(
+        self,
+        harness_path: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]] = None,
+        timeout: Optional[float] = None
+    ) -> List[TestExecutionOutput]:
+        """
+        Run many test inputs through one fork-server harness process (POSIX only).
+        
+        The server stops after program startup and forks a child per input, so
+        each run skips exec and dynamic loading but otherwise behaves like
+        execute_test: fresh process state, exit codes, stdout, timeouts and
+        coverage flushed at exit.
+        
+        Args:
+            harness_path: Path returned by compile_harness(mode="forkserver")
+            test_inputs_list: One list of input values per test
+            expected_outputs: Expected output per test (None entries skip the check)
+            timeout: Per-test timeout ceiling in seconds (see execute_test)
+        
+        Returns:
+            One TestExecutionOutput per input, in input order
+        """
+        return self._execute_harness(
+            ForkServerHarness, harness_path, test_inputs_list, expected_outputs, timeout
+        )
+    
+    def _execute_harness(
+        self,
+        harness_class: type,
+        harness_path: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]],
+        timeout: Optional[float]
+    ) -> List[TestExecutionOutput]:
+        """Shared entry point of the harness-based execution modes."""
+        return list(self._iter_harness(
+            harness_class, harness_path, test_inputs_list, expected_outputs, timeout
+        ))
+    
+    def _iter_harness(
+        self,
+        harness_class: type,
+        harness_path: str,
+        test_inputs_list: List[List[Any]],
+        expected_outputs: Optional[List[Optional[Any]]],
+        timeout: Optional[float],
+        collect_coverage: bool = True
+    ) -> Iterator[TestExecutionOutput]:
+        """Shared run loop for the harness-based execution modes (yields results in input order)."""
+        ceiling = timeout or DEFAULT_TIMEOUT
+        build_dir = Path(harness_path).parent
+        batch_dir = self.work_dir / f"harness_{uuid.uuid4().hex[:8]}"
+        expected_outputs = expected_outputs or [None] * len(test_inputs_list)
+        
+        # The harness sets GCOV_PREFIX to each run directory itself. Output
+        # files may grow one byte past the limit, so truncation is detected.
+        env = self._run_env(build_dir)
+        env[OUTPUT_LIMIT_ENV] = str(self.output_limit + 1)
+        coverage_map = self._coverage_map(env) if collect_coverage else None
+        harness = harness_class(harness_path, cwd=str(self.work_dir), env=env)
+        
+        completed = 0
+        try:
+            for i, (test_inputs, expected_output) in enumerate(zip(test_inputs_list, expected_outputs)):
+                stdin = input_data(test_inputs, self.input_protocol)
+                cache_key, cached = self._cached_result(harness_path, stdin, expected_output, collect_coverage)
+                if cached is not None:
+                    completed += 1
+                    yield cached
+                    continue
+                
+                test_id = str(uuid.uuid4())[:8]
+                run_dir = batch_dir / f"run_{i}"
+                run_dir.mkdir(parents=True)
+                (run_dir / "stdin").write_bytes(stdin)
+                
+                if coverage_map is not None:
+                    coverage_map.reset()
+                run_timeout = self._run_timeout(harness_path, ceiling)
+                start_time = time.time()
+                try:
+                    returncode = harness.run(run_dir, run_timeout)
+                except subprocess.TimeoutExpired:
+                    completed += 1
+                    yield self._timeout_output(test_id, run_timeout, ceiling)
+                    continue
+                except Exception as e:
+                    completed += 1
+                    yield TestExecutionOutput(
+                        test_id=test_id,
+                        execution_status="error",
+                        output=None,
+                        error=str(e),
+                        coverage_data=[],
+                        branches_taken=[],
+                        execution_time=time.time() - start_time,
+                        timeout=run_timeout
+                    )
+                    continue
+                execution_time = time.time() - start_time
+                self._record_runtime(harness_path, execution_time)
+                
+                captured = CapturedRun(
+                    returncode,
+                    read_captured(run_dir / "stdout", self.output_limit, expected_output),
+                    read_captured(run_dir / "stderr", self.output_limit)
+                )
+                output = captured.output
+                error = captured.error
+                status = self._determine_status(returncode, output, expected_output)
+                
+                if not collect_coverage:
+                    coverage_data, branches_taken = [], []
+                elif coverage_map is not None:
+                    coverage_data, branches_taken = self._collect_sancov(coverage_map, harness_path)
+                else:
+                    self._link_gcno(build_dir, run_dir)
+                    coverage_data, branches_taken = self._collect_coverage_data(run_dir)
+                
+                completed += 1
+                yield self._remember(cache_key, TestExecutionOutput(
+                    test_id=test_id,
+                    execution_status=status,
+                    output=output,
+                    error=error,
+                    coverage_data=coverage_data,
+                    branches_taken=branches_taken,
+                    execution_time=round(execution_time, 3),
+                    timeout=run_timeout,
+                    **usage_fields(harness.last_usage)
+                ))
+        finally:
+            harness.close()
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            if coverage_map is not None:
+                coverage_map.close()
+        
+        print(f"[DEBUG] {harness_class.__name__} ran {completed} tests in {harness.spawn_count} process(es)")
+    
+    @staticmethod
+    def _determine_status(returncode: int, output: str, expected_output: Optional[Any]) -> str:
+        """Map exit code and output to "passed"/"failed"."""
+        if returncode != 0:
+            return "failed"
+        elif expected_output is not None:
+            return "passed" if str(output) == str(expected_output) else "failed"
+        else:
+            return "passed"  # No expected output, just check if it ran
     
-    def _collect_coverage_data(self) -> tuple[List[GCovData], List[str]]:
+    def _run_env(self, build_dir: Path, prefix: Optional[Path] = None) -> Dict[str, str]:
+        """_gcov_env(), plus the switch that makes programs decode binary inputs."""
+        env = self._gcov_env(build_dir, prefix)
+        if self.input_protocol == "binary":
+            env[INPUT_PROTOCOL_ENV] = "binary"
+        return env
+    
+    @staticmethod
+    def _gcov_env(build_dir: Path, prefix: Optional[Path] = None) -> Dict[str, str]:
+        """
+        Environment that re-roots the .gcda path baked into a binary: the build
+        directory is stripped and replaced by GCOV_PREFIX.
+        """
+        env = dict(os.environ)
+        env["GCOV_PREFIX_STRIP"] = str(len(build_dir.absolute().parts) - 1)
+        if prefix is not None:
+            env["GCOV_PREFIX"] = str(prefix)
+        return env
+    
+    def _coverage_map(self, env: Dict[str, str]) -> Optional[CoverageMap]:
+        """Shared-memory hit map for the sancov backend, announced to the program via env."""
+        if self.coverage_backend != "sancov":
+            return None
+        coverage_map = CoverageMap()
+        env[SANCOV_ENV] = coverage_map.path
+        return coverage_map
+    
+    @staticmethod
+    def _link_gcno(build_dir: Path, coverage_dir: Path):
+        """Make the build's .gcno files (and project manifest) visible next to a redirected .gcda."""
+        notes = list(build_dir.glob("*.gcno"))
+        if (build_dir / PROJECT_MANIFEST).exists():
+            notes.append(build_dir / PROJECT_MANIFEST)
+        for gcno in notes:
+            target = coverage_dir / gcno.name
+            if target.exists():
+                continue
+            try:
+                os.symlink(gcno, target)
+            except OSError:
+                shutil.copyfile(gcno, target)
+    
+    def _collect_coverage_data(
+        self,
+        coverage_dir: Optional[Path] = None
+    ) -> tuple[List[GCovData], List[str]]:
         """
         Run gcov and parse coverage data.
         
+        Args:
+            coverage_dir: Directory holding the .gcno/.gcda files (default: work_dir)
+        
         Returns:
             (coverage_data, branches_taken)
         """
         coverage_data = []
         branches_taken = []
+        coverage_dir = coverage_dir or self.work_dir
         
         try:
             # Find .gcda files (execution count data)
-            gcda_files = list(self.work_dir.glob("*.gcda"))
+            gcda_files = list(coverage_dir.glob("*.gcda"))
             print(f"[DEBUG] Found {len(gcda_files)} .gcda files: {[f.name for f in gcda_files]}")
             
             if not gcda_files:
                 print("[WARNING] No .gcda files found - coverage not collected")
                 return coverage_data, branches_taken
             
+            manifest = read_manifest(coverage_dir)
+            if manifest is not None:
+                return self._collect_project_coverage(coverage_dir, manifest)
+            
+            if self.coverage_backend == "native":
+                native = self._collect_coverage_native(coverage_dir)
+                if native is not None:
+                    return native
+            
+            if self.gcov_json:
+                return self._collect_coverage_json(coverage_dir)
+            
             # Find .gcno files
-            gcno_files = list(self.work_dir.glob("*.gcno"))
+            gcno_files = list(coverage_dir.glob("*.gcno"))
             print(f"[DEBUG] Found {len(gcno_files)} .gcno files: {[f.name for f in gcno_files]}")
             
             # Run gcov on the source file
-            gcov_cmd = ["gcov", "-b", "test_program.cpp"]  # -b for branch coverage
+            gcov_cmd = self._gcov_command()
             
             print(f"[DEBUG] Running gcov: {' '.join(gcov_cmd)}")
             result = subprocess.run(
                 gcov_cmd,
                 capture_output=True,
                 text=True,
-                cwd=str(self.work_dir),
+                cwd=str(coverage_dir),
                 timeout=10
             )
             
@@ -258,13 +1549,7 @@ class TestExecutor:
                 print(f"[DEBUG] gcov output: {result.stdout[:200]}...")
             
             # Parse gcov output file
-            gcov_file = self.work_dir / "test_program.cpp.gcov"
-            if gcov_file.exists():
-                print(f"[DEBUG] Parsing gcov file: {gcov_file}")
-                coverage_data = self._parse_gcov_file(gcov_file)
-                branches_taken = self._extract_branches(coverage_data)
-            else:
-                print(f"[WARNING] gcov file not found: {gcov_file}")
+            coverage_data, branches_taken = self._read_gcov_results(coverage_dir)
             
         except FileNotFoundError:
             print("[ERROR] gcov not found. Please install MinGW-w64 or GCC on Windows")
@@ -273,14 +1558,250 @@ class TestExecutor:
         
         return coverage_data, branches_taken
     
+    def _collect_project_coverage(
+        self,
+        coverage_dir: Path,
+        manifest: dict
+    ) -> tuple[List[GCovData], List[str]]:
+        """
+        Coverage of every project file (sources and headers) over all the
+        project's objects. Header lines compiled into several objects have
+        their counts summed. Branch ids are prefixed with the file's path
+        ("src/util.cpp:L12_b0"), as line numbers repeat across files.
+        """
+        files = set(manifest["files"])
+        per_file: Dict[str, tuple[Dict[int, int], Dict[int, List[int]]]] = {}
+        
+        def add(recorded: str, counts: Dict[int, int], branch_counts: Dict[int, List[int]]):
+            line_counts, line_branches = per_file.setdefault(posixpath.normpath(recorded), ({}, {}))
+            for line, count in counts.items():
+                line_counts[line] = line_counts.get(line, 0) + count
+            for line, taken in branch_counts.items():
+                known = line_branches.get(line)
+                if known is not None and len(known) == len(taken):
+                    line_branches[line] = [a + b for a, b in zip(known, taken)]
+                else:
+                    line_branches[line] = (known or []) + taken
+        
+        def is_project_file(recorded: str) -> bool:
+            return posixpath.normpath(recorded) in files
+        
+        if self.coverage_backend == "gcov" and self.gcov_json:
+            gcov_cmd = ["gcov", "-j", "-t", "-b", *(f"{stem}.gcda" for stem in manifest["objects"])]
+            print(f"[DEBUG] Running gcov: {' '.join(gcov_cmd)}")
+            result = subprocess.run(gcov_cmd, capture_output=True, text=True, cwd=str(coverage_dir), timeout=10)
+            if result.returncode != 0:
+                print(f"[WARNING] gcov failed: {result.stderr}")
+            # One JSON document per object
+            for document in result.stdout.splitlines():
+                try:
+                    report = json.loads(document)
+                except ValueError:
+                    continue
+                for file_report in report.get("files", []):
+                    if not is_project_file(file_report["file"]):
+                        continue
+                    counts: Dict[int, int] = {}
+                    branch_counts: Dict[int, List[int]] = {}
+                    for line in file_report.get("lines", []):
+                        line_num = line["line_number"]
+                        counts[line_num] = counts.get(line_num, 0) + line["count"]
+                        branch_counts.setdefault(line_num, []).extend(
+                            branch["count"] for branch in line.get("branches", [])
+                        )
+                    add(file_report["file"], counts, branch_counts)
+        else:
+            # The native reader also serves old gcov versions, whose text output names files ambiguously
+            for stem in manifest["objects"]:
+                try:
+                    decoded = read_files_coverage(
+                        str(coverage_dir / f"{stem}.gcno"), str(coverage_dir / f"{stem}.gcda"), is_project_file
+                    )
+                except (OSError, GcovFormatError) as e:
+                    print(f"[WARNING] Could not read coverage of {stem}: {e}")
+                    continue
+                for recorded, (counts, branch_counts) in decoded.items():
+                    add(recorded, counts, branch_counts)
+        
+        coverage_data, branches_taken = [], []
+        for path in sorted(per_file):
+            counts, branch_counts = per_file[path]
+            rows, taken = self._coverage_rows(str(Path(manifest["root"]) / path), counts, branch_counts, path)
+            coverage_data.extend(rows)
+            branches_taken.extend(f"{path}:{branch_id}" for branch_id in taken)
+        return coverage_data, branches_taken
+    
+    def _collect_coverage_native(
+        self,
+        coverage_dir: Path,
+        source_name: str = "test_program.cpp"
+    ) -> Optional[tuple[List[GCovData], List[str]]]:
+        """
+        Decode the run's .gcda against the (cached) .gcno graph, without gcov.
+        Returns None if the files can't be decoded, so the caller falls back to gcov.
+        """
+        try:
+            source_path, counts, branch_counts = read_coverage(
+                str(coverage_dir / "test_program.gcno"),
+                str(coverage_dir / "test_program.gcda"),
+                source_name
+            )
+        except (OSError, GcovFormatError) as e:
+            print(f"[WARNING] Native coverage reader failed ({e}), falling back to gcov")
+            return None
+        return self._coverage_rows(
+            source_path, counts, branch_counts, source_name, str(coverage_dir / "test_program.gcno")
+        )
+    
+    def _collect_sancov(
+        self,
+        coverage_map: CoverageMap,
+        binary_path: str,
+        source_name: str = "test_program.cpp"
+    ) -> tuple[List[GCovData], List[str]]:
+        """
+        Read the sancov hit map. branches_taken holds one "<function>+0x<offset>"
+        id per edge (clang) or block (gcc) of the program that was hit; lines
+        come from the binary's debug info, so execution_count is the hottest
+        hit count on the line (saturating at 255), not gcov's line count.
+        """
+        hits = coverage_map.hits()
+        resolved = pc_table(binary_path).resolve(hits)
+        
+        counts: Dict[int, int] = {}
+        source_path = None
+        branches_taken = []
+        for offset, (edge_id, location) in resolved.items():
+            if location is not None:
+                if Path(location[0]).name != source_name:
+                    continue  # Library/template code instantiated in the program
+                source_path = location[0]
+                counts[location[1]] = max(counts.get(location[1], 0), hits[offset])
+            branches_taken.append(edge_id)
+        
+        coverage_data, _ = self._coverage_rows(source_path, counts, {}, source_name)
+        return coverage_data, sorted(branches_taken)
+    
+    def _collect_coverage_json(self, coverage_dir: Path) -> tuple[List[GCovData], List[str]]:
+        """Run gcov with JSON output on a pipe and parse it; no .gcov files are written."""
+        gcov_cmd = self._gcov_json_command()
+        print(f"[DEBUG] Running gcov: {' '.join(gcov_cmd)}")
+        result = subprocess.run(
+            gcov_cmd,
+            capture_output=True,
+            text=True,
+            cwd=str(coverage_dir),
+            timeout=10
+        )
+        if result.returncode != 0:
+            print(f"[WARNING] gcov failed: {result.stderr}")
+            return [], []
+        return self._parse_gcov_json(result.stdout)
+    
+    @staticmethod
+    def _gcov_command() -> List[str]:
+        """gcov invocation, run inside the coverage directory."""
+        return ["gcov", "-b", "-c", "test_program.cpp"]  # -b -c for branch taken counts
+    
+    @staticmethod
+    def _gcov_json_command() -> List[str]:
+        """gcov invocation printing the JSON intermediate format to stdout."""
+        return ["gcov", "-j", "-t", "-b", "test_program.cpp"]
+    
+    def _parse_gcov_json(
+        self,
+        gcov_json: str,
+        source_name: str = "test_program.cpp"
+    ) -> tuple[List[GCovData], List[str]]:
+        """
+        Parse gcov JSON intermediate output in one pass over its line records.
+        
+        Only executable lines are reported (gcov lists no others). A line
+        that belongs to several functions (e.g. template instantiations) has
+        its counts summed, as in the .gcov text view.
+        
+        Returns:
+            (coverage_data, branches_taken)
+        """
+        try:
+            report = json.loads(gcov_json)
+        except ValueError as e:
+            print(f"[WARNING] Could not parse gcov JSON: {e}")
+            return [], []
+        
+        counts: Dict[int, int] = {}
+        branch_counts: Dict[int, List[int]] = {}
+        source_path = None
+        cwd = Path(report.get("current_working_directory", "."))
+        
+        for file_report in report.get("files", []):
+            # Headers (iostream, ...) get their own records; keep the program only
+            if Path(file_report["file"]).name != source_name:
+                continue
+            source_path = str(cwd / file_report["file"])
+            for line in file_report.get("lines", []):
+                line_num = line["line_number"]
+                counts[line_num] = counts.get(line_num, 0) + line["count"]
+                branch_counts.setdefault(line_num, []).extend(
+                    branch["count"] for branch in line.get("branches", [])
+                )
+        
+        return self._coverage_rows(
+            source_path, counts, branch_counts, source_name, str(cwd / "test_program.gcno")
+        )
+    
+    def _coverage_rows(
+        self,
+        source_path: Optional[str],
+        counts: Dict[int, int],
+        branch_counts: Dict[int, List[int]],
+        source_name: str,
+        gcno_path: Optional[str] = None
+    ) -> tuple[List[GCovData], List[str]]:
+        """Build GCovData rows (executable lines only) and branch identifiers."""
+        source_lines: tuple = ()
+        if source_path:
+            try:
+                stat = os.stat(source_path)
+                source_lines = _source_lines(source_path, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        
+        coverage_data = [
+            GCovData(
+                file_name=source_name,
+                line_number=line_num,
+                execution_count=counts[line_num],
+                source_line=source_lines[line_num - 1] if line_num <= len(source_lines) else "",
+                branch_counts=branch_counts.get(line_num)
+            )
+            for line_num in sorted(counts)
+        ]
+        return coverage_data, self._extract_branches(coverage_data, gcno_path)
+    
+    def _read_gcov_results(self, coverage_dir: Path) -> tuple[List[GCovData], List[str]]:
+        """Parse the .gcov file gcov left in coverage_dir."""
+        gcov_file = coverage_dir / "test_program.cpp.gcov"
+        if not gcov_file.exists():
+            print(f"[WARNING] gcov file not found: {gcov_file}")
+            return [], []
+        
+        print(f"[DEBUG] Parsing gcov file: {gcov_file}")
+        coverage_data = self._parse_gcov_file(gcov_file)
+        branches_taken = self._extract_branches(coverage_data, str(coverage_dir / "test_program.gcno"))
+        return coverage_data, branches_taken
+    
     def _parse_gcov_file(self, gcov_file: Path) -> List[GCovData]:
         """
         Parse a .gcov file to extract line-by-line coverage.
         
         gcov format:
             execution_count:line_number:source_code
+        followed, with -b -c, by the line's branch records
         Example:
-            5:   10:    int x = 0;
+            5:   10:    if (x > 0) x++;
+        branch  0 taken 3 (fallthrough)
+        branch  1 never executed
             -:   11:    // comment
             #####:   12:    unreachable();
         """
@@ -289,6 +1810,13 @@ class TestExecutor:
         try:
             with open(gcov_file, 'r') as f:
                 for line in f:
+                    branch = re.match(r'branch\s+\d+\s+(?:taken (\d+)|never executed)', line)
+                    if branch:
+                        if coverage_data:
+                            row = coverage_data[-1]
+                            row.branch_counts = (row.branch_counts or []) + [int(branch.group(1) or 0)]
+                        continue
+                    
                     # Match pattern: "count:line_num:source"
                     match = re.match(r'\s*([^:]+):\s*(\d+):(.*)', line)
                     if match:
@@ -318,42 +1846,39 @@ class TestExecutor:
         
         return coverage_data
     
-    def _extract_branches(self, coverage_data: List[GCovData]) -> List[str]:
+    def _extract_branches(self, coverage_data: List[GCovData], gcno_path: Optional[str] = None) -> List[str]:
         """
-        Extract branch identifiers from coverage data.
-        A branch is taken if the line with decision logic was executed.
+        Branch identifiers taken in a run, from gcov's per-branch counts
+        (see branch_index.py; the program's index is built once per .gcno).
         """
-        branches = []
-        
-        for i, cov in enumerate(coverage_data):
-            if cov.execution_count > 0:
-                source = cov.source_line.strip()
-                
-                # Identify decision points (branches)
-                if any(keyword in source for keyword in ['if', 'else', 'for', 'while', 'switch', 'case']):
-                    # Create branch identifier
-                    branch_id = f"L{cov.line_number}"
-                    branches.append(branch_id)
-                    
-                    # For if statements, we can have true/false branches
-                    if 'if' in source:
-                        branches.append(f"L{cov.line_number}_true")
-                        # Check if next line was executed for false branch
-                        if i + 1 < len(coverage_data):
-                            next_cov = coverage_data[i + 1]
-                            if next_cov.execution_count > 0:
-                                branches.append(f"L{cov.line_number}_false")
-        
-        return branches
+        branch_counts = {d.line_number: d.branch_counts for d in coverage_data if d.branch_counts}
+        return branch_index(gcno_path, branch_counts=branch_counts).taken(branch_counts)
     
     def cleanup(self):
-        """Clean up temporary files"""
-        for file_path in self.cleanup_files:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception:
-                pass
+        """
+        Clean up temporary files. A borrowed sandbox is emptied and returned
+        to its pool; a temporary work_dir is deleted with everything in it.
+        Compile cache entries this executor used may be evicted again.
+        """
+        if self.sandbox_pool is not None:
+            self.sandbox_pool.release(self.work_dir)
+            self.sandbox_pool = None
+        elif self.owns_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.owns_work_dir = False
+        else:
+            for file_path in self.cleanup_files:
+                try:
+                    if os.path.isdir(file_path):
+                        shutil.rmtree(file_path, ignore_errors=True)
+                    elif os.path.exists(file_path):
+                        os.remove(file_path)
+                except Exception:
+                    pass
+        self.cleanup_files = []
+        for key in self.pinned_keys:
+            self.compile_cache.unpin(key)
+        self.pinned_keys = []
     
     def __del__(self):
         """Cleanup on deletion"""
@@ -364,7 +1889,18 @@ def execute_test_case(
     source_code: str,
     test_inputs: List[Any],
     expected_output: Optional[Any] = None,
-    work_dir: Optional[str] = None
+    work_dir: Optional[str] = None,
+    compile_cache: Optional[CompileCache] = None,
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    sandbox_pool: Optional[SandboxPool] = None,
+    build_profile: Optional[str] = None,
+    timeout_policy: Optional[TimeoutPolicy] = None,
+    run_mode: str = "coverage",
+    coverage_memo: Optional[CoverageMemo] = None,
+    result_cache: Optional[ResultCache] = None,
+    output_limit: int = DEFAULT_OUTPUT_LIMIT,
+    input_protocol: str = "text"
 ) -> TestExecutionOutput:
     """
     Convenience function to compile and execute a single test case.
@@ -373,29 +1909,111 @@ def execute_test_case(
         source_code: C/C++ source code
         test_inputs: Input values for the test
         expected_output: Expected output for pass/fail determination
-        work_dir: Working directory (uses temp if None)
+        work_dir: Working directory (uses a sandbox or temp dir if None)
+        compile_cache: Shared build cache, so repeated sources skip g++
+        coverage_backend: One of COVERAGE_BACKENDS
+        coverage_scope: "all" or "target" (instrument only the functions under test)
+        sandbox_pool: Pool to borrow the working directory from when work_dir is None
+        build_profile: Name in build_profiles.PROFILES (None uses the default)
+        timeout_policy: Shared runtime history for adaptive run timeouts
+        run_mode: One of dual_build.RUN_MODES ("fast" and "auto" use an
+                  uninstrumented build where coverage is not needed)
+        coverage_memo: Coverage recorded by earlier "auto" runs
+        result_cache: Results of earlier identical runs (None for nondeterministic programs)
+        output_limit: Bytes of stdout/stderr kept per run
+        input_protocol: One of input_protocol.INPUT_PROTOCOLS
     
     Returns:
         TestExecutionOutput with results and coverage data
     """
-    executor = TestExecutor(work_dir)
+    executor = TestExecutor(
+        work_dir, compile_cache=compile_cache,
+        coverage_backend=coverage_backend, coverage_scope=coverage_scope,
+        sandbox_pool=sandbox_pool, build_profile=build_profile,
+        timeout_policy=timeout_policy, result_cache=result_cache,
+        output_limit=output_limit, input_protocol=input_protocol
+    )
     
-    # Compile
-    success, binary_path, error = executor.compile_with_coverage(source_code)
+    try:
+        return executor.execute_source(
+            source_code, [test_inputs], [expected_output],
+            run_mode=run_mode, coverage_memo=coverage_memo
+        )[0]
+    finally:
+        executor.cleanup()
+
+
+def execute_test_batch(
+    source_code: str,
+    test_inputs_list: List[List[Any]],
+    expected_outputs: Optional[List[Optional[Any]]] = None,
+    mode: str = "process",
+    work_dir: Optional[str] = None,
+    compile_cache: Optional[CompileCache] = None,
+    coverage_backend: str = "gcov",
+    coverage_scope: str = "all",
+    sandbox_pool: Optional[SandboxPool] = None,
+    build_profile: Optional[str] = None,
+    timeout_policy: Optional[TimeoutPolicy] = None,
+    run_mode: str = "coverage",
+    coverage_memo: Optional[CoverageMemo] = None,
+    result_cache: Optional[ResultCache] = None,
+    output_limit: int = DEFAULT_OUTPUT_LIMIT,
+    input_protocol: str = "text"
+) -> List[TestExecutionOutput]:
+    """
+    Convenience function to compile once and execute many test cases.
     
-    if not success:
-        return TestExecutionOutput(
-            test_id=str(uuid.uuid4())[:8],
-            execution_status="error",
-            output=None,
-            error=f"Compilation failed: {error}",
-            coverage_data=[],
-            branches_taken=[],
-            execution_time=0.0
-        )
+    Args:
+        source_code: C/C++ source code
+        test_inputs_list: Input values per test
+        expected_outputs: Expected output per test (None entries skip the check)
+        mode: "process" (one process per input), "forkserver" (one harness
+              process forks a child per input) or "persistent" (one harness
+              process calls main() per input; globals and statics are not reset,
+              so only for programs that don't depend on fresh state)
+        work_dir: Working directory (uses a sandbox or temp dir if None)
+        compile_cache: Shared build cache, so repeated sources skip g++
+        coverage_backend: One of COVERAGE_BACKENDS
+        coverage_scope: "all" or "target" (instrument only the functions under test)
+        sandbox_pool: Pool to borrow the working directory from when work_dir is None
+        build_profile: Name in build_profiles.PROFILES (None uses the default)
+        timeout_policy: Shared runtime history for adaptive run timeouts
+        run_mode: One of dual_build.RUN_MODES ("fast" and "auto" use an
+                  uninstrumented build where coverage is not needed)
+        coverage_memo: Coverage recorded by earlier "auto" runs
+        result_cache: Results of earlier identical runs (None for nondeterministic programs)
+        output_limit: Bytes of stdout/stderr kept per run
+        input_protocol: One of input_protocol.INPUT_PROTOCOLS
     
-    # Execute
-    result = executor.execute_test(binary_path, test_inputs, expected_output)
+    Returns:
+        One TestExecutionOutput per input, in input order
+    """
+    executor = TestExecutor(
+        work_dir, compile_cache=compile_cache,
+        coverage_backend=coverage_backend, coverage_scope=coverage_scope,
+        sandbox_pool=sandbox_pool, build_profile=build_profile,
+        timeout_policy=timeout_policy, result_cache=result_cache,
+        output_limit=output_limit, input_protocol=input_protocol
+    )
     
-    return result
+    try:
+        return executor.execute_source(
+            source_code, test_inputs_list, expected_outputs, mode,
+            run_mode=run_mode, coverage_memo=coverage_memo
+        )
+    finally:
+        executor.cleanup()
+
 
+def compilation_error_output(error: str) -> TestExecutionOutput:
+    """Result reported for a test whose program did not compile."""
+    return TestExecutionOutput(
+        test_id=str(uuid.uuid4())[:8],
+        execution_status="error",
+        output=None,
+        error=f"Compilation failed: {error}",
+        coverage_data=[],
+        branches_taken=[],
+        execution_time=0.0
+    )
@@ -29,3 +29,13 @@ def test_cfg_parser_handles_no_user_functions():
     res = cfg_parser.analyze_cpp_code(src)
     assert isinstance(res, dict)
     assert 'nodes' in res and 'edges' in res and 'params' in res
+
+
+def test_find_function_definitions_libclang_and_regex_agree():
+    src = 'static int foo(int a) {\n    return a;\n}\nint main() { return foo(1); }\n'
+    found = cfg_parser.find_function_definitions(src)
+    assert [(d['name'], d['line']) for d in found] == [('foo', 1), ('main', 4)]
+    assert src[found[1]['offset']:].startswith('int main')
+    regex = cfg_parser._find_definitions_with_regex(src)
+    assert [d['name'] for d in regex] == ['foo', 'main']
+    assert src[regex[1]['offset']:].startswith('int main')
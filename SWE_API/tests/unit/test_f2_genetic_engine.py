@@ -32,6 +32,14 @@ def test_mutate_changes_genes_but_keeps_length():
     assert len(c.genes) == 3
 
 
+def test_mutate_keeps_gene_types():
+    random.seed(3)
+    for _ in range(200):
+        c = Chromosome(id='c', genes=[0.0, 2.5, 7, True], fitness_score=0.0)
+        genetic_engine.mutate(c, rate=0.9)
+        assert [type(g) for g in c.genes] == [float, float, int, bool]
+
+
 def test_tournament_selection_returns_member():
     pop = [Chromosome(id=str(i), genes=[i], fitness_score=float(i)) for i in range(5)]
     random.seed(2)
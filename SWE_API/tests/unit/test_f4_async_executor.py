@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from async_executor import AsyncTestExecutor, execute_test_case_async
+from compile_cache import CompileCache
+from dual_build import CoverageMemo
+
+
+SOURCE = """
+#include <iostream>
+#include <fstream>
+#include <unistd.h>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x < 0) {
+        std::ofstream("pid.txt") << getpid();
+        while (true) {}
+    }
+    std::cout << x * 2;
+    return 0;
+}
+"""
+
+
+def test_async_execution_matches_expected_output(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    result = asyncio.run(execute_test_case_async(SOURCE, [21], expected_output='42', compile_cache=cache))
+    assert result.execution_status == 'passed'
+    assert any(d.execution_count > 0 for d in result.coverage_data)
+
+
+def test_blocking_steps_run_off_the_event_loop(tmp_path, monkeypatch):
+    on_loop = {}
+    for name in ['_program_key', '_cached_result', 'cleanup']:
+        # First call only: __del__ calls cleanup() again, with nothing left to do
+        def record(self, *args, _name=name, _original=getattr(AsyncTestExecutor, name), **kwargs):
+            if _name not in on_loop:
+                try:
+                    asyncio.get_running_loop()
+                    on_loop[_name] = True
+                except RuntimeError:
+                    on_loop[_name] = False
+            return _original(self, *args, **kwargs)
+        monkeypatch.setattr(AsyncTestExecutor, name, record)
+
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    result = asyncio.run(execute_test_case_async(
+        SOURCE, [4], expected_output='8', compile_cache=cache, run_mode='auto', coverage_memo=CoverageMemo()
+    ))
+    assert result.execution_status == 'passed'
+    assert on_loop == {'_program_key': False, '_cached_result': False, 'cleanup': False}
+
+
+def test_async_timeout_reports_error(tmp_path):
+    te = AsyncTestExecutor(work_dir=str(tmp_path))
+
+    async def run():
+        ok, binary, err = await te.compile_with_coverage_async(SOURCE)
+        assert ok, err
+        return await te.execute_test_async(binary, [-1], timeout=1)
+
+    result = asyncio.run(run())
+    assert result.execution_status == 'error'
+    assert result.error == 'Execution timeout'
+
+
+def test_cancellation_kills_child_process(tmp_path):
+    te = AsyncTestExecutor(work_dir=str(tmp_path))
+    pid_file = tmp_path / 'pid.txt'
+
+    async def run():
+        ok, binary, err = await te.compile_with_coverage_async(SOURCE)
+        assert ok, err
+        task = asyncio.create_task(te.execute_test_async(binary, [-1], timeout=60))
+        for _ in range(100):
+            if pid_file.exists() and pid_file.read_text():
+                break
+            await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    pid = int(pid_file.read_text())
+    deadline = time.time() + 3
+    while time.time() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        raise AssertionError(f"test program {pid} still running after cancellation")
+
+
+# Keeps g++ busy for seconds (before it gives up on the operation limit)
+SLOW_TO_COMPILE = """
+constexpr long spin() {
+    long s = 0;
+    for (long i = 0; i < 20000; ++i)
+        for (long j = 0; j < 20000; ++j)
+            s += i ^ j;
+    return s;
+}
+static_assert(spin() != 1, "");
+int main() { return 0; }
+"""
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='finds the compiler in /proc')
+def test_cancelling_a_compile_kills_the_compiler(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    te = AsyncTestExecutor(compile_cache=cache)
+
+    def compiler_running():
+        for pid in filter(str.isdigit, os.listdir('/proc')):
+            try:
+                with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                    if str(tmp_path).encode() in f.read():
+                        return True
+            except OSError:
+                pass
+        return False
+
+    async def run():
+        task = asyncio.create_task(te.compile_with_coverage_async(SLOW_TO_COMPILE))
+        for _ in range(200):
+            if compiler_running():
+                break
+            await asyncio.sleep(0.05)
+        else:
+            raise AssertionError('compiler never started')
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(run())
+        deadline = time.time() + 3
+        while compiler_running():
+            assert time.time() < deadline, 'compiler still running after cancellation'
+            time.sleep(0.05)
+    finally:
+        te.cleanup()
+    # The killed build is not remembered as a compile error
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,44 @@
+from batch_executor import ParallelBatchExecutor, split_evenly
+from compile_cache import CompileCache
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos";
+    else std::cout << "neg";
+    return 0;
+}
+"""
+
+
+def test_split_evenly_covers_range_in_order():
+    assert split_evenly(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert split_evenly(2, 8) == [(0, 1), (1, 2)]
+    assert split_evenly(0, 4) == []
+
+
+def test_parallel_results_keep_input_order_and_isolated_coverage(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    batch = ParallelBatchExecutor(max_workers=4, compile_cache=cache)
+    values = [3, -1, 8, -7, 2, -4, 5, -9]
+    expected = ['pos' if v > 0 else 'neg' for v in values]
+    results = batch.execute(SOURCE, [[v] for v in values], expected, mode='process')
+    batch.shutdown()
+    assert [r.output for r in results] == expected
+    assert all(r.execution_status == 'passed' for r in results)
+    # Each worker counts only its own runs: the 'neg' line ran exactly once per negative input
+    for v, r in zip(values, results):
+        neg_line = [d.execution_count for d in r.coverage_data if d.line_number == 7]
+        assert neg_line == ([1] if v < 0 else [0])
+
+
+def test_parallel_compile_error_reported_per_test(tmp_path):
+    batch = ParallelBatchExecutor(max_workers=2)
+    results = batch.execute("int main( {", [[1], [2], [3]])
+    batch.shutdown()
+    assert len(results) == 3
+    assert all(r.execution_status == 'error' for r in results)
+    assert all('Compilation failed' in r.error for r in results)
@@ -0,0 +1,67 @@
+from branch_index import BranchIndex, branch_index
+from test_executor import TestExecutor
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    int y = 0;
+    if (x > 0) y = 1;
+    for (int i = 0; i < x; i++) y += i;
+    std::cout << y << std::endl;
+    return 0;
+}
+"""
+
+
+def if_branches(result):
+    return {b for b in result.branches_taken if b.startswith('L7_')}
+
+
+def test_index_is_built_once_per_binary_from_the_graph(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    gcno = str(tmp_path / 'test_program.gcno')
+    index = branch_index(gcno)
+    assert branch_index(gcno) is index
+    assert index.lines[7] == ('L7_b0', 'L7_b1') and index.lines[8] == ('L8_b0', 'L8_b1')
+    assert index.total == sum(len(ids) for ids in index.lines.values())
+
+    te.coverage_backend = 'native'
+    result = te.execute_test(binary, [2])
+    laid_out = {d.line_number: len(d.branch_counts) for d in result.coverage_data if d.branch_counts}
+    assert laid_out == {line: len(ids) for line, ids in index.lines.items()}
+    assert set(result.branches_taken) <= set(index.all_ids())
+
+
+def test_branches_follow_taken_counts_in_every_collector(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    collectors = [('native', True), ('gcov', True), ('gcov', False)]
+    by_collector = []
+    for backend, gcov_json in collectors:
+        te.coverage_backend, te.gcov_json = backend, gcov_json
+        by_collector.append([te.execute_test(binary, [x]) for x in (3, -3)])
+
+    for pos, neg in by_collector:
+        # The if takes one outcome per input; the lines after it run either way
+        assert len(if_branches(pos)) == 1 and len(if_branches(neg)) == 1
+        assert if_branches(pos) != if_branches(neg)
+        assert 'L7' in pos.branches_taken and 'L7' in neg.branches_taken
+    assert all(
+        [r.branches_taken for r in results] == [r.branches_taken for r in by_collector[0]]
+        for results in by_collector
+    )
+
+
+def test_layout_falls_back_to_the_run_counts(tmp_path):
+    counts = {4: [0, 0], 7: [2, 0, 1]}
+    index = branch_index(str(tmp_path / 'missing.gcno'), branch_counts=counts)
+    assert index.all_ids() == ['L4', 'L4_b0', 'L4_b1', 'L7', 'L7_b0', 'L7_b1', 'L7_b2']
+    assert index.taken(counts) == ['L7', 'L7_b0', 'L7_b2']
+    # Counts laid out differently from the index still get positional ids
+    assert BranchIndex({7: 1}).taken({7: [0, 4]}) == ['L7', 'L7_b1']
@@ -0,0 +1,75 @@
+import struct
+
+import build_profiles
+from build_profiles import calibrate, default_profile_name, get_profile, set_default_profile
+from test_executor import TestExecutor, execute_test_batch
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+    return 0;
+}
+"""
+
+
+def rows(result):
+    return [(d.line_number, d.execution_count) for d in result.coverage_data]
+
+
+def has_interpreter(binary_path):
+    """Whether a 64-bit ELF file has a PT_INTERP (dynamic loader) segment."""
+    with open(binary_path, 'rb') as f:
+        data = f.read()
+    phoff, = struct.unpack_from('<Q', data, 0x20)
+    phentsize, phnum = struct.unpack_from('<HH', data, 0x36)
+    return any(struct.unpack_from('<I', data, phoff + i * phentsize)[0] == 3 for i in range(phnum))
+
+
+def test_static_profile_builds_loader_free_binary_with_same_coverage(tmp_path):
+    default = TestExecutor(work_dir=str(tmp_path / 'default'))
+    static = TestExecutor(work_dir=str(tmp_path / 'static'), build_profile='static')
+    ok, default_binary, err = default.compile_with_coverage(SOURCE)
+    assert ok, err
+    ok, static_binary, err = static.compile_with_coverage(SOURCE)
+    assert ok, err
+    assert has_interpreter(default_binary) and not has_interpreter(static_binary)
+    assert rows(static.execute_test(static_binary, [2])) == rows(default.execute_test(default_binary, [2]))
+
+    results = execute_test_batch(SOURCE, [[1], [-1]], build_profile='fast')
+    assert [r.output for r in results] == ['pos', 'neg']
+
+
+def test_default_profile_is_used_when_none_is_given():
+    previous = default_profile_name()
+    try:
+        set_default_profile('fast')
+        assert TestExecutor().build_profile is get_profile('fast')
+        try:
+            set_default_profile('no-such-profile')
+            assert False, 'unknown profile accepted'
+        except ValueError:
+            pass
+        assert default_profile_name() == 'fast'
+    finally:
+        set_default_profile(previous)
+
+
+def test_calibration_selects_a_usable_profile(monkeypatch):
+    previous = default_profile_name()
+    monkeypatch.setitem(build_profiles.PROFILES, 'missing', build_profiles.BuildProfile(
+        'missing', 'g++', ['-O0'], requires=['no-such-linker']
+    ))
+    try:
+        result = calibrate(runs_per_build=10, names=['default', 'static', 'missing'], repeats=2)
+        assert result['profiles']['missing'] == {'available': False}
+        assert result['selected'] in ('default', 'static')
+        assert all(result['profiles'][n]['coverage_ok'] for n in ('default', 'static'))
+        assert default_profile_name() == result['selected']
+        assert build_profiles.last_calibration() is result
+    finally:
+        set_default_profile(previous)
@@ -0,0 +1,70 @@
+import os
+
+from compile_cache import CompileCache
+from test_executor import TestExecutor, execute_test_case
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos";
+    else std::cout << "neg";
+    return 0;
+}
+"""
+
+
+def test_identical_source_compiles_once(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    te1 = TestExecutor(work_dir=str(tmp_path / 'a'), compile_cache=cache)
+    te2 = TestExecutor(work_dir=str(tmp_path / 'b'), compile_cache=cache)
+    ok1, bin1, _ = te1.compile_with_coverage(SOURCE)
+    ok2, bin2, _ = te2.compile_with_coverage(SOURCE)
+    assert ok1 and ok2
+    assert bin1 == bin2
+    assert cache.stats()['hits'] == 1
+
+    # Runs of the cached binary must not accumulate each other's counters
+    r1 = execute_test_case(SOURCE, [5], expected_output='pos', compile_cache=cache)
+    r2 = execute_test_case(SOURCE, [-5], expected_output='neg', compile_cache=cache)
+    assert r1.execution_status == 'passed' and r2.execution_status == 'passed'
+    line8 = [d.execution_count for d in r2.coverage_data if d.line_number == 8]
+    assert line8 == [1]
+
+
+def test_failed_compile_is_cached(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    te = TestExecutor(work_dir=str(tmp_path / 'w'), compile_cache=cache)
+    ok1, _, err1 = te.compile_with_coverage("int main( { return 0; }")
+    ok2, _, err2 = te.compile_with_coverage("int main( { return 0; }")
+    assert not ok1 and not ok2
+    assert err1 == err2
+    assert cache.stats()['hits'] == 1
+
+
+def test_lru_eviction_under_budget(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'), max_bytes=1)
+    te = TestExecutor(work_dir=str(tmp_path / 'w'), compile_cache=cache)
+    ok1, bin1, _ = te.compile_with_coverage("int main() { return 1; }")
+    te.cleanup()
+    ok2, bin2, _ = te.compile_with_coverage("int main() { return 2; }")
+    assert ok1 and ok2
+    # Only the most recent build survives a 1-byte budget
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['evictions'] == 1
+    assert not (tmp_path / 'cache').joinpath(bin1).exists()
+    assert (tmp_path / 'cache').joinpath(bin2).exists()
+
+    # Builds an executor still uses are pinned: over budget, but kept until its cleanup()
+    other = TestExecutor(work_dir=str(tmp_path / 'o'), compile_cache=cache)
+    ok3, bin3, _ = other.compile_with_coverage("int main() { return 3; }")
+    assert ok3 and os.path.exists(bin2) and os.path.exists(bin3)
+    assert cache.stats()['pinned'] == 2
+    assert te.execute_test(bin2, []).execution_status == 'failed'  # Ran: exit code 2
+    te.cleanup()
+    assert not os.path.exists(bin2) and os.path.exists(bin3)
+    other.cleanup()
+    # Nothing fits a 1-byte budget once no executor needs it
+    assert cache.stats()['pinned'] == 0 and cache.stats()['entries'] == 0
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from compile_cache import CompileCache
+from compile_scheduler import BuildCancelled, CompileScheduler
+from test_executor import TestExecutor
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    std::cout << x + 1 << std::endl;
+    return 0;
+}
+"""
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_slots_admit_compiles_in_arrival_order():
+    scheduler = CompileScheduler(max_concurrent=1)
+    order = []
+
+    def compile_step(i):
+        with scheduler.slot():
+            order.append(i)
+
+    threads = []
+    with scheduler.slot():
+        for i in range(5):
+            thread = threading.Thread(target=compile_step, args=(i,))
+            thread.start()
+            threads.append(thread)
+            wait_for(lambda: scheduler.stats()['queued'] == i + 1)
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    stats = scheduler.stats()
+    assert order == [0, 1, 2, 3, 4]
+    assert (stats['running'], stats['queued'], stats['max_running'], stats['max_queued']) == (0, 0, 1, 5)
+    assert stats['compiles'] == 6 and stats['queued_compiles'] == 5
+    assert stats['wait_seconds']['max'] >= 0.05
+
+
+def test_identical_builds_share_one_result():
+    scheduler = CompileScheduler()
+    release = threading.Event()
+    calls = []
+
+    def build():
+        calls.append(1)
+        release.wait()
+        if len(calls) == 2:
+            raise RuntimeError('compiler vanished')
+        return True, 'bin', ''
+
+    def request(results):
+        try:
+            results.append(scheduler.coalesce('key', build))
+        except RuntimeError as e:
+            results.append(str(e))
+
+    for burst, expected in enumerate([(True, 'bin', ''), 'compiler vanished']):
+        release.clear()
+        results = []
+        threads = [threading.Thread(target=request, args=(results,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: scheduler.stats()['coalesced'] == 5 * (burst + 1))
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert results == [expected] * 6
+
+    # Finished builds are not remembered: each burst ran build() once
+    stats = scheduler.stats()
+    assert len(calls) == 2 and stats['builds'] == 2 and stats['coalesced'] == 10
+    assert stats['in_flight'] == 0
+
+
+def test_waiters_rebuild_when_the_leader_is_cancelled():
+    scheduler = CompileScheduler()
+    release = threading.Event()
+    calls = []
+
+    def build():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait()
+            raise BuildCancelled('request went away')
+        return True, 'bin', ''
+
+    def leader():
+        try:
+            scheduler.coalesce('key', build)
+        except BuildCancelled:
+            pass
+
+    first = threading.Thread(target=leader)
+    first.start()
+    wait_for(lambda: scheduler.stats()['in_flight'] == 1)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(scheduler.coalesce('key', build)))
+    waiter.start()
+    wait_for(lambda: scheduler.stats()['coalesced'] == 1)
+    release.set()
+    first.join()
+    waiter.join()
+    assert results == [(True, 'bin', '')] and len(calls) == 2
+
+
+def test_concurrent_requests_compile_once_within_the_limit(tmp_path):
+    baseline = CompileCache(cache_dir=str(tmp_path / 'baseline'))
+    assert TestExecutor(work_dir=str(tmp_path / 'b'), compile_cache=baseline).compile_with_coverage(SOURCE)[0]
+    compiles_per_build = baseline.scheduler.stats()['compiles']
+
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'), scheduler=CompileScheduler(max_concurrent=2))
+    start = threading.Barrier(8)
+    results = {}
+
+    def request(name, source):
+        te = TestExecutor(work_dir=str(tmp_path / name), compile_cache=cache)
+        start.wait()
+        results[name] = te.compile_with_coverage(source)
+
+    sources = {f'same{i}': SOURCE for i in range(4)}
+    sources.update({f'other{i}': f'int main() {{ return {i}; }}' for i in range(4)})
+    threads = [threading.Thread(target=request, args=item) for item in sources.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(ok for ok, _, _ in results.values())
+    assert len({results[f'same{i}'][1] for i in range(4)}) == 1
+    stats = cache.scheduler.stats()
+    assert stats['max_running'] <= 2
+    # The identical requests compiled as one; each other source compiles an object and links
+    assert stats['compiles'] == compiles_per_build + 4 * 2
+
+    # /status reports the scheduler with the rest of the compile cache
+    assert cache.stats()['scheduler']['max_concurrent'] == 2
+    assert cache.stats()['scheduler']['wait_seconds']['mean'] >= 0
+
@@ -0,0 +1,96 @@
+from fastapi.testclient import TestClient
+
+from batch_executor import ParallelBatchExecutor
+from compile_cache import CompileCache
+from differential_oracle import DifferentialOracle, verdict
+from main import app
+from models import TestExecutionOutput
+from result_cache import ResultCache
+
+
+REFERENCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x < 0) return 3;
+    std::cout << x * x << std::endl;
+    return 0;
+}
+"""
+
+# Same function without a main(), wrong for x > 10 and hanging for x == 7
+CANDIDATE = """
+int square(int x) {
+    if (x < 0) return -1;
+    while (x == 7) {}
+    return x > 10 ? x * 10 : x * x;
+}
+"""
+
+
+def output(status, text, error=None):
+    return TestExecutionOutput(
+        test_id='t', execution_status=status, output=text, error=error,
+        coverage_data=[], branches_taken=[], execution_time=0.01
+    )
+
+
+def test_verdicts_follow_the_reference():
+    assert verdict(output('passed', '4'), output('passed', '4')) == 'passed'
+    assert verdict(output('failed', '5'), output('passed', '4')) == 'failed'
+    assert verdict(output('error', None, 'Execution timeout'), output('passed', '4')) == 'failed'
+    # A reference that fails on an input expects the same failure
+    assert verdict(output('failed', ''), output('failed', '')) == 'passed'
+    assert verdict(output('passed', '-1'), output('failed', '')) == 'failed'
+    # No verdict without a complete reference output
+    assert verdict(output('passed', '4'), output('error', None, 'Execution timeout')) == 'undecided'
+    cut = output('passed', '4' * 10, '[stdout truncated at 10 bytes]')
+    assert verdict(output('passed', '4' * 10), cut) == 'undecided'
+
+
+def test_population_is_judged_in_one_call(tmp_path):
+    batch = ParallelBatchExecutor(
+        max_workers=2, compile_cache=CompileCache(cache_dir=str(tmp_path)), result_cache=ResultCache()
+    )
+    oracle = DifferentialOracle(batch)
+    inputs = [[3], [-2], [12], [0], [7]]
+    try:
+        first = oracle.execute(CANDIDATE, REFERENCE, inputs, timeout=1)
+        again = oracle.execute(CANDIDATE, REFERENCE, inputs[:4])
+        spawned = oracle.execute(CANDIDATE, REFERENCE, inputs[:4], mode='process')
+        # The reference's coverage-less results are never served to a coverage run
+        covered = batch.execute(REFERENCE, [[3]])
+    finally:
+        batch.shutdown()
+
+    assert first.verdicts == ['passed', 'failed', 'failed', 'passed', 'failed']
+    assert (first.passed, first.failed, first.undecided) == (2, 3, 0)
+    assert [r.output for r in first.reference_results] == ['9', '', '144', '0', '49']
+    assert all(r.coverage_data == [] for r in first.reference_results)
+    assert first.results[2].output == '120' and first.results[4].error == 'Execution timeout'
+    assert first.results[0].coverage_data
+
+    assert again.verdicts == spawned.verdicts == first.verdicts[:4]
+    assert all(r.cached for r in again.reference_results)
+    assert not any(r.cached for r in spawned.reference_results)
+    assert covered[0].coverage_data and not covered[0].cached
+
+
+def test_differential_endpoint_reports_verdicts():
+    client = TestClient(app)
+    response = client.post('/test/differential', json={
+        'source_code': CANDIDATE, 'reference_code': REFERENCE,
+        'test_cases': [[2], [11]], 'run_mode': 'fast'
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['verdicts'] == ['passed', 'failed'] and body['passed'] == 1
+    assert body['results'][1]['output'] == '110'
+    # Both programs' runs, for this call only
+    assert body['resource_usage']['runs'] == 4
+
+    broken = client.post('/test/differential', json={
+        'source_code': CANDIDATE, 'reference_code': 'int main() { return }', 'test_cases': [[1]]
+    })
+    assert broken.status_code == 400 and 'Reference implementation' in broken.json()['detail']
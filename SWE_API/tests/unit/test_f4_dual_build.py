@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+from async_executor import execute_test_case_async
+from batch_executor import ParallelBatchExecutor
+from compile_cache import CompileCache
+from dual_build import CoverageMemo
+from test_executor import TestExecutor, execute_test_batch, execute_test_case
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+    return 0;
+}
+"""
+
+
+def rows(result):
+    return [(d.line_number, d.execution_count) for d in result.coverage_data]
+
+
+def test_fast_run_mode_uses_uninstrumented_build(tmp_path):
+    result = execute_test_case(SOURCE, [3], expected_output='pos', run_mode='fast')
+    assert result.execution_status == 'passed'
+    assert result.coverage_data == [] and result.branches_taken == []
+
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, binary, err = te.compile_fast(SOURCE)
+    assert ok, err
+    assert os.path.basename(binary) == 'test_program_fast'
+    assert not list(tmp_path.glob('*.gcno'))
+
+
+def test_auto_run_mode_instruments_only_new_inputs(tmp_path):
+    expected = {
+        tuple(inputs): rows(result)
+        for inputs, result in zip([[1], [-1], [5]], execute_test_batch(SOURCE, [[1], [-1], [5]], mode='process'))
+    }
+    memo = CoverageMemo()
+    batch = ParallelBatchExecutor(
+        max_workers=2, compile_cache=CompileCache(cache_dir=str(tmp_path)), coverage_memo=memo
+    )
+    try:
+        first = batch.execute(SOURCE, [[1], [-1], [1]], run_mode='auto')
+        assert [r.output for r in first] == ['pos', 'neg', 'pos']
+        assert [rows(r) for r in first] == [expected[(1,)], expected[(-1,)], expected[(1,)]]
+        assert memo.stats() == {'entries': 2, 'hits': 0, 'misses': 2}
+
+        second = batch.execute(SOURCE, [[-1], [5]], mode='forkserver', run_mode='auto')
+        assert [r.output for r in second] == ['neg', 'pos']
+        assert [rows(r) for r in second] == [expected[(-1,)], expected[(5,)]]
+        assert memo.stats() == {'entries': 3, 'hits': 1, 'misses': 3}
+    finally:
+        batch.shutdown()
+
+
+def test_async_auto_run_mode_reuses_recorded_coverage():
+    memo = CoverageMemo()
+
+    async def run():
+        return [
+            await execute_test_case_async(SOURCE, [-4], expected_output='neg', run_mode='auto', coverage_memo=memo)
+            for _ in range(2)
+        ]
+
+    first, second = asyncio.run(run())
+    assert first.execution_status == second.execution_status == 'passed'
+    assert rows(first) and rows(second) == rows(first)
+    assert second.branches_taken == first.branches_taken
+    assert memo.stats()['hits'] == 1
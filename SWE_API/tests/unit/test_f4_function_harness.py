@@ -0,0 +1,87 @@
+from cfg_parser import _find_definitions_with_regex
+from function_harness import generate_driver, value_type, with_generated_main
+from test_executor import TestExecutor, execute_test_batch, execute_test_case
+
+
+SOURCE = """#include <string>
+#include <vector>
+using namespace std;
+
+static long long total(const vector<int>& xs) {
+    long long sum = 0;
+    for (int x : xs) sum += x;
+    return sum;
+}
+
+string describe(const vector<int>& xs, double scale, bool loud, string name) {
+    if (total(xs) * scale > 10) return name + (loud ? " BIG" : " big");
+    return name + " small";
+}
+"""
+
+
+def test_driver_is_generated_only_for_sources_without_main():
+    assert value_type('const std::vector<int> &') == 'std::vector<int>'
+    assert value_type('std::size_t') == 'size_t' and value_type('string') == 'std::string'
+    assert value_type('int *') is None and value_type('vector<vector<int>>') is None
+
+    target = _find_definitions_with_regex(SOURCE)[-1]
+    assert target['return_type'] == 'string'
+    assert [t for t, _ in target['params']] == ['const vector<int>&', 'double', 'bool', 'string']
+    driver = generate_driver(target)
+    assert 'describe(arg0, arg1, arg2, arg3)' in driver and '#error' not in driver
+
+    generated = with_generated_main(SOURCE)
+    assert generated.startswith(SOURCE.rstrip('\n')) and 'int main()' in generated
+    with_main = SOURCE + 'int main() { return 0; }\n'
+    assert with_generated_main(with_main) == with_main
+
+
+def test_bare_function_runs_in_every_mode(tmp_path):
+    inputs = [[[1, 2, 3], 2.5, True, 'a b'], [[1], 1.0, False, 'x']]
+    for mode in ['process', 'persistent', 'forkserver']:
+        results = execute_test_batch(SOURCE, inputs, expected_outputs=['a b BIG', 'x small'], mode=mode)
+        assert [r.execution_status for r in results] == ['passed', 'passed'], mode
+        # Coverage shows the user's lines only, with their own line numbers
+        lines = {d.line_number for d in results[0].coverage_data}
+        assert 12 in lines and max(lines) <= SOURCE.count('\n')
+
+    binary_input = TestExecutor(work_dir=str(tmp_path), input_protocol='binary')
+    ok, binary, err = binary_input.compile_with_coverage(SOURCE)
+    assert ok, err
+    assert binary_input.execute_test(binary, [[5, 6], 1.5, False, 'multi word']).output == 'multi word big'
+    ok, fast, err = binary_input.compile_fast('double half(double x) { return x / 2; }')
+    assert ok, err
+    assert binary_input.execute_test(fast, [0.3], collect_coverage=False).output == '0.15'
+
+
+def test_string_list_parameters_read_in_both_protocols():
+    source = """#include <string>
+#include <vector>
+std::string join(const std::vector<std::string>& words, char sep) {
+    std::string out;
+    for (const std::string& w : words) out += (out.empty() ? "" : std::string(1, sep)) + "<" + w + ">";
+    return out;
+}
+"""
+    words = ['a', 'b c', "it's", 'say "x", y', '', 'tab\there', '\u00e9\u00a0\u20ac\\']
+    expected = '<a>-<b c>-<it\'s>-<say "x", y>-<>-<tab\there>-<\u00e9\u00a0\u20ac\\>'
+    for protocol in ['text', 'binary']:
+        result = execute_test_case(source, [words, '-'], expected_output=expected, input_protocol=protocol)
+        assert result.execution_status == 'passed', (protocol, result.output)
+    # Lists of numbers still read in the length-prefixed form
+    assert execute_test_case(SOURCE, ['3 4 5 6', 1.0, 'False', 'n']).output == 'n big'
+
+
+def test_unsupported_signatures_and_missing_inputs_are_reported(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, _, err = te.compile_with_coverage('int first(int* p) { return *p; }')
+    assert not ok and 'Cannot generate a test driver for first: unsupported int* p' in err
+
+    result = execute_test_case('int add(int a, int b) { return a + b; }', [4], work_dir=str(tmp_path / 'missing'))
+    assert result.execution_status == 'failed' and 'Missing input 2 of 2' in result.error
+    scoped = execute_test_case(
+        'bool positive(int x) { return x > 0; }', [3], expected_output='true',
+        work_dir=str(tmp_path / 'scoped'), coverage_scope='target'
+    )
+    assert scoped.execution_status == 'passed' and [d.line_number for d in scoped.coverage_data] == [1]
@@ -0,0 +1,62 @@
+from compile_cache import CompileCache
+from gcov_reader import load_gcno
+from test_executor import TestExecutor, execute_test_batch
+
+
+SOURCE = """
+#include <iostream>
+#include <cstdlib>
+int twice(int x) { if (x == 7) exit(3); return x * 2; }
+int main() {
+    int x;
+    std::cin >> x;
+    int s = 0; for (int i = 0; i < x; i++) { for (int j = 0; j < i; j++) s += j; }
+    switch (x % 3) {
+        case 0: std::cout << "zero"; break;
+        case 1: std::cout << twice(x); break;
+        default: std::cout << "other";
+    }
+    std::cout << (x > 2 && s < 100 ? "a" : "b") << std::endl;
+    return 0;
+}
+"""
+
+
+def rows(result):
+    return [(d.line_number, d.execution_count, d.branch_counts) for d in result.coverage_data]
+
+
+def test_native_backend_matches_gcov(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    for value in [0, 4, 5, 7, 12]:
+        te.coverage_backend = "gcov"
+        expected = te.execute_test(binary, [value])
+        te.coverage_backend = "native"
+        actual = te.execute_test(binary, [value])
+        assert rows(actual) == rows(expected)
+        assert actual.branches_taken == expected.branches_taken
+        assert [d.source_line for d in actual.coverage_data] == [d.source_line for d in expected.coverage_data]
+
+
+def test_native_backend_in_harness_batch(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    inputs = [[1], [2], [3], [7]]
+    native = execute_test_batch(SOURCE, inputs, mode='persistent', compile_cache=cache, coverage_backend='native')
+    gcov = execute_test_batch(SOURCE, inputs, mode='persistent', compile_cache=cache, coverage_backend='gcov')
+    assert [rows(r) for r in native] == [rows(r) for r in gcov]
+    # The graph is decoded once per binary and reused
+    gcno = next(cache.cache_dir.rglob('test_program.gcno'))
+    assert load_gcno(str(gcno)) is load_gcno(str(gcno))
+
+
+def test_unreadable_counters_fall_back_to_gcov(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path), coverage_backend="native")
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    run_dir = tmp_path / 'run'
+    run_dir.mkdir()
+    (run_dir / 'test_program.gcda').write_bytes(b'not a gcda file at all')
+    te._link_gcno(tmp_path, run_dir)
+    assert te._collect_coverage_native(run_dir) is None
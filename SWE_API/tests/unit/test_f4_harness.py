@@ -0,0 +1,131 @@
+import time
+
+from compile_cache import CompileCache
+from test_executor import TestExecutor, execute_test_batch
+
+
+SOURCE = """
+#include <iostream>
+#include <cstdlib>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x == 7) exit(3);
+    if (x == 99) while (true) {}
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+}
+"""
+
+
+def line_count(result, line_number):
+    return [d.execution_count for d in result.coverage_data if d.line_number == line_number]
+
+
+def test_persistent_batch_matches_per_process_results(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    inputs = [[5], [-5], [3]]
+    expected = ['pos', 'neg', 'pos']
+    persistent = execute_test_batch(SOURCE, inputs, expected, mode='persistent', compile_cache=cache)
+    process = execute_test_batch(SOURCE, inputs, expected, mode='process', compile_cache=cache)
+    assert [r.execution_status for r in persistent] == ['passed', 'passed', 'passed']
+    assert [r.output for r in persistent] == [r.output for r in process]
+    # Coverage is per input, not accumulated across the batch
+    assert line_count(persistent[0], 10) == [0]
+    assert line_count(persistent[1], 10) == [1]
+    assert line_count(persistent[2], 10) == [0]
+
+
+def test_default_batch_mode_starts_every_input_fresh(tmp_path):
+    counter = """
+#include <iostream>
+int total = 0;
+int main() {
+    int x;
+    std::cin >> x;
+    total += x;
+    std::cout << total << std::endl;
+}
+"""
+    inputs = [[1], [10], [100]]
+    fresh = execute_test_batch(counter, inputs, work_dir=str(tmp_path / 'default'))
+    assert [r.output for r in fresh] == ['1', '10', '100']
+    # persistent is opt-in: main() runs repeatedly in one process and globals carry over
+    carried = execute_test_batch(counter, inputs, mode='persistent', work_dir=str(tmp_path / 'persistent'))
+    assert [r.output for r in carried] == ['1', '11', '111']
+
+
+def test_persistent_harness_survives_exit(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, harness_path, err = te.compile_harness(SOURCE, mode='persistent')
+    assert ok, err
+    results = te.execute_persistent(harness_path, [[7], [4]], ['', 'pos'])
+    # exit(3) ends the harness process; its code is reported and the next input still runs
+    assert results[0].execution_status == 'failed'
+    assert line_count(results[0], 7) == [1]
+    assert results[1].execution_status == 'passed'
+
+
+def test_persistent_timeout_does_not_stall_batch(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, harness_path, err = te.compile_harness(SOURCE, mode='persistent')
+    assert ok, err
+    results = te.execute_persistent(harness_path, [[99], [-1]], [None, 'neg'], timeout=1)
+    assert results[0].error == 'Execution timeout'
+    assert results[1].execution_status == 'passed'
+
+
+def test_forkserver_matches_process_mode(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, harness_path, err = te.compile_harness(SOURCE, mode='forkserver')
+    assert ok, err
+    inputs = [[5], [7], [99], [-2]]
+    expected = ['pos', None, None, 'neg']
+    results = te.execute_forkserver(harness_path, inputs, expected, timeout=1)
+    assert results[0].execution_status == 'passed'
+    assert results[1].execution_status == 'failed'  # exit(3)
+    assert results[2].error == 'Execution timeout'
+    # The server outlives the timed-out child
+    assert results[3].execution_status == 'passed'
+    assert line_count(results[3], 10) == [1]
+
+
+def test_forkserver_timeout_kills_processes_the_program_started(tmp_path):
+    spawner = """
+#include <cstdio>
+#include <iostream>
+#include <unistd.h>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x == 1 && fork() == 0) {
+        FILE* f = fopen("grandchild.pid", "w");
+        fprintf(f, "%d", (int)getpid());
+        fclose(f);
+        while (true) sleep(1);
+    }
+    while (x == 1) {}
+    std::cout << "done" << std::endl;
+}
+"""
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, harness_path, err = te.compile_harness(spawner, mode='forkserver')
+    assert ok, err
+    # Checked while the server still runs: closing it kills its own group anyway
+    runs = te.iter_many(harness_path, 'forkserver', [[1], [2]], timeout=1)
+    assert next(runs).error == 'Execution timeout'
+
+    pid = int((tmp_path / 'grandchild.pid').read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            state = open(f'/proc/{pid}/stat').read().rsplit(')', 1)[1].split()[0]
+        except FileNotFoundError:
+            break
+        if state == 'Z':  # Killed, waiting to be reaped
+            break
+        time.sleep(0.05)
+    else:
+        raise AssertionError('grandchild survived the timeout')
+    assert next(runs).output == 'done'
+    runs.close()
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from async_executor import execute_test_case_async
+from input_protocol import pack_inputs, unpack_inputs
+from test_executor import execute_test_batch, execute_test_case
+
+
+# Echoes stdin, so the output is exactly the text the program read
+SOURCE = """
+#include <iostream>
+#include <string>
+int main() {
+    std::string line;
+    while (std::getline(std::cin, line)) std::cout << line << "|";
+    std::cout << std::endl;
+    return 0;
+}
+"""
+
+INPUTS = [
+    2**62, 0.1, 1e16, -0.0, 5e-324, True, 'two  words',
+    [1, 2.5, "it's", [False, '\u00e9\u00a0\t']], list(range(20000)), [0.1 * i for i in range(5000)]
+]
+EXPECTED = '|'.join(str(value) for value in INPUTS) + '|'
+
+FUNCTION = """#include <string>
+#include <vector>
+std::string describe(std::vector<double> xs, long long k, bool flag, std::string name, char c, int as_text) {
+    double sum = 0;
+    for (double x : xs) sum += x;
+    return name + "/" + std::to_string(sum * k) + "/" + (flag ? "on" : "off") + "/" + c + "/" + std::to_string(as_text);
+}
+"""
+
+
+def test_pack_round_trip_and_errors():
+    values = [-5, 1.5e300, False, 'ünï\ncode', [1, 2], [0.5], [1, 'a', [True]], []]
+    data = pack_inputs(values)
+    assert unpack_inputs(data) == values
+    assert len(pack_inputs([list(range(1000))])) == 5 + 4 + 1 + 4 + 8000
+
+    with pytest.raises(ValueError):
+        pack_inputs([2**64])
+    with pytest.raises(ValueError):
+        pack_inputs([None])
+    with pytest.raises(ValueError):
+        unpack_inputs(data[:-1])
+
+
+def test_programs_read_the_same_text_with_both_protocols():
+    result = execute_test_case(SOURCE, INPUTS, expected_output=EXPECTED, input_protocol='binary')
+    assert result.execution_status == 'passed', (result.output[:200], result.error)
+    assert result.coverage_data
+    assert execute_test_case(SOURCE, INPUTS).output == result.output
+
+    fast = execute_test_case(SOURCE, INPUTS, expected_output=EXPECTED, input_protocol='binary', run_mode='fast')
+    assert fast.execution_status == 'passed'
+
+    async_result = asyncio.run(execute_test_case_async(SOURCE, INPUTS, EXPECTED, input_protocol='binary'))
+    assert async_result.execution_status == 'passed'
+
+
+def test_harness_modes_decode_each_run():
+    inputs = [INPUTS, [1, -0.0, False, '', [-4, 4]], INPUTS]
+    for mode in ['persistent', 'forkserver']:
+        results = execute_test_batch(SOURCE, inputs, mode=mode, input_protocol='binary')
+        assert [r.output for r in results] == [EXPECTED, '1|-0.0|False||[-4, 4]|', EXPECTED]
+        assert all(r.coverage_data for r in results)
+
+
+def test_function_drivers_read_records_typed():
+    # Strings arrive whole (no line splitting); a record of another type
+    # than its parameter reads as its text would
+    inputs = [[0.5, 1.5, 2], 3, True, 'two\nlines', 'xyz', '12']
+    expected = 'two\nlines/12.000000/on/x/12'
+    for mode in ['process', 'persistent', 'forkserver']:
+        results = execute_test_batch(FUNCTION, [inputs, [[], 0, 0, '', 'q', 7]], mode=mode, input_protocol='binary')
+        assert [r.output for r in results] == [expected, '/0.000000/off/q/7'], mode
+        lines = {d.line_number for d in results[0].coverage_data}
+        assert lines and max(lines) <= FUNCTION.count('\n')
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from async_executor import AsyncTestExecutor
+from output_capture import OutputBuffer, run_captured
+from test_executor import TestExecutor, execute_test_batch
+
+
+# Prints its input, then keeps going for a while (forever for negative inputs)
+SOURCE = """
+#include <iostream>
+#include <unistd.h>
+int main() {
+    int x;
+    std::cin >> x;
+    std::cout << x << std::endl;
+    if (x < 0) while (true) std::cout << "spam spam spam spam\\n";
+    if (x > 0) usleep(x * 1000);
+    return 0;
+}
+"""
+
+
+def test_buffer_bounds_and_checks_output_incrementally():
+    buffer = OutputBuffer(limit=16, expected_output='ab\ncd')
+    assert buffer.feed(b'  ab\r') and buffer.feed(b'\ncd \n')
+    assert buffer.text() == '  ab\ncd \n' and not buffer.diverged
+
+    diverging = OutputBuffer(expected_output='abc')
+    assert diverging.feed(b'ab') and not diverging.feed(b'x')
+    assert diverging.diverged
+
+    capped = OutputBuffer(limit=4)
+    assert not capped.feed(b'\xff\xfe123456')
+    assert capped.truncated and capped.size == 4 and capped.text() == '��12'
+
+    run = run_captured(['sh', '-c', 'echo 1; echo oops >&2; yes'], timeout=5, output_limit=1000)
+    assert run.stopped and run.returncode != 0 and len(run.output) < 1000
+    assert run.error.splitlines() == ['oops', '[stdout truncated at 1000 bytes]', '[stopped early: output limit exceeded]']
+
+
+def test_fast_runs_stop_early_but_coverage_runs_finish(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path), output_limit=4096)
+    ok, fast, err = te.compile_fast(SOURCE)
+    assert ok, err
+    start = time.time()
+    wrong = te.execute_test(fast, [2000], expected_output='7', collect_coverage=False)
+    assert time.time() - start < 1.5
+    assert wrong.execution_status == 'failed' and wrong.output == '2000'
+    assert 'diverged' in wrong.error
+
+    runaway = te.execute_test(fast, [-1], collect_coverage=False)
+    assert runaway.execution_status == 'failed' and 'output limit exceeded' in runaway.error
+    assert len(runaway.output) <= 4096
+
+    # Instrumented runs go on to the end, so their coverage is complete
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    result = te.execute_test(binary, [5], expected_output='7')
+    assert result.execution_status == 'failed' and result.error is None
+    assert any(d.line_number == 9 and d.execution_count == 1 for d in result.coverage_data)
+
+    async_result = asyncio.run(AsyncTestExecutor(work_dir=str(tmp_path)).execute_test_async(
+        fast, [3000], expected_output='1', collect_coverage=False
+    ))
+    assert async_result.execution_status == 'failed' and async_result.execution_time < 1.5
+
+
+def test_harness_output_is_read_up_to_the_limit():
+    source = SOURCE.replace('while (true)', 'for (int i = 0; i < 1000; i++)')
+    results = execute_test_batch(source, [[-1], [4]], mode='persistent', output_limit=1024)
+    assert len(results[0].output) <= 1024
+    assert results[0].error == '[stdout truncated at 1024 bytes]'
+    assert results[1].output == '4' and results[1].error is None
+
+    # Harness runs write output files; they never grow past the limit, and
+    # the program still finishes with complete coverage
+    flood = """#include <iostream>
+#include <sys/stat.h>
+int main() {
+    for (int i = 0; i < 100000; i++) std::cout << "0123456789" << std::endl;
+    struct stat st;
+    fstat(1, &st);
+    std::cerr << st.st_size << std::endl;
+    return 0;
+}
+"""
+    for mode in ['persistent', 'forkserver']:
+        flooded = execute_test_batch(flood, [[0], [1]], mode=mode, output_limit=1024)
+        for result in flooded:
+            assert result.execution_status == 'passed', mode
+            assert int(result.error.splitlines()[0]) <= 1025
+            assert result.error.splitlines()[1] == '[stdout truncated at 1024 bytes]'
+            assert any(d.line_number == 4 and d.execution_count == 100001 for d in result.coverage_data)
@@ -0,0 +1,66 @@
+import os
+
+from compile_cache import CompileCache
+from pch import include_prefix
+from test_executor import TestExecutor
+
+
+SOURCE = """#include <iostream>
+// helpers
+#include <string>
+int classify(int x) {
+    if (x > %d) return 1;
+    return 0;
+}
+int main() {
+    int x;
+    std::cin >> x;
+    std::cout << classify(x) << std::endl;
+    return 0;
+}
+"""
+
+
+def rows(result):
+    return [(d.line_number, d.execution_count, d.source_line) for d in result.coverage_data]
+
+
+def test_include_prefix_stops_at_first_other_line():
+    assert include_prefix(SOURCE) == ('#include <iostream>', '#include <string>')
+    assert include_prefix('#define N 3\n#include <iostream>\n') == ()
+    assert include_prefix('#include "local.h"\n') == ()
+    assert include_prefix('#include<vector> // lists\nusing namespace std;\n#include <map>\n') == ('#include<vector>',)
+
+
+def test_precompiled_header_is_shared_and_coverage_unchanged(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    te = TestExecutor(work_dir=str(tmp_path / 'cached'), compile_cache=cache)
+    plain = TestExecutor(work_dir=str(tmp_path / 'plain'))
+    for threshold in [0, 1, 2]:
+        ok, binary, err = te.compile_with_coverage(SOURCE % threshold)
+        assert ok, err
+        ok, plain_binary, err = plain.compile_with_coverage(SOURCE % threshold)
+        assert ok, err
+        assert rows(te.execute_test(binary, [1])) == rows(plain.execute_test(plain_binary, [1]))
+    assert cache.stats()['precompiled_headers'] == {'headers': 1, 'hits': 2, 'builds': 1, 'failed': 0}
+    # The header build took a compiler slot like the three objects and links
+    assert cache.scheduler.stats()['compiles'] == 1 + 3 * 2
+
+
+def test_one_object_is_linked_for_every_mode(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    te = TestExecutor(work_dir=str(tmp_path / 'w'), compile_cache=cache)
+    paths = [
+        te.compile_with_coverage(SOURCE % 0)[1],
+        te.compile_harness(SOURCE % 0, mode='persistent')[1],
+        te.compile_harness(SOURCE % 0, mode='forkserver')[1],
+    ]
+    build_dir = os.path.dirname(paths[0])
+    assert all(os.path.dirname(p) == build_dir for p in paths) and len(set(paths)) == 3
+    object_mtime = os.stat(os.path.join(build_dir, 'test_program.o')).st_mtime_ns
+    # Another program reuses the compiled drivers; repeating a mode relinks nothing
+    assert te.compile_harness(SOURCE % 1, mode='persistent')[0]
+    assert te.compile_harness(SOURCE % 0, mode='persistent')[1] == paths[1]
+    assert os.stat(os.path.join(build_dir, 'test_program.o')).st_mtime_ns == object_mtime
+    misses = cache.stats()['misses']
+    assert misses == 4  # Two program objects, two drivers
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from compile_cache import CompileCache
+from main import app
+from project_build import Project, object_stem, parse_dependencies
+from test_executor import TestExecutor
+
+
+UTIL_H = """#pragma once
+inline int twice(int x) {
+    if (x > 100) return x;
+    return 2 * x;
+}
+int helper(int x);
+"""
+
+UTIL_CPP = """#include "util.h"
+int helper(int x) {
+    if (x < 0) return -x;
+    return twice(x);
+}
+"""
+
+MAIN_CPP = """#include <iostream>
+#include "util.h"
+int main() {
+    int x;
+    std::cin >> x;
+    std::cout << helper(x) + twice(1) << std::endl;
+    return 0;
+}
+"""
+
+FILES = {'include/util.h': UTIL_H, 'src/util.cpp': UTIL_CPP, 'src/main.cpp': MAIN_CPP}
+
+
+def ten_files(offset=3):
+    files = {f'src/f{i}.cpp': f'#include "common.h"\nint f{i}(int x) {{ return x > {i} ? x + {i} : x; }}\n' for i in range(9)}
+    files['src/f3.cpp'] = f'#include "common.h"\nint f3(int x) {{ return x > 3 ? x + {offset} : x; }}\n'
+    files['include/common.h'] = ''.join(f'int f{i}(int x);\n' for i in range(9))
+    calls = ''.join(f'    s += f{i}(x);\n' for i in range(9))
+    files['src/main.cpp'] = (
+        '#include <iostream>\n#include "common.h"\n'
+        f'int main() {{\n    int x;\n    std::cin >> x;\n    int s = 0;\n{calls}    std::cout << s << std::endl;\n}}\n'
+    )
+    return files
+
+
+def test_projects_are_validated_and_scanned():
+    project = Project({'./src/main.cpp': MAIN_CPP, 'include/util.h': UTIL_H, 'README': 'notes'})
+    assert project.sources == ['src/main.cpp'] and project.headers == ['include/util.h']
+    assert project.include_flags() == ['-I.', '-Iinclude'] and object_stem('src/main.cpp') == 'src_main_cpp'
+    for files in ({'../main.cpp': MAIN_CPP}, {'/tmp/main.cpp': MAIN_CPP}, {'util.h': UTIL_H}):
+        with pytest.raises(ValueError):
+            Project(files)
+
+    rule = 'src_main_cpp.o: src/main.cpp include/util.h \\\n ./include/util.h /usr/include/stdio.h missing.h\n'
+    assert parse_dependencies(rule, project) == ['include/util.h']
+    assert Project(FILES).key() != Project(dict(FILES, **{'src/util.cpp': UTIL_CPP + '\n'})).key()
+
+
+def test_editing_one_file_rebuilds_only_its_objects(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path))
+    te = TestExecutor(compile_cache=cache)
+    try:
+        assert te.execute_source(Project(ten_files()), [[4]], mode='persistent')[0].output == '42'
+        misses, scans = cache.misses, cache.dependencies.scans
+        # One edited source: its object and the link
+        assert te.execute_source(Project(ten_files(30)), [[4]], mode='persistent')[0].output == '69'
+        assert cache.misses - misses == 2 and cache.dependencies.scans - scans == 1
+
+        # A header edit rebuilds every source that includes it
+        files = ten_files(30)
+        files['include/common.h'] += '// comment\n'
+        misses = cache.misses
+        assert te.execute_source(Project(files), [[4]], mode='persistent')[0].output == '69'
+        assert cache.misses - misses == 11
+    finally:
+        te.cleanup()
+
+    uncached = TestExecutor(work_dir=str(tmp_path / 'plain'))
+    broken = dict(FILES, **{'src/util.cpp': '#include "gone.h"\n' + UTIL_CPP})
+    result = uncached.execute_source(Project(broken), [[1]])[0]
+    assert result.execution_status == 'error' and 'gone.h' in result.error
+    assert uncached.execute_source(Project(FILES), [[5]])[0].output == '12'
+
+
+def test_header_that_starts_including_another_is_rescanned(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path))
+    te = TestExecutor(compile_cache=cache)
+    main = '#include <iostream>\n#include "a.h"\nint main() { std::cout << V; }\n'
+    try:
+        files = {'main.cpp': main, 'a.h': '#define V 1\n', 'b.h': '#define W 5\n'}
+        assert te.execute_source(Project(files), [[]])[0].output == '1'
+        files['a.h'] = '#include "b.h"\n#define V W\n'
+        assert te.execute_source(Project(files), [[]])[0].output == '5'
+        # b.h only reaches main.cpp through a.h; editing it must still rebuild
+        files['b.h'] = '#define W 7\n'
+        assert te.execute_source(Project(files), [[]])[0].output == '7'
+    finally:
+        te.cleanup()
+
+
+def test_coverage_spans_every_project_file(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path))
+    runs = {}
+    for backend in ('gcov', 'native'):
+        for mode in ('process', 'persistent'):
+            te = TestExecutor(compile_cache=cache, coverage_backend=backend)
+            runs[backend, mode] = te.execute_source(Project(FILES), [[5], [-3]], mode=mode)
+            te.cleanup()
+    first = runs['gcov', 'process']
+    assert [r.output for r in first] == ['12', '5']
+    lines = {(d.file_name, d.line_number): d.execution_count for d in first[0].coverage_data}
+    # twice() runs twice: once from helper() in util.cpp and once from main.cpp
+    assert lines[('include/util.h', 3)] == 2 and lines[('src/util.cpp', 3)] == 1
+    assert 'src/util.cpp:L3_b1' in first[0].branches_taken and 'src/util.cpp:L3_b0' in first[1].branches_taken
+    assert all(
+        [r.branches_taken for r in results] == [r.branches_taken for r in first] for results in runs.values()
+    )
+
+    te = TestExecutor(compile_cache=cache, coverage_scope='target')
+    scoped = te.execute_source(Project(FILES), [[5]])[0]
+    te.cleanup()
+    assert scoped.output == '12' and 'src/main.cpp' not in {d.file_name for d in scoped.coverage_data}
+
+    client = TestClient(app)
+    response = client.post('/test/execute-project', json={
+        'files': FILES, 'test_cases': [[5], [200]], 'expected_outputs': ['12', '202']
+    })
+    assert response.status_code == 200, response.text
+    assert [r['execution_status'] for r in response.json()] == ['passed', 'passed']
+    assert json.loads(response.headers['x-resource-usage'])['runs'] == 2
+    rejected = client.post('/test/execute-project', json={
+        'files': FILES, 'test_cases': [[5]], 'coverage_backend': 'sancov'
+    })
+    assert rejected.status_code == 400
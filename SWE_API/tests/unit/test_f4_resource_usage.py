@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from async_executor import AsyncTestExecutor
+from batch_executor import ParallelBatchExecutor
+from compile_cache import CompileCache
+from main import app
+from models import TestExecutionOutput
+from output_capture import run_captured
+from resource_usage import UsageSummary
+from result_cache import ResultCache
+from test_executor import TestExecutor
+
+
+# Spins for x million iterations, touching x MiB of memory
+SOURCE = """
+#include <iostream>
+#include <vector>
+int main() {
+    int x;
+    std::cin >> x;
+    std::vector<char> memory((size_t)x << 20, 1);
+    volatile long sum = 0;
+    for (long i = 0; i < (long)x * 1000000; i++) sum += memory[i % memory.size()];
+    std::cout << (sum > 0 ? "done" : "empty") << std::endl;
+    return 0;
+}
+"""
+
+
+def output(test_id, cpu, rss, cached=False):
+    return TestExecutionOutput(
+        test_id=test_id, execution_status='passed', output='done', coverage_data=[],
+        branches_taken=[], execution_time=cpu, cached=cached,
+        cpu_user_time=cpu, cpu_system_time=0.0, max_rss_kb=rss,
+        minor_page_faults=10, major_page_faults=0
+    )
+
+
+def test_runs_report_cpu_time_and_peak_memory():
+    busy = run_captured(['python3', '-c', 'x = bytearray(64 << 20); sum(range(5_000_000))'], timeout=30)
+    idle = run_captured(['sleep', '0.3'], timeout=5)
+    assert busy.returncode == 0 and idle.returncode == 0
+    assert busy.usage.cpu_user_time > 0.05 and busy.usage.max_rss_kb > 64 * 1024
+    assert busy.usage.minor_page_faults > 1000
+    # Wall-clock time spent sleeping is not CPU time
+    assert idle.usage.cpu_user_time + idle.usage.cpu_system_time < 0.1
+
+
+def test_every_execution_path_reports_usage(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    results = [te.execute_test(binary, [50], expected_output='done')]
+    for mode in ('persistent', 'forkserver'):
+        results += te.execute_source(SOURCE, [[1], [50]], mode=mode)
+    results.append(asyncio.run(AsyncTestExecutor(work_dir=str(tmp_path)).execute_test_async(binary, [50])))
+
+    for result in results:
+        assert result.output == 'done', result.error
+        assert result.cpu_user_time is not None and result.max_rss_kb > 0
+    large = [r for r in results if r is not results[1] and r is not results[3]]
+    assert all(r.max_rss_kb > 50 * 1024 for r in large)
+    # The persistent harness reports per-run deltas of the shared process
+    assert results[1].cpu_user_time < results[2].cpu_user_time
+
+
+def test_summaries_skip_cached_results(tmp_path):
+    summary = UsageSummary().add_all([
+        output('a', 0.5, 2000), output('b', 0.1, 9000), output('c', 0.2, 1000), output('d', 9.0, 1, cached=True)
+    ])
+    stats = summary.summary(workers=2)
+    assert stats['runs'] == 4 and stats['measured'] == 3
+    assert stats['cpu_seconds'] == 0.8 and stats['cpu_max'] == 0.5 and stats['peak_rss_kb'] == 9000
+    assert stats['most_expensive'] == ['a', 'c', 'b'] and stats['minor_page_faults'] == 30
+    assert 0 < stats['utilization'] < stats['parallelism']
+
+    batch = ParallelBatchExecutor(
+        max_workers=1, compile_cache=CompileCache(cache_dir=str(tmp_path)), result_cache=ResultCache()
+    )
+    usage = UsageSummary()
+    try:
+        results = batch.execute(SOURCE, [[20], [1], [20]], mode='persistent', usage=usage)
+    finally:
+        batch.shutdown()
+    assert [r.output for r in results] == ['done'] * 3
+    stats = usage.summary(batch.max_workers)
+    assert stats['runs'] == 3 and stats['measured'] == 2
+    assert stats['most_expensive'][0] == results[0].test_id
+
+
+def test_batch_endpoint_reports_its_own_usage():
+    client = TestClient(app)
+    responses = [
+        client.post('/test/execute-batch', params={'source_code': SOURCE, 'cache_results': False}, json=[[1]] * n)
+        for n in (1, 3)
+    ]
+    assert all(r.status_code == 200 for r in responses)
+    assert [json.loads(r.headers['x-resource-usage'])['runs'] for r in responses] == [1, 3]
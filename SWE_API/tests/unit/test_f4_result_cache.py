@@ -0,0 +1,82 @@
+import time
+
+from batch_executor import ParallelBatchExecutor
+from compile_cache import CompileCache
+from models import TestExecutionOutput
+from result_cache import ResultCache
+from test_executor import TestExecutor
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+    return 0;
+}
+"""
+
+
+def output(test_id, status='passed'):
+    return TestExecutionOutput(
+        test_id=test_id, execution_status=status, output='pos',
+        coverage_data=[], branches_taken=['L6'], execution_time=0.01
+    )
+
+
+def test_entries_expire_and_are_evicted(tmp_path):
+    binary = tmp_path / 'prog'
+    binary.write_bytes(b'\x7fELF one')
+    cache = ResultCache(max_entries=1, ttl=0.2)
+    key = cache.key(str(binary), '1\n', None)
+    cache.put(key, output('a'))
+    hit = cache.get(key)
+    assert hit.cached and hit.test_id != 'a' and hit.branches_taken == ['L6']
+    assert cache.key(str(binary), '1\n', 'pos') != key
+
+    cache.put(cache.key(str(binary), '2\n', None), output('b'))
+    assert cache.get(key) is None  # evicted
+    cache.put(key, output('c', status='error'))
+    assert cache.get(key) is None  # errors are not stored
+
+    cache.put(key, output('d'))
+    time.sleep(0.3)
+    assert cache.get(key) is None
+    assert cache.stats() == {'entries': 0, 'hits': 1, 'misses': 3, 'expired': 1, 'evictions': 2}
+
+
+def test_repeated_runs_are_served_from_cache(tmp_path):
+    cache = ResultCache()
+    te = TestExecutor(work_dir=str(tmp_path), result_cache=cache)
+    ok, binary, err = te.compile_with_coverage(SOURCE)
+    assert ok, err
+    first = te.execute_test(binary, [3], expected_output='pos')
+    second = te.execute_test(binary, [3], expected_output='pos')
+    assert not first.cached and second.cached
+    assert second.output == first.output and second.coverage_data == first.coverage_data
+    assert te.execute_test(binary, [3], expected_output='neg').execution_status == 'failed'
+
+    # A different program rebuilt at the same path does not reuse results
+    ok, rebuilt, err = te.compile_with_coverage(SOURCE.replace('"pos"', '"positive"'))
+    assert ok and rebuilt == binary, err
+    assert te.execute_test(rebuilt, [3]).output == 'positive'
+
+
+def test_batches_reuse_results_unless_disabled(tmp_path):
+    cache = ResultCache()
+    batch = ParallelBatchExecutor(
+        max_workers=1, compile_cache=CompileCache(cache_dir=str(tmp_path)), result_cache=cache
+    )
+    try:
+        results = batch.execute(SOURCE, [[1], [1], [-1]], mode='persistent')
+        assert [r.cached for r in results] == [False, True, False]
+        again = batch.execute(SOURCE, [[-1], [2]], mode='persistent')
+        assert [r.cached for r in again] == [True, False]
+        uncached = batch.execute(SOURCE, [[1], [1]], mode='persistent', cache_results=False)
+        assert [r.cached for r in uncached] == [False, False]
+        assert [r.output for r in uncached] == ['pos', 'pos']
+    finally:
+        batch.shutdown()
+    assert cache.stats()['hits'] == 2
@@ -0,0 +1,111 @@
+import os
+import struct
+import subprocess
+
+from compile_cache import CompileCache
+from fault_localizer import analyze_from_executions
+from sancov import SANCOV_ENV, SANCOV_RUNTIME, CoverageMap, _COUNTS, _LIST, _PCS
+from test_executor import execute_test_batch
+
+
+SOURCE = """
+#include <iostream>
+#include <cstdlib>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x == 7) exit(3);
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+    return 0;
+}
+"""
+
+
+def lines(result):
+    return [d.line_number for d in result.coverage_data if d.execution_count > 0]
+
+
+def test_hit_map_reset_clears_only_hit_slots():
+    coverage_map = CoverageMap()
+    try:
+        # Simulate the runtime: two slots hit, recorded in the hit list
+        for i, (slot, pc) in enumerate([(5, 0x1200), (900, 0x1300)]):
+            struct.pack_into("=I", coverage_map._map, _LIST + 4 * i, slot)
+            struct.pack_into("=I", coverage_map._map, _PCS + 4 * slot, pc)
+            coverage_map._map[_COUNTS + slot] = 3
+        struct.pack_into("=II", coverage_map._map, 0, 2, 1)
+        assert coverage_map.hits() == {0x1200: 3, 0x1300: 3}
+        coverage_map.reset()
+        assert coverage_map.hits() == {} and coverage_map.dropped() == 0
+    finally:
+        coverage_map.close()
+
+
+def test_colliding_blocks_get_their_own_slots(tmp_path):
+    # Calls the runtime directly with PC offsets (argv: offset, hits, ...)
+    source = tmp_path / 'hits.cpp'
+    source.write_text(SANCOV_RUNTIME + """
+int main(int argc, char** argv) {
+    for (int i = 1; i + 1 < argc; i += 2) {
+        uintptr_t pc = (uintptr_t)&__executable_start + strtoul(argv[i], 0, 10);
+        for (int n = atoi(argv[i + 1]); n > 0; n--) sancov_hit(pc);
+    }
+    return 0;
+}
+""")
+    binary = tmp_path / 'hits'
+    subprocess.run(['g++', str(source), '-o', str(binary)], check=True)
+
+    # Offsets whose hash is the same slot
+    inverse = pow(2654435761, -1, 2**32)
+    offsets = [inverse * ((1234 << 16) | low) % 2**32 for low in range(300)]
+    coverage_map = CoverageMap()
+    try:
+        def run(hits):
+            coverage_map.reset()
+            args = [str(value) for offset, n in hits.items() for value in (offset, n)]
+            subprocess.run([str(binary), *args], check=True, env={**os.environ, SANCOV_ENV: coverage_map.path})
+            return coverage_map.hits()
+
+        few = {offsets[0]: 3, offsets[1]: 1, offsets[2]: 300}
+        assert run(few) == {offsets[0]: 3, offsets[1]: 1, offsets[2]: 255}
+        assert coverage_map.dropped() == 0
+
+        # Its home slot and 256 probes taken, a block is counted, not merged
+        many = run({offset: 1 for offset in offsets})
+        assert many == {offset: 1 for offset in offsets[:257]}
+        assert coverage_map.dropped() == 43
+    finally:
+        coverage_map.close()
+
+
+def test_sancov_edges_and_lines_agree_across_modes(tmp_path):
+    cache = CompileCache(cache_dir=str(tmp_path / 'cache'))
+    inputs = [[5], [-5], [7], [5]]
+    expected = ['pos', 'neg', None, 'pos']
+    by_mode = {
+        mode: execute_test_batch(SOURCE, inputs, expected, mode=mode, compile_cache=cache, coverage_backend='sancov')
+        for mode in ['process', 'persistent', 'forkserver']
+    }
+    for results in by_mode.values():
+        assert [r.execution_status for r in results] == ['passed', 'passed', 'failed', 'passed']
+        assert [r.branches_taken for r in results] == [r.branches_taken for r in by_mode['process']]
+        assert [lines(r) for r in results] == [lines(r) for r in by_mode['process']]
+    pos, neg, exited, pos_again = by_mode['persistent']
+    # Same path, same edge set; different paths, different edge sets
+    assert pos.branches_taken == pos_again.branches_taken
+    assert set(pos.branches_taken) != set(neg.branches_taken)
+    assert 8 in lines(pos) and 9 not in lines(pos)
+    assert 9 in lines(neg)
+    assert 8 not in lines(exited)
+
+
+def test_sancov_results_feed_fault_localization(tmp_path):
+    results = execute_test_batch(SOURCE, [[5], [-5], [-1]], ['pos', 'wrong', 'wrong'], coverage_backend='sancov')
+    report = analyze_from_executions(
+        'test_program.cpp', SOURCE, [(r.test_id, r) for r in results]
+    )
+    assert report.failed_tests == 2
+    top = max(report.suspicious_lines, key=lambda s: s.suspiciousness_score)
+    assert top.line_number == 9  # The "neg" line only failing tests run
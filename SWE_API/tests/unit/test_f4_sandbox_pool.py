@@ -0,0 +1,59 @@
+from batch_executor import ParallelBatchExecutor
+from sandbox_pool import SandboxPool
+from test_executor import TestExecutor, execute_test_case
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+    return 0;
+}
+"""
+
+
+def test_released_sandbox_is_emptied_and_reused(tmp_path):
+    pool = SandboxPool(size=1, root_dir=str(tmp_path))
+    sandbox = pool.acquire()
+    (sandbox / 'run').mkdir()
+    (sandbox / 'run' / 'test_program.gcda').write_bytes(b'x' * 100)
+    (sandbox / 'test_program.gcno').write_bytes(b'x' * 20)
+    assert pool.disk_usage() == 120
+    pool.release(sandbox)
+    assert list(sandbox.iterdir()) == []
+    with pool.sandbox() as again:
+        assert again == sandbox
+    stats = pool.stats()
+    assert (stats['created'], stats['reused'], stats['reset_files'], stats['reset_bytes']) == (1, 2, 2, 120)
+
+
+def test_pool_grows_under_load_and_shrinks_back(tmp_path):
+    pool = SandboxPool(size=2, root_dir=str(tmp_path / 'pool'), use_tmpfs=True)
+    sandboxes = [pool.acquire() for _ in range(3)]
+    assert len(set(sandboxes)) == 3 and pool.stats()['in_use'] == 3
+    for sandbox in sandboxes:
+        pool.release(sandbox)
+    assert pool.stats()['idle'] == 2
+    assert len(list(pool.root.iterdir())) == 2
+    pool.close()
+    assert not pool.root.exists()
+
+
+def test_executors_leave_nothing_behind(tmp_path):
+    pool = SandboxPool(size=2, root_dir=str(tmp_path / 'pool'))
+    result = execute_test_case(SOURCE, [3], expected_output='pos', sandbox_pool=pool)
+    assert result.execution_status == 'passed' and result.coverage_data
+    batch = ParallelBatchExecutor(max_workers=2, sandbox_pool=pool)
+    results = batch.execute(SOURCE, [[1], [-1], [2]], mode='process')
+    assert [r.output for r in results] == ['pos', 'neg', 'pos']
+    batch.shutdown()
+    assert pool.disk_usage() == 0 and pool.stats()['in_use'] == 0
+
+    # Without a pool, the executor's temporary directory is deleted
+    executor = TestExecutor()
+    assert executor.compile_with_coverage(SOURCE)[0]
+    executor.cleanup()
+    assert not executor.work_dir.exists()
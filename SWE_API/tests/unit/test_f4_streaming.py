@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from batch_executor import ParallelBatchExecutor
+from main import app
+from sandbox_pool import SandboxPool
+
+
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    if (x > 0) std::cout << "pos" << std::endl;
+    else std::cout << "neg" << std::endl;
+    return 0;
+}
+"""
+
+
+def test_execute_iter_yields_every_index_once():
+    inputs = [[i - 3] for i in range(7)]
+    batch = ParallelBatchExecutor(max_workers=3)
+    try:
+        pairs = list(batch.execute_iter(SOURCE, inputs, mode='process', run_mode='auto'))
+        collected = batch.execute(SOURCE, inputs, mode='forkserver')
+    finally:
+        batch.shutdown()
+    assert sorted(i for i, _ in pairs) == list(range(7))
+    by_index = dict(pairs)
+    assert [by_index[i].output for i in range(7)] == [r.output for r in collected]
+    assert [by_index[i].output for i in range(7)] == ['neg'] * 4 + ['pos'] * 3
+
+
+def test_closing_stream_early_stops_workers_and_frees_sandboxes(tmp_path):
+    pool = SandboxPool(size=3, root_dir=str(tmp_path))
+    batch = ParallelBatchExecutor(max_workers=2, sandbox_pool=pool)
+    try:
+        stream = batch.execute_iter(SOURCE, [[1]] * 200, mode='process')
+        first = [next(stream) for _ in range(3)]
+        start = time.time()
+        stream.close()
+        assert time.time() - start < 5
+    finally:
+        batch.shutdown()
+    assert all(result.output == 'pos' for _, result in first)
+    assert pool.stats()['in_use'] == 0
+    pool.close()
+
+
+def test_stalled_stream_does_not_hold_shared_workers():
+    batch = ParallelBatchExecutor(max_workers=2)
+    try:
+        stream = batch.execute_iter(SOURCE, [[1]] * 40, mode='process')
+        next(stream)
+        # Nobody reads the stream now; another batch on the same pool still runs
+        done = []
+        other = threading.Thread(target=lambda: done.append(batch.execute(SOURCE, [[-1], [2]])))
+        other.start()
+        other.join(timeout=60)
+        assert [r.output for r in done[0]] == ['neg', 'pos']
+        # The unread results were buffered, not dropped
+        assert len(list(stream)) == 39
+    finally:
+        stream.close()
+        batch.shutdown()
+
+
+def test_stream_endpoint_writes_ndjson_lines():
+    client = TestClient(app)
+    response = client.post(
+        '/test/execute-batch-stream',
+        params={'source_code': SOURCE, 'run_mode': 'fast'},
+        json=[[1], [-1], [2]]
+    )
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    outputs = {line['index']: line['result']['output'] for line in lines}
+    assert outputs == {0: 'pos', 1: 'neg', 2: 'pos'}
+
+    bad = client.post('/test/execute-batch-stream', params={'source_code': SOURCE, 'run_mode': 'x'}, json=[[1]])
+    assert bad.status_code == 400
@@ -1,4 +1,4 @@
-from test_executor import TestExecutor
+from test_executor import TestExecutor, execute_test_case
 
 
 def test_parse_gcov_file_and_line_numbers(tmp_path):
@@ -14,17 +14,25 @@ def test_parse_gcov_file_and_line_numbers(tmp_path):
     assert any(d.line_number == 5 for d in parsed)
 
 
-def test_extract_branches_identifies_if(tmp_path):
+def test_extract_branches_reads_gcov_branch_records(tmp_path):
     te = TestExecutor(work_dir=str(tmp_path))
-    gcov_content = """
-        5:   10:    if (x > 0) x++;
-        1:   11:    y = x;
-    """
+    gcov_content = """        5:   10:    if (x > 0) x++;
+branch  0 taken 3 (fallthrough)
+branch  1 taken 2
+        5:   11:    if (y > 0) y++;
+branch  0 taken 5
+branch  1 never executed
+        1:   12:    // if only in a comment
+        0:   13:    while (z) z--;
+branch  0 never executed
+branch  1 never executed
+"""
     f = tmp_path / 'test_program.cpp.gcov'
     f.write_text(gcov_content)
     parsed = te._parse_gcov_file(f)
+    assert [d.branch_counts for d in parsed] == [[3, 2], [5, 0], None, [0, 0]]
     branches = te._extract_branches(parsed)
-    assert any(b.startswith('L10') for b in branches)
+    assert branches == ['L10', 'L10_b0', 'L10_b1', 'L11', 'L11_b0']
 
 
 def test_collect_coverage_no_gcda(tmp_path):
@@ -33,3 +41,117 @@ def test_collect_coverage_no_gcda(tmp_path):
     coverage, branches = te._collect_coverage_data()
     assert coverage == []
     assert branches == []
+
+
+def test_concurrent_runs_of_one_binary_have_exact_coverage(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    source = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    for (int i = 0; i < x; i++) std::cout << i;
+    return 0;
+}
+"""
+    te = TestExecutor(work_dir=str(tmp_path))
+    ok, binary, err = te.compile_with_coverage(source)
+    assert ok, err
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda n: te.execute_test(binary, [n]), [1, 2, 3, 4, 5, 6]))
+    for n, r in zip([1, 2, 3, 4, 5, 6], results):
+        # 'return 0' ran exactly once: no counters shared between runs
+        assert [d.execution_count for d in r.coverage_data if d.line_number == 7] == [1]
+    # Run directories are removed after collection
+    assert not list(tmp_path.glob('run_*'))
+
+
+def test_parse_gcov_json_keeps_program_lines_only(tmp_path):
+    te = TestExecutor(work_dir=str(tmp_path))
+    source = tmp_path / 'test_program.cpp'
+    source.write_text("int f(int x) {\n    if (x > 0) x++;\n    return x;\n}\n")
+    report = {
+        "current_working_directory": str(tmp_path),
+        "files": [
+            {"file": "/usr/include/c++/12/iostream", "lines": [{"line_number": 74, "count": 1, "branches": []}]},
+            {"file": str(source), "lines": [
+                {"line_number": 2, "count": 3, "branches": [{"count": 2}, {"count": 1}]},
+                # Same line in a second function (template instantiation) is summed
+                {"line_number": 2, "count": 1, "branches": [{"count": 0}, {"count": 1}]},
+                {"line_number": 3, "count": 0, "branches": []},
+            ]},
+        ],
+    }
+    import json
+    coverage, branches = te._parse_gcov_json(json.dumps(report))
+    assert [(d.line_number, d.execution_count) for d in coverage] == [(2, 4), (3, 0)]
+    assert coverage[0].source_line == "    if (x > 0) x++;"
+    assert coverage[0].branch_counts == [2, 1, 0, 1]
+    assert 'L2' in branches
+
+
+def test_json_and_text_collectors_agree(tmp_path):
+    source = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    for (int i = 0; i < x; i++) std::cout << i;
+    return 0;
+}
+"""
+    te = TestExecutor(work_dir=str(tmp_path))
+    if not te.gcov_json:
+        return  # Old toolchain: only the text collector exists
+    ok, binary, err = te.compile_with_coverage(source)
+    assert ok, err
+    json_result = te.execute_test(binary, [3])
+    te.gcov_json = False
+    text_result = te.execute_test(binary, [3])
+    text_counts = {d.line_number: d.execution_count for d in text_result.coverage_data}
+    assert json_result.coverage_data
+    for d in json_result.coverage_data:
+        if text_counts[d.line_number] >= 0:
+            assert d.execution_count == text_counts[d.line_number]
+    assert [d.execution_count for d in json_result.coverage_data if d.line_number == 7] == [1]
+
+
+SCOPED_SOURCE = """
+#include <iostream>
+#include <string>
+int classify(int x) {
+    if (x > 0) return 1;
+    return 0;
+}
+int main() {
+    int x;
+    std::cin >> x;
+    std::string label = "class ";
+    std::cout << label << classify(x) << std::endl;
+    return 0;
+}
+"""
+
+
+def test_target_scope_reports_only_the_function_under_test(tmp_path):
+    full = execute_test_case(SCOPED_SOURCE, [5], work_dir=str(tmp_path / 'all'))
+    assert {d.line_number for d in full.coverage_data} >= {10, 12}
+    for backend in ['gcov', 'native', 'sancov']:
+        result = execute_test_case(
+            SCOPED_SOURCE, [5], expected_output='class 1',
+            work_dir=str(tmp_path / backend), coverage_backend=backend, coverage_scope='target'
+        )
+        assert result.execution_status == 'passed'
+        lines = {d.line_number for d in result.coverage_data if d.execution_count > 0}
+        # Lines keep their numbers; main's lines are not instrumented
+        assert 5 in lines and not lines & {8, 10, 11, 12, 13}
+    scoped = execute_test_case(SCOPED_SOURCE, [5], work_dir=str(tmp_path / 'json'), coverage_scope='target')
+    assert [d for d in full.coverage_data if d.line_number < 8] == scoped.coverage_data
+    assert scoped.branches_taken == [b for b in full.branches_taken if int(b[1:].split('_')[0]) < 8]
+
+
+def test_target_scope_without_function_instruments_main(tmp_path):
+    result = execute_test_case(
+        'int main() {\n    return 0;\n}\n', [], work_dir=str(tmp_path), coverage_scope='target'
+    )
+    assert [d.line_number for d in result.coverage_data] == [1, 2]
@@ -0,0 +1,78 @@
+import subprocess
+import time
+
+from batch_executor import ParallelBatchExecutor
+from compile_cache import CompileCache
+from timeouts import TimeoutPolicy, run_limited
+
+
+# Hangs for negative inputs
+SOURCE = """
+#include <iostream>
+int main() {
+    int x;
+    std::cin >> x;
+    while (x < 0) {}
+    std::cout << x << std::endl;
+    return 0;
+}
+"""
+
+
+def test_policy_uses_ceiling_until_enough_samples(tmp_path):
+    binary = tmp_path / 'prog'
+    binary.write_bytes(b'')
+    policy = TimeoutPolicy(multiplier=4, floor=0.1, min_samples=3)
+    for seconds in [0.01, 0.02]:
+        policy.record(str(binary), seconds)
+    assert policy.timeout_for(str(binary), 5) == 5
+    policy.record(str(binary), 0.05)
+    assert policy.timeout_for(str(binary), 5) == 0.2  # 4 x p99
+    assert policy.timeout_for(str(binary), 0.15) == 0.15  # never above the ceiling
+    for _ in range(3):
+        policy.record(str(binary), 0.001)
+    assert policy.timeout_for(str(binary), 5) == 0.2
+
+    other = tmp_path / 'fast'
+    other.write_bytes(b'')
+    for _ in range(3):
+        policy.record(str(other), 0.001)
+    assert policy.timeout_for(str(other), 5) == 0.1  # floor
+    assert policy.stats()['binaries'] == 2
+
+
+def test_hanging_runs_are_killed_early_once_runtimes_are_known(tmp_path):
+    policy = TimeoutPolicy(min_samples=4)
+    # Cached builds keep their path, so the second batch runs the same binary
+    batch = ParallelBatchExecutor(
+        max_workers=1, compile_cache=CompileCache(cache_dir=str(tmp_path)), timeout_policy=policy
+    )
+    try:
+        warmup = batch.execute(SOURCE, [[i] for i in range(4)], mode='process')
+        assert [r.timeout for r in warmup] == [5] * 4
+
+        start = time.time()
+        results = batch.execute(SOURCE, [[-1], [7], [-2]], mode='process')
+        elapsed = time.time() - start
+    finally:
+        batch.shutdown()
+    assert [r.error for r in results] == ['Execution timeout', None, 'Execution timeout']
+    assert results[1].output == '7'
+    assert all(r.timeout < 5 for r in results)
+    assert elapsed < 4
+    assert policy.stats()['timeouts'] == 2
+
+
+def test_timeout_kills_process_group_and_limits_cpu():
+    # The background sleep keeps stdout open; only a group kill lets the call return
+    start = time.time()
+    try:
+        run_limited(['sh', '-c', 'sleep 30 & sleep 30'], timeout=0.3)
+        assert False, 'no timeout'
+    except subprocess.TimeoutExpired:
+        pass
+    assert time.time() - start < 5
+
+    # The limit is set just after the process starts
+    result = run_limited(['sh', '-c', 'sleep 0.2; ulimit -t'], timeout=2)
+    assert result.stdout.strip() == '3'
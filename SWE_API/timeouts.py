@@ -0,0 +1,202 @@
+"""
+F4: Adaptive Timeouts
+Per-binary run timeouts derived from how long earlier runs of the same
+binary took, and process helpers that enforce a timeout on the whole
+process group, with a CPU-time limit as a backstop.
+"""
+
+import math
+import os
+import signal
+import subprocess
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Run timeout in seconds when the caller gives none; also the adaptive ceiling
+DEFAULT_TIMEOUT = 5
+
+# Compiler/linker timeout in seconds
+COMPILE_TIMEOUT = 30
+
+
+class TimeoutPolicy:
+    """
+    Chooses each run's timeout from the runtimes of earlier runs of the
+    same binary: multiplier x p99, clamped to [floor, ceiling].
+
+    Until a binary has min_samples completed runs, it gets the full ceiling.
+    A binary is identified by its path and modification time, so a program
+    rebuilt at the same path starts over. Only runs that finished count;
+    timed-out runs never raise the estimate.
+    """
+
+    def __init__(
+        self,
+        multiplier: float = 5.0,
+        floor: float = 0.25,
+        min_samples: int = 8,
+        window: int = 256,
+        max_binaries: int = 1024
+    ):
+        """
+        Initialize timeout policy.
+
+        Args:
+            multiplier: Timeout as a multiple of the observed p99 runtime
+            floor: Shortest timeout ever chosen, in seconds (absorbs scheduling noise)
+            min_samples: Completed runs needed before a binary's timeout adapts
+            window: Most recent runtimes kept per binary
+            max_binaries: Binaries tracked; the least recently used is forgotten
+        """
+        self.multiplier = multiplier
+        self.floor = floor
+        self.min_samples = min_samples
+        self.window = window
+        self.max_binaries = max_binaries
+        self._lock = threading.Lock()
+        self._runtimes: "OrderedDict[tuple, deque]" = OrderedDict()
+        self.adapted = 0
+        self.timeouts = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _key(binary_path: str) -> tuple:
+        try:
+            return binary_path, os.stat(binary_path).st_mtime_ns
+        except OSError:
+            return binary_path, 0
+
+    def timeout_for(self, binary_path: str, ceiling: float = DEFAULT_TIMEOUT) -> float:
+        """Timeout in seconds for the next run of binary_path (never above ceiling)."""
+        key = self._key(binary_path)
+        with self._lock:
+            samples = self._runtimes.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                return ceiling
+            self._runtimes.move_to_end(key)
+            ordered = sorted(samples)
+            p99 = ordered[math.ceil(0.99 * len(ordered)) - 1]
+            timeout = min(ceiling, max(self.floor, self.multiplier * p99))
+            if timeout < ceiling:
+                self.adapted += 1
+        return round(timeout, 3)
+
+    def record(self, binary_path: str, seconds: float):
+        """Add the runtime of a run of binary_path that finished in time."""
+        key = self._key(binary_path)
+        with self._lock:
+            samples = self._runtimes.get(key)
+            if samples is None:
+                samples = self._runtimes[key] = deque(maxlen=self.window)
+                while len(self._runtimes) > self.max_binaries:
+                    self._runtimes.popitem(last=False)
+            else:
+                self._runtimes.move_to_end(key)
+            samples.append(seconds)
+
+    def record_timeout(self, timeout: float, ceiling: float):
+        """Count a run killed after timeout seconds instead of the full ceiling."""
+        with self._lock:
+            self.timeouts += 1
+            self.saved_seconds += max(0.0, ceiling - timeout)
+
+    def stats(self) -> Dict[str, object]:
+        """Statistics for the /status endpoint."""
+        with self._lock:
+            return {
+                "binaries": len(self._runtimes),
+                "multiplier": self.multiplier,
+                "floor": self.floor,
+                "adapted": self.adapted,
+                "timeouts": self.timeouts,
+                "saved_seconds": round(self.saved_seconds, 3)
+            }
+
+
+def limit_cpu_time(pid: int, timeout: float):
+    """
+    Give a process a CPU-time limit just above timeout (Linux only), so a
+    busy loop dies even if the wall-clock kill never happens. Children it
+    forks later inherit the limit.
+    """
+    if resource is None or not hasattr(resource, "prlimit"):
+        return
+    seconds = math.ceil(timeout) + 1
+    try:
+        # SIGXCPU at the soft limit, SIGKILL at the hard one
+        resource.prlimit(pid, resource.RLIMIT_CPU, (seconds, seconds + 1))
+    except OSError:
+        pass
+
+
+def kill_process_group(proc: Any):
+    """
+    Kill a process (Popen or asyncio Process) started with
+    start_new_session=True together with every process it started (e.g.
+    cc1plus under g++, or a program's own children), so none of them keeps
+    running or holds its output pipes open.
+    """
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_limited(
+    cmd: List[str],
+    input_data: Optional[Union[str, bytes]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+    text: bool = True,
+    cpu_limit: bool = True,
+    on_start: Optional[Callable[[subprocess.Popen], None]] = None
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() with capture_output, in a new process group that is
+    killed as a whole when the timeout expires.
+
+    Args:
+        cpu_limit: Also apply limit_cpu_time(). It is set right after the
+                   process starts, so only use it for commands that do not
+                   spawn workers immediately (test programs, not compilers).
+        on_start: Called with the process once it runs, e.g. to kill it from another thread
+
+    Raises:
+        subprocess.TimeoutExpired if the timeout expired
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input_data is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        text=text,
+        start_new_session=True
+    )
+    if cpu_limit:
+        limit_cpu_time(proc.pid, timeout)
+    if on_start is not None:
+        on_start(proc)
+    try:
+        stdout, stderr = proc.communicate(input_data, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        proc.communicate()
+        raise
+    except BaseException:
+        kill_process_group(proc)
+        proc.wait()
+        raise
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)